@@ -1,7 +1,19 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 import os
+import json
+import shutil
 import logging
-from translator import Translator
+import tempfile
+import threading
+from scheduler import BatchScheduler
+from cache import TranslationCache
+from translation_memory import TranslationMemory
+from revisions import DocumentRevisions
+from jobs import JobManager
+import documents
+import metrics
+import tracing
+import config
 import time
 
 # Set up logging
@@ -13,18 +25,238 @@ logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = config.MAX_UPLOAD_BYTES
 
-# Initialize translator (lazy loading - will be initialized on first use)
+# Initialize translator (lazy loading - will be initialized on first use,
+# or up front by warm_up() when the server starts)
 translator = None
+scheduler = None
+cache = None
+translation_memory = None
+job_manager = None
+document_revisions = None
+_translator_lock = threading.Lock()
+# Request threads can race to create the other lazy globals too
+_cache_lock = threading.Lock()
+_memory_lock = threading.Lock()
+_scheduler_lock = threading.Lock()
+_job_manager_lock = threading.Lock()
+_revisions_lock = threading.Lock()
+
+# Model readiness, reported by /ready (status: idle, loading, ready or failed)
+readiness = {
+    'status': 'idle',
+    'model_load_seconds': None,
+    'warmup_seconds': None,
+    'ready_at': None,
+    'error': None
+}
+
+# Content types of the /translate_document output formats
+DOCUMENT_MIMETYPES = {
+    'docx': "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    'txt': "text/plain; charset=utf-8"
+}
+
+# Decoding profiles a request can choose (see generation.PROFILES)
+GENERATION_PROFILES = ('fast', 'balanced', 'quality')
+
+# Endpoints that need the model; they answer 503 while it is loading
+MODEL_ENDPOINTS = ('translate', 'translate_stream', 'batch_translate', 'translate_multi', 'translate_document',
+                   'generation_stats')
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started, for the request metrics"""
+    request.start_time = time.perf_counter()
+
+@app.before_request
+def start_request_trace():
+    """
+    Trace the request if it sends an X-Trace header.
+    
+    "X-Trace: 1" records spans; "X-Trace: cprofile" or "X-Trace: torch" also
+    profiles the request. The trace is saved to TRACES_DIR and summarized in
+    the X-Trace-Id and Server-Timing response headers.
+    """
+    value = request.headers.get("X-Trace")
+    if not value or not config.TRACING_ENABLED:
+        return
+    if config.TRACE_TOKEN and request.headers.get("X-Trace-Token") != config.TRACE_TOKEN:
+        return
+    
+    profiler = value.lower() if value.lower() in tracing.PROFILERS else None
+    request.trace = tracing.start_trace(f"{request.method} {request.path}", profiler)
+
+@app.before_request
+def require_ready_model():
+    """Turn translation requests away while the model is still loading"""
+    if request.endpoint not in MODEL_ENDPOINTS or readiness['status'] not in ('loading', 'failed'):
+        return None
+    
+    response = jsonify({'error': f"Model not ready ({readiness['status']})", 'status': readiness['status']})
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+@app.after_request
+def finish_request_trace(response):
+    """Save the request's trace and summarize it in the response headers"""
+    trace = getattr(request, "trace", None)
+    if trace is None or trace.end_ns is not None:
+        return response
+    
+    response.headers["X-Trace-Id"] = trace.trace_id
+    if response.is_streamed:
+        # The body (and its spans) runs after this; finish once the stream closes
+        request.trace_deferred = True
+        response.call_on_close(lambda: tracing.finish_trace(trace, config.TRACES_DIR, config.TRACES_MAX))
+        return response
+    
+    tracing.finish_trace(trace, config.TRACES_DIR, config.TRACES_MAX)
+    response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+@app.teardown_request
+def close_request_trace(error=None):
+    """Finish a trace left open by a request that raised"""
+    trace = getattr(request, "trace", None)
+    if trace is not None and trace.end_ns is None and not getattr(request, "trace_deferred", False):
+        tracing.finish_trace(trace, config.TRACES_DIR, config.TRACES_MAX)
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and observe its latency"""
+    # Route patterns (not raw paths) keep label values bounded
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_REQUESTS.labels(endpoint=endpoint, status=response.status_code).inc()
+    if hasattr(request, "start_time"):
+        metrics.HTTP_REQUEST_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - request.start_time)
+    return response
+
+def get_cache():
+    """Get or initialize the translation cache (None if disabled)"""
+    global cache
+    if cache is None and config.CACHE_ENABLED:
+        with _cache_lock:
+            if cache is None:
+                cache = TranslationCache(max_bytes=config.CACHE_MAX_BYTES, db_path=config.CACHE_DB_PATH,
+                                         max_disk_entries=config.CACHE_MAX_DISK_ENTRIES)
+    return cache
+
+def get_memory():
+    """Get or initialize the translation memory (None if disabled)"""
+    global translation_memory
+    if translation_memory is None and config.MEMORY_ENABLED:
+        with _memory_lock:
+            if translation_memory is None:
+                translation_memory = TranslationMemory(db_path=config.MEMORY_DB_PATH,
+                                                       min_similarity=config.MEMORY_MIN_SIMILARITY,
+                                                       max_entries=config.MEMORY_MAX_ENTRIES)
+    return translation_memory
 
 def get_translator():
     """Get or initialize the translator"""
     global translator
     if translator is None:
-        logger.info("Initializing translator...")
-        translator = Translator()
+        with _translator_lock:
+            if translator is None:
+                # Imported here: torch and transformers take seconds to import,
+                # which tools that only need the app (or --help) shouldn't pay
+                from translator import Translator
+                from generation import LengthPredictor
+                
+                logger.info("Initializing translator...")
+                start_time = time.time()
+                translator = Translator(
+                    model_name=config.PRUNED_MODEL_DIR or config.MODEL_NAME,
+                    device=config.DEVICE,
+                    cache=get_cache(),
+                    memory=get_memory(),
+                    precision=config.PRECISION,
+                    quantized_model_path=config.QUANTIZED_MODEL_PATH,
+                    backend=config.INFERENCE_BACKEND,
+                    onnx_model_dir=config.ONNX_MODEL_DIR,
+                    num_threads=config.ONNX_NUM_THREADS,
+                    profile=config.GENERATION_PROFILE,
+                    length_predictor=LengthPredictor(margin=config.LENGTH_MARGIN, path=config.LENGTH_STATS_PATH),
+                    draft_model_path=config.DRAFT_MODEL_PATH,
+                    num_draft_tokens=config.DRAFT_NUM_TOKENS,
+                    tokenizer_pool_size=config.TOKENIZER_POOL_SIZE,
+                    model_slots=config.MODEL_SLOTS
+                )
+                readiness['model_load_seconds'] = time.time() - start_time
+                if readiness['status'] == 'idle':
+                    # Loaded on first use rather than by warm_up()
+                    readiness['status'] = 'ready'
+                    readiness['ready_at'] = time.time()
     return translator
 
+def warm_up(runs=None):
+    """
+    Load the model and warm it up before serving traffic.
+    
+    Translation endpoints answer 503 (and /ready reports "loading") until
+    this finishes, so a load balancer only routes requests to a process
+    whose first translations won't pay the model's cold-start costs.
+    
+    Args:
+        runs (int, optional): Warm-up rounds per target language (default: config.WARMUP_RUNS)
+        
+    Returns:
+        bool: Whether the model is ready
+    """
+    readiness['status'] = 'loading'
+    readiness['error'] = None
+    try:
+        trans = get_translator()
+        readiness['warmup_seconds'] = trans.warm_up(
+            runs=config.WARMUP_RUNS if runs is None else runs,
+            max_length=config.WARMUP_MAX_LENGTH
+        )
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {str(e)}")
+        readiness['status'] = 'failed'
+        readiness['error'] = str(e)
+        return False
+    
+    readiness['status'] = 'ready'
+    readiness['ready_at'] = time.time()
+    load_seconds = readiness['model_load_seconds'] or 0.0
+    logger.info(f"Ready to serve (model loaded in {load_seconds:.2f}s, "
+                f"warmed up in {readiness['warmup_seconds']:.2f}s)")
+    return True
+
+def get_scheduler():
+    """Get or initialize the batch scheduler (or continuous batching engine)"""
+    global scheduler
+    if scheduler is not None:
+        return scheduler
+    
+    with _scheduler_lock:
+        if scheduler is None and config.SCHEDULER_MODE == "continuous":
+            if config.INFERENCE_BACKEND == "torch":
+                from engine import ContinuousBatchingEngine
+                scheduler = ContinuousBatchingEngine(
+                    get_translator(),
+                    max_running=config.SCHEDULER_MAX_BATCH_SIZE,
+                    max_batch_tokens=config.SCHEDULER_MAX_BATCH_TOKENS,
+                    max_length=config.MAX_LENGTH
+                )
+            else:
+                logger.warning("Continuous batching requires the torch backend; using micro-batching")
+        if scheduler is None:
+            batch_scheduler = BatchScheduler(
+                get_translator(),
+                max_wait_ms=config.SCHEDULER_MAX_WAIT_MS,
+                max_batch_tokens=config.SCHEDULER_MAX_BATCH_TOKENS,
+                max_batch_size=config.SCHEDULER_MAX_BATCH_SIZE
+            )
+            batch_scheduler.start()
+            # Published only once started
+            scheduler = batch_scheduler
+    return scheduler
+
 @app.route('/')
 def index():
     """Render the main page"""
@@ -50,6 +282,16 @@ def translate():
         if target_language not in valid_languages:
             return jsonify({'error': f'Invalid target language. Choose from: {", ".join(valid_languages)}'}), 400
         
+        profile = data.get('profile')
+        if profile is not None and profile not in GENERATION_PROFILES:
+            return jsonify({'error': f'Invalid profile. Choose from: {", ".join(GENERATION_PROFILES)}'}), 400
+        
+        document_id = data.get('document_id')
+        if document_id is not None:
+            if not isinstance(document_id, str) or not document_id:
+                return jsonify({'error': 'document_id must be a non-empty string'}), 400
+            return translate_revision(document_id, text, target_language, profile)
+        
         # Get translator
         trans = get_translator()
         
@@ -58,9 +300,17 @@ def translate():
         
         # Translate text
         if len(text) > 1000:  # Use large text method for longer texts
-            translation = trans.translate_large_text(text, target_language)
+            translation = trans.translate_large_text(text, target_language, max_chunk_tokens=config.CHUNK_MAX_TOKENS,
+                                                     profile=profile)
+        elif (config.SCHEDULER_ENABLED and tracing.active_trace() is None
+              and (config.SCHEDULER_MODE != "continuous" or profile in (None, 'fast'))):
+            # Batch with other concurrent requests for the same language
+            # (traced requests run on their own so the trace covers only them;
+            # the continuous engine only decodes greedily, so beam profiles skip it)
+            translation = get_scheduler().translate(text, target_language, timeout=config.API_TIMEOUT,
+                                                    profile=profile)
         else:
-            translation = trans.translate(text, target_language)
+            translation = trans.translate(text, target_language, profile=profile)
             
         elapsed_time = time.time() - start_time
         
@@ -76,6 +326,88 @@ def translate():
         logger.error(f"Translation error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def translate_revision(document_id, text, target_language, profile=None):
+    """Translate a revision of a document, only translating sentences changed since the last one"""
+    start_time = time.time()
+    result = get_revisions().translate(document_id, text, target_language, max_length=config.MAX_LENGTH,
+                                       profile=profile)
+    elapsed_time = time.time() - start_time
+    
+    return jsonify({
+        'translation': result['translation'],
+        'document_id': document_id,
+        'revision': result['revision'],
+        'stats': result['stats'],
+        'source_language': 'english',
+        'target_language': target_language,
+        'processing_time': f"{elapsed_time:.2f} seconds"
+    })
+
+@app.route('/translate_stream', methods=['POST'])
+def translate_stream():
+    """
+    API endpoint for streaming translation of large texts.
+    
+    Responds with newline-delimited JSON: one {"translation": ...} line per
+    translated chunk, in order, then a {"done": true, ...} line. Chunk
+    translations include the whitespace that follows them, so concatenating
+    them gives the full translation.
+    """
+    try:
+        # Get request data
+        data = request.json
+        text = data.get('text', '')
+        target_language = data.get('target_language', '').lower()
+        
+        if not text:
+            return jsonify({'error': 'No text provided'}), 400
+            
+        if not target_language:
+            return jsonify({'error': 'No target language provided'}), 400
+            
+        # Validate target language
+        valid_languages = ['hindi', 'tamil', 'malayalam', 'telugu']
+        if target_language not in valid_languages:
+            return jsonify({'error': f'Invalid target language. Choose from: {", ".join(valid_languages)}'}), 400
+        
+        profile = data.get('profile')
+        if profile is not None and profile not in GENERATION_PROFILES:
+            return jsonify({'error': f'Invalid profile. Choose from: {", ".join(GENERATION_PROFILES)}'}), 400
+        
+        # Get translator
+        trans = get_translator()
+        
+    except Exception as e:
+        logger.error(f"Streaming translation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        start_time = time.time()
+        try:
+            chunks = trans.translate_large_text_iter(
+                text, target_language,
+                max_chunk_tokens=config.CHUNK_MAX_TOKENS,
+                batch_size=config.BATCH_SIZE,
+                profile=profile
+            )
+            for index, translation in enumerate(chunks):
+                yield json.dumps({'index': index, 'translation': translation}, ensure_ascii=False) + "\n"
+                
+            elapsed_time = time.time() - start_time
+            yield json.dumps({
+                'done': True,
+                'source_language': 'english',
+                'target_language': target_language,
+                'processing_time': f"{elapsed_time:.2f} seconds"
+            }) + "\n"
+            
+        except Exception as e:
+            # Headers are already sent, so report the error in the stream
+            logger.error(f"Streaming translation error: {str(e)}")
+            yield json.dumps({'error': str(e)}) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
 @app.route('/batch_translate', methods=['POST'])
 def batch_translate():
     """API endpoint for batch translation"""
@@ -96,14 +428,25 @@ def batch_translate():
         if target_language not in valid_languages:
             return jsonify({'error': f'Invalid target language. Choose from: {", ".join(valid_languages)}'}), 400
         
+        profile = data.get('profile')
+        if profile is not None and profile not in GENERATION_PROFILES:
+            return jsonify({'error': f'Invalid profile. Choose from: {", ".join(GENERATION_PROFILES)}'}), 400
+        
         # Get translator
         trans = get_translator()
         
         # Measure translation time
         start_time = time.time()
         
-        # Translate texts
-        translations = trans.translate(texts, target_language)
+        # Translate texts (repeated segments only once)
+        stats = {}
+        translations = trans.translate(
+            texts, target_language,
+            batch_size=config.BATCH_SIZE,
+            max_batch_tokens=config.MAX_BATCH_TOKENS,
+            stats=stats,
+            profile=profile
+        )
         
         elapsed_time = time.time() - start_time
         
@@ -113,6 +456,7 @@ def batch_translate():
             'source_language': 'english',
             'target_language': target_language,
             'count': len(translations),
+            'stats': stats,
             'processing_time': f"{elapsed_time:.2f} seconds"
         })
         
@@ -120,14 +464,285 @@ def batch_translate():
         logger.error(f"Batch translation error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/translate_multi', methods=['POST'])
+def translate_multi():
+    """API endpoint for translating one text into several languages"""
+    try:
+        # Get request data
+        data = request.json
+        text = data.get('text', '')
+        valid_languages = ['hindi', 'tamil', 'malayalam', 'telugu']
+        target_languages = [language.lower() for language in data.get('target_languages', valid_languages)]
+        
+        if not text:
+            return jsonify({'error': 'No text provided'}), 400
+            
+        if not target_languages:
+            return jsonify({'error': 'No target languages provided'}), 400
+            
+        # Validate target languages
+        invalid = [language for language in target_languages if language not in valid_languages]
+        if invalid:
+            return jsonify({'error': f'Invalid target language. Choose from: {", ".join(valid_languages)}'}), 400
+        
+        profile = data.get('profile')
+        if profile is not None and profile not in GENERATION_PROFILES:
+            return jsonify({'error': f'Invalid profile. Choose from: {", ".join(GENERATION_PROFILES)}'}), 400
+        
+        # Get translator
+        trans = get_translator()
+        
+        # Measure translation time
+        start_time = time.time()
+        
+        # Translate text (chunked for longer texts)
+        translations = trans.translate_multi(
+            text, target_languages,
+            max_chunk_tokens=config.CHUNK_MAX_TOKENS if len(text) > 1000 else None,
+            profile=profile
+        )
+        
+        elapsed_time = time.time() - start_time
+        
+        # Return translations
+        return jsonify({
+            'translations': translations,
+            'source_language': 'english',
+            'target_languages': target_languages,
+            'processing_time': f"{elapsed_time:.2f} seconds"
+        })
+        
+    except Exception as e:
+        logger.error(f"Multi-language translation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/translate_document', methods=['POST'])
+def translate_document():
+    """
+    API endpoint for translating a PDF, DOCX or text document.
+    
+    Takes a multipart form with the document in ``file``, ``target_language``
+    and an optional output ``format`` ("docx", the default, or "txt"), and
+    responds with the translated document as a download. The document is
+    read and translated a window of paragraphs at a time.
+    """
+    upload = request.files.get('file')
+    target_language = request.form.get('target_language', '').lower()
+    output_format = request.form.get('format', 'docx').lower()
+    
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'No document provided'}), 400
+        
+    if not target_language:
+        return jsonify({'error': 'No target language provided'}), 400
+        
+    # Validate target language
+    valid_languages = ['hindi', 'tamil', 'malayalam', 'telugu']
+    if target_language not in valid_languages:
+        return jsonify({'error': f'Invalid target language. Choose from: {", ".join(valid_languages)}'}), 400
+    
+    name, extension = os.path.splitext(os.path.basename(upload.filename))
+    if extension.lower() not in documents.INPUT_FORMATS:
+        return jsonify({'error': f'Unsupported document type. Choose from: {", ".join(documents.INPUT_FORMATS)}'}), 400
+    if f".{output_format}" not in documents.OUTPUT_FORMATS:
+        return jsonify({'error': 'Invalid format. Choose from: docx, txt'}), 400
+    
+    # The upload and its translation are spooled to disk, not kept in memory
+    work_dir = tempfile.mkdtemp(prefix="translate_document_")
+    try:
+        input_path = os.path.join(work_dir, f"input{extension.lower()}")
+        output_path = os.path.join(work_dir, f"{name}_{target_language}.{output_format}")
+        upload.save(input_path)
+        
+        stats = documents.translate_document(
+            get_translator(), input_path, output_path, target_language,
+            max_chunk_tokens=config.CHUNK_MAX_TOKENS,
+            batch_size=config.BATCH_SIZE,
+            window_segments=config.DOCUMENT_WINDOW_SEGMENTS
+        )
+        
+        def generate():
+            # Stream the file back, then clean up once the response is done
+            try:
+                with open(output_path, 'rb') as f:
+                    while True:
+                        block = f.read(64 * 1024)
+                        if not block:
+                            break
+                        yield block
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        
+        response = Response(generate(), mimetype=DOCUMENT_MIMETYPES[output_format])
+        response.headers['Content-Length'] = str(os.path.getsize(output_path))
+        response.headers.set('Content-Disposition', 'attachment', filename=os.path.basename(output_path))
+        response.headers['X-Document-Segments'] = str(stats['segments'])
+        response.headers['X-Document-Pages'] = str(stats['pages'])
+        response.headers['X-Processing-Time'] = f"{stats['elapsed_seconds']:.2f} seconds"
+        return response
+        
+    except ValueError as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        logger.error(f"Document translation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def get_job_manager():
+    """Get or initialize the background job manager (resumes unfinished jobs)"""
+    global job_manager
+    if job_manager is None:
+        with _job_manager_lock:
+            if job_manager is None:
+                manager = JobManager(
+                    get_translator,
+                    config.JOBS_DIR,
+                    workers=config.JOB_WORKERS,
+                    max_chunk_tokens=config.CHUNK_MAX_TOKENS,
+                    batch_size=config.BATCH_SIZE
+                )
+                manager.resume()
+                # Published only once resumed
+                job_manager = manager
+    return job_manager
+
+def get_revisions():
+    """Get or initialize the store of document revisions"""
+    global document_revisions
+    if document_revisions is None:
+        with _revisions_lock:
+            if document_revisions is None:
+                document_revisions = DocumentRevisions(
+                    get_translator,
+                    config.REVISIONS_DIR,
+                    max_chunk_tokens=config.CHUNK_MAX_TOKENS,
+                    batch_size=config.BATCH_SIZE
+                )
+    return document_revisions
+
+@app.route('/documents/<document_id>', methods=['DELETE'])
+def delete_document(document_id):
+    """API endpoint for forgetting the saved revisions of a document"""
+    removed = get_revisions().delete(document_id)
+    if not removed:
+        return jsonify({'error': 'Document not found'}), 404
+    
+    return jsonify({'document_id': document_id, 'deleted': removed})
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """API endpoint for queueing a long translation as a background job"""
+    try:
+        # Get request data
+        data = request.json
+        text = data.get('text', '')
+        target_language = data.get('target_language', '').lower()
+        
+        if not text:
+            return jsonify({'error': 'No text provided'}), 400
+            
+        if not target_language:
+            return jsonify({'error': 'No target language provided'}), 400
+            
+        # Validate target language
+        valid_languages = ['hindi', 'tamil', 'malayalam', 'telugu']
+        if target_language not in valid_languages:
+            return jsonify({'error': f'Invalid target language. Choose from: {", ".join(valid_languages)}'}), 400
+        
+        job_id = get_job_manager().submit(text, target_language)
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f"/jobs/{job_id}"
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Job creation error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """API endpoint for the progress (and result) of a background job"""
+    status = get_job_manager().get(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(status)
+
+@app.route('/cache_stats')
+def cache_stats():
+    """Translation cache counters, for sizing the cache"""
+    translation_cache = get_cache()
+    if translation_cache is None:
+        return jsonify({'enabled': False})
+    
+    return jsonify(dict(translation_cache.stats(), enabled=True))
+
+@app.route('/memory_stats')
+def memory_stats():
+    """Translation memory match rate and estimated model time saved"""
+    memory = get_memory()
+    if memory is None:
+        return jsonify({'enabled': False})
+    
+    return jsonify(dict(memory.stats(), enabled=True))
+
+@app.route('/generation_stats')
+def generation_stats():
+    """Default decoding profile, learned output/input length ratios and speculative decoding counters"""
+    trans = get_translator()
+    
+    return jsonify({
+        'default_profile': trans.profile,
+        'profiles': list(GENERATION_PROFILES),
+        'length_ratios': trans.length_predictor.stats(),
+        'speculative': dict(trans.speculative.stats(), enabled=True) if trans.speculative else {'enabled': False}
+    })
+
+@app.route('/stats')
+def stats():
+    """Scheduler counters: batching mode, and with the continuous engine its step and running-set stats"""
+    current = scheduler
+    if current is None:
+        return jsonify({'mode': config.SCHEDULER_MODE, 'started': False})
+    
+    mode = "micro" if isinstance(current, BatchScheduler) else "continuous"
+    scheduler_stats = {'mode': mode, 'started': True}
+    if mode == "continuous":
+        scheduler_stats['engine'] = current.stats()
+    return jsonify(scheduler_stats)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics of this process"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/health')
 def health():
-    """Health check endpoint"""
+    """Liveness check: the process is up (the model may still be loading)"""
     return jsonify({'status': 'ok'})
 
+@app.route('/ready')
+def ready():
+    """
+    Readiness check: 200 once the model is loaded and warmed up, 503 before.
+    
+    Without warm-up ("idle": the model loads on the first translation
+    request) it answers 503 until that request has loaded the model.
+    """
+    status_code = 200 if readiness['status'] == 'ready' else 503
+    return jsonify(dict(readiness, ready=status_code == 200)), status_code
+
 # Create templates directory if it doesn't exist
 os.makedirs('templates', exist_ok=True)
 
 if __name__ == '__main__':
+    # Load and warm up the model while the server starts (in the serving
+    # process only, not in the debug reloader's parent)
+    if config.WARMUP_ENABLED and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        threading.Thread(target=warm_up, name="model-warmup", daemon=True).start()
+    
     # Run the Flask app
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
@@ -0,0 +1,286 @@
+"""
+Inference backends for the translator.
+
+A backend wraps one inference engine behind a small interface (tokenize,
+encode, decode step, generate, detokenize) that :class:`Translator`
+dispatches to, so engines can be swapped and benchmarked side by side.
+"""
+
+import os
+import json
+import logging
+import time
+import torch
+import metrics
+from concurrency import TokenizerPool
+
+logger = logging.getLogger(__name__)
+
+# Names accepted by Translator(backend=...)
+BACKENDS = ("torch", "onnx")
+
+class InferenceBackend:
+    """
+    Base class for inference engines.
+
+    Subclasses provide ``self.model``, an encoder-decoder model with the
+    Hugging Face ``forward``/``generate`` API (PyTorch or ONNX Runtime).
+    """
+
+    name = None
+
+    def __init__(self, model, tokenizer, device="cpu", tokenizers=None):
+        """
+        Initialize the backend.
+
+        Args:
+            model: Encoder-decoder model
+            tokenizer: Tokenizer matching the model
+            device (str): Device the model inputs must be placed on
+            tokenizers (TokenizerPool, optional): Instances of the tokenizer
+                used to tokenize and detokenize, so several threads can at
+                once (default: tokenizer alone)
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.tokenizers = tokenizers or TokenizerPool(tokenizer, size=1)
+
+    @property
+    def decoder_start_token_id(self):
+        """Token the decoder starts from, before the target language code"""
+        return self.model.config.decoder_start_token_id
+
+    def tokenize(self, texts, max_length, source_code):
+        """
+        Tokenize texts.
+
+        The source language code and end-of-sentence tokens are added here
+        rather than through the tokenizer's ``src_lang``, which is shared
+        state that concurrent requests in other languages would overwrite.
+
+        Args:
+            texts (list): Texts to tokenize
+            max_length (int): Maximum tokens per text (special tokens included)
+            source_code (str): MBart source language code
+
+        Returns:
+            list: Token ids of each text (not padded)
+        """
+        prefix = [self.tokenizer.convert_tokens_to_ids(source_code)]
+        suffix = [self.tokenizer.eos_token_id]
+        with metrics.TOKENIZE_SECONDS.time(), self.tokenizers.acquire() as tokenizer:
+            input_ids = tokenizer(texts, add_special_tokens=False, truncation=True,
+                                  max_length=max_length - 2)["input_ids"]
+        input_ids = [prefix + ids + suffix for ids in input_ids]
+        for ids in input_ids:
+            metrics.INPUT_TOKENS.observe(len(ids))
+        return input_ids
+
+    def encode(self, input_ids, attention_mask):
+        """
+        Run the encoder.
+
+        Args:
+            input_ids (torch.Tensor): Padded input token ids
+            attention_mask (torch.Tensor): Attention mask for input_ids
+
+        Returns:
+            BaseModelOutput: Encoder outputs (``last_hidden_state``)
+        """
+        with torch.no_grad(), metrics.ENCODE_SECONDS.time():
+            return self.model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask)
+
+    def decode_step(self, encoder_outputs, attention_mask, decoder_input_ids, past_key_values=None):
+        """
+        Run one decoder step.
+
+        Args:
+            encoder_outputs (BaseModelOutput): Outputs of :meth:`encode`
+            attention_mask (torch.Tensor): Encoder attention mask
+            decoder_input_ids (torch.Tensor): Decoder tokens not yet in the cache
+            past_key_values (optional): Cache returned by the previous step
+
+        Returns:
+            tuple: ``(logits, past_key_values)`` where logits are for the
+            next token of each sequence
+        """
+        logits, past_key_values = self.decode_tokens(encoder_outputs, attention_mask, decoder_input_ids,
+                                                     past_key_values)
+        return logits[:, -1, :], past_key_values
+
+    def decode_tokens(self, encoder_outputs, attention_mask, decoder_input_ids, past_key_values=None):
+        """
+        Run the decoder over several new tokens at once.
+
+        Args:
+            encoder_outputs (BaseModelOutput): Outputs of :meth:`encode`
+            attention_mask (torch.Tensor): Encoder attention mask
+            decoder_input_ids (torch.Tensor): Decoder tokens not yet in the cache
+            past_key_values (optional): Cache returned by the previous call
+
+        Returns:
+            tuple: ``(logits, past_key_values)`` where logits hold, for
+            every input token, the scores of the token that follows it
+        """
+        with torch.no_grad():
+            outputs = self.model(
+                encoder_outputs=encoder_outputs,
+                attention_mask=attention_mask,
+                decoder_input_ids=decoder_input_ids,
+                past_key_values=past_key_values,
+                use_cache=True
+            )
+        return outputs.logits, outputs.past_key_values
+
+    def generate(self, **kwargs):
+        """
+        Generate output token ids.
+
+        Accepts the keyword arguments of Hugging Face ``generate``, e.g.
+        ``input_ids``/``attention_mask`` or precomputed ``encoder_outputs``,
+        plus ``forced_bos_token_id``/``decoder_input_ids`` and ``max_length``.
+        Pass ``encoder_outputs`` from :meth:`encode` so the decode time is
+        measured on its own.
+
+        Returns:
+            torch.Tensor: Generated token ids
+        """
+        if kwargs.get("attention_mask") is not None:
+            metrics.BATCH_SIZE.observe(kwargs["attention_mask"].shape[0])
+        with torch.no_grad(), metrics.DECODE_SECONDS.time():
+            return self.model.generate(**kwargs)
+
+    def detokenize(self, token_ids):
+        """
+        Turn generated token ids back into text.
+
+        Args:
+            token_ids (torch.Tensor or list): Generated token ids
+
+        Returns:
+            list: Decoded texts
+        """
+        with metrics.DETOKENIZE_SECONDS.time(), self.tokenizers.acquire() as tokenizer:
+            texts = tokenizer.batch_decode(token_ids, skip_special_tokens=True)
+
+        # Output length without padding
+        if torch.is_tensor(token_ids):
+            lengths = (token_ids != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+        else:
+            lengths = [len(ids) for ids in token_ids]
+        for length in lengths:
+            metrics.OUTPUT_TOKENS.observe(length)
+        return texts
+
+class TorchBackend(InferenceBackend):
+    """Eager PyTorch inference with the Hugging Face model"""
+
+    name = "torch"
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    ONNX Runtime inference.
+
+    The model is exported to three ONNX graphs (encoder, first decoder step,
+    and decoder step with past key values) so each decode step only
+    processes the newest token. The export is cached on disk, with a
+    manifest of what it was exported from.
+    """
+
+    name = "onnx"
+
+    # Written next to a cached export
+    MANIFEST_FILE = "export_manifest.json"
+
+    @classmethod
+    def load(cls, model_name, tokenizer, device="cpu", export_dir=None, num_threads=None, tokenizers=None):
+        """
+        Load the ONNX model, exporting it from the PyTorch weights if needed.
+
+        A cached export is only reused if its manifest matches the model
+        (name, config, weight files) and the exporting library versions;
+        otherwise the model is exported again and the cache overwritten.
+
+        Args:
+            model_name (str): Hugging Face model name or path
+            tokenizer: Tokenizer matching the model
+            device (str): 'cpu' or 'cuda'
+            export_dir (str, optional): Where the exported graphs are kept
+                (exported again on every load if None)
+            num_threads (int, optional): ONNX Runtime intra-op threads
+                (runtime default if None)
+            tokenizers (TokenizerPool, optional): Instances of the tokenizer
+                for concurrent tokenizing
+
+        Returns:
+            OnnxRuntimeBackend: Loaded backend
+        """
+        try:
+            import onnxruntime
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX Runtime backend requires onnxruntime and optimum: "
+                "pip install onnxruntime 'optimum[onnxruntime]'"
+            ) from e
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+
+        provider = "CUDAExecutionProvider" if device == "cuda" else "CPUExecutionProvider"
+        source = cls._export_source(model_name)
+        exported = False
+        if export_dir and os.path.exists(os.path.join(export_dir, "encoder_model.onnx")):
+            saved_source = None
+            try:
+                with open(os.path.join(export_dir, cls.MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                    saved_source = json.load(f)
+            except (OSError, ValueError):
+                pass
+            exported = saved_source == source
+            if not exported:
+                logger.warning(f"ONNX export in {export_dir} was not made from {model_name} "
+                               f"with these library versions, exporting again")
+
+        start_time = time.time()
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            export_dir if exported else model_name,
+            export=not exported,
+            use_cache=True,
+            provider=provider,
+            session_options=session_options
+        )
+        if export_dir and not exported:
+            model.save_pretrained(export_dir)
+            with open(os.path.join(export_dir, cls.MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(source, f, indent=2)
+            logger.info(f"Exported ONNX model to {export_dir}")
+        logger.info(f"ONNX Runtime model ready in {time.time() - start_time:.2f} seconds ({provider})")
+
+        return cls(model, tokenizer, device, tokenizers)
+
+    @staticmethod
+    def _export_source(model_name):
+        """What a cached export must have been made from to be reused"""
+        from transformers import AutoConfig
+        import optimum.version
+
+        files = []
+        if os.path.isdir(model_name):
+            # A local model (e.g. a pruned one) can be rebuilt in place
+            for file_name in sorted(os.listdir(model_name)):
+                stat = os.stat(os.path.join(model_name, file_name))
+                files.append([file_name, stat.st_size, stat.st_mtime_ns])
+
+        model_config = AutoConfig.from_pretrained(model_name)
+        return {
+            'source_model': model_name,
+            # Includes the transformers version
+            'config': json.loads(model_config.to_json_string()),
+            'files': files,
+            'optimum_version': optimum.version.__version__,
+            'torch_version': torch.__version__
+        }
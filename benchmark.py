@@ -0,0 +1,396 @@
+"""
+Performance benchmark suite for the translator.
+
+Sweeps batch size, input length, target language, precision and chunk size
+over single-text, batch and large-text translation, and reports throughput,
+latency percentiles and peak memory as JSON. A run can be compared against
+a stored baseline to flag regressions.
+
+Runs offline on CPU: by default it benchmarks a tiny randomly initialized
+MBart (with a small SentencePiece vocabulary trained on the spot), so no
+weights are downloaded. Pass ``--model`` to benchmark a real checkpoint.
+Each precision is measured in its own process so memory numbers are not
+mixed up.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from utils import setup_logging, percentile
+
+import config
+
+# Set up logging
+setup_logging(log_level="INFO")
+logger = logging.getLogger(__name__)
+
+TINY_MODEL_DIR = os.path.join(config.MODELS_DIR, "benchmark-tiny-mbart")
+
+# Word list for synthetic inputs (also the training corpus of the tiny tokenizer)
+WORDS = (
+    "the report shows revenue growth of twelve percent compared to last year and "
+    "students are expected to submit their assessments before the end of the term "
+    "please review the attached document and share your feedback by friday "
+    "committee approved new budget after long discussion about priorities for "
+    "each department while costs in the region remained stable during quarter"
+).split()
+
+def build_tiny_model(path=TINY_MODEL_DIR, seed=0):
+    """
+    Create a tiny random MBart checkpoint with an MBart-50 tokenizer.
+
+    The checkpoint is reused if it already exists.
+
+    Args:
+        path (str): Directory to save the checkpoint to
+        seed (int): Seed for the tokenizer corpus and the model weights
+
+    Returns:
+        str: Path of the checkpoint
+    """
+    if os.path.exists(os.path.join(path, "config.json")):
+        return path
+
+    import sentencepiece as spm
+    import torch
+    from transformers import MBart50TokenizerFast, MBartConfig, MBartForConditionalGeneration
+
+    logger.info(f"Building tiny benchmark model in {path}")
+    os.makedirs(path, exist_ok=True)
+
+    rng = random.Random(seed)
+    corpus = [" ".join(rng.choice(WORDS) for _ in range(12)) + "." for _ in range(500)]
+    sp_prefix = os.path.join(path, "sentencepiece.bpe")
+    spm.SentencePieceTrainer.train(
+        sentence_iterator=iter(corpus), model_prefix=sp_prefix, vocab_size=256,
+        hard_vocab_limit=False, model_type="unigram", unk_id=0, bos_id=-1, eos_id=-1, pad_id=-1,
+        num_threads=1, minloglevel=2
+    )
+    tokenizer = MBart50TokenizerFast(vocab_file=f"{sp_prefix}.model", src_lang="en_XX")
+
+    torch.manual_seed(seed)
+    model_config = MBartConfig(
+        vocab_size=len(tokenizer), d_model=64, encoder_layers=2, decoder_layers=2,
+        encoder_attention_heads=4, decoder_attention_heads=4, encoder_ffn_dim=128, decoder_ffn_dim=128,
+        max_position_embeddings=1024, scale_embedding=True, init_std=0.5,
+        pad_token_id=tokenizer.pad_token_id, eos_token_id=tokenizer.eos_token_id, bos_token_id=0,
+        decoder_start_token_id=tokenizer.eos_token_id, forced_eos_token_id=tokenizer.eos_token_id
+    )
+    model = MBartForConditionalGeneration(model_config).eval()
+
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+def make_text(rng, num_words, sentence_words=12):
+    """Synthetic English text of num_words words in sentences of about sentence_words"""
+    sentences = []
+    remaining = num_words
+    while remaining > 0:
+        length = min(remaining, max(1, sentence_words + rng.randint(-4, 4)))
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+def summarize(name, params, latencies, segments, input_tokens, output_tokens):
+    """
+    Build the result record of one benchmark case.
+
+    Args:
+        name (str): Case name (used to match cases against a baseline)
+        params (dict): Swept parameters of the case
+        latencies (list): Seconds taken by each timed call
+        segments (int): Number of segments translated in the timed calls
+        input_tokens (int): Source tokens translated in the timed calls
+        output_tokens (int): Tokens of the translations
+
+    Returns:
+        dict: Throughput and latency statistics
+    """
+    total_time = sum(latencies)
+    return {
+        'name': name,
+        'params': params,
+        'calls': len(latencies),
+        'segments_per_s': segments / total_time,
+        'input_tokens_per_s': input_tokens / total_time,
+        'output_tokens_per_s': output_tokens / total_time,
+        'latency_mean_s': statistics.mean(latencies),
+        'latency_p50_s': percentile(latencies, 50),
+        'latency_p95_s': percentile(latencies, 95),
+        'latency_p99_s': percentile(latencies, 99)
+    }
+
+def run_case(translator, call, inputs, repeats):
+    """
+    Time a translation call over every input.
+
+    Args:
+        translator (Translator): Translator under test
+        call (callable): Translates one input and returns the translation(s)
+        inputs (list): Inputs for call (a text or a list of texts each)
+        repeats (int): Timed passes over the inputs (after one warm-up pass)
+
+    Returns:
+        tuple: ``(latencies, segments, input_tokens, output_tokens)``
+    """
+    for item in inputs:
+        call(item)
+
+    latencies = []
+    outputs = []
+    for _ in range(repeats):
+        for item in inputs:
+            start_time = time.perf_counter()
+            outputs.append(call(item))
+            latencies.append(time.perf_counter() - start_time)
+
+    texts = [text for item in inputs for text in (item if isinstance(item, list) else [item])]
+    translations = [text for item in outputs for text in (item if isinstance(item, list) else [item])]
+    input_tokens = sum(translator.count_tokens(text) for text in texts) * repeats
+    output_tokens = sum(translator.count_tokens(text or "", add_special_tokens=False) for text in translations)
+    return latencies, len(texts) * repeats, input_tokens, output_tokens
+
+def measure(args, precision):
+    """
+    Run every benchmark case for one precision.
+
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments
+        precision (str): Precision mode to load the model in
+
+    Returns:
+        dict: Load time, memory usage and one record per case
+    """
+    import torch
+    from translator import Translator
+    from utils import get_process_memory
+
+    torch.manual_seed(args.seed)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    start_time = time.perf_counter()
+    translator = Translator(model_name=args.model, device="cpu", precision=precision)
+    load_time = time.perf_counter() - start_time
+    rss_after_load = get_process_memory()['rss_mb']
+
+    rng = random.Random(args.seed)
+    cases = []
+
+    for language in args.languages:
+        for length in args.lengths:
+            texts = [make_text(rng, length) for _ in range(args.segments)]
+
+            if "single" in args.modes:
+                params = {'mode': "single", 'precision': precision, 'language': language, 'length': length}
+                stats = run_case(translator, lambda text: translator.translate(
+                    text, language, max_length=args.max_length), texts, args.repeats)
+                cases.append(summarize(f"single/{precision}/{language}/len{length}", params, *stats))
+
+            if "batch" in args.modes:
+                for batch_size in args.batch_sizes:
+                    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+                    params = {'mode': "batch", 'precision': precision, 'language': language, 'length': length,
+                              'batch_size': batch_size}
+                    stats = run_case(translator, lambda batch: translator.translate(
+                        batch, language, batch_size=batch_size, max_length=args.max_length), batches, args.repeats)
+                    cases.append(summarize(f"batch/{precision}/{language}/len{length}/bs{batch_size}",
+                                           params, *stats))
+
+        if "large" in args.modes:
+            document = make_text(rng, args.document_words)
+            for chunk_tokens in args.chunk_tokens:
+                params = {'mode': "large", 'precision': precision, 'language': language,
+                          'length': args.document_words, 'max_chunk_tokens': chunk_tokens}
+                stats = run_case(translator, lambda text: translator.translate_large_text(
+                    text, language, max_chunk_tokens=chunk_tokens, max_length=args.max_length),
+                    [document], args.repeats)
+                cases.append(summarize(f"large/{precision}/{language}/chunk{chunk_tokens}", params, *stats))
+
+            logger.info(f"Finished {precision} {language}")
+
+    memory = get_process_memory()
+    return {
+        'precision': precision,
+        'load_time_s': load_time,
+        'rss_after_load_mb': rss_after_load,
+        'peak_rss_mb': memory['peak_rss_mb'],
+        'cases': cases
+    }
+
+def run_in_subprocess(args, precision):
+    """Measure one precision in a fresh interpreter and return its results"""
+    command = [sys.executable, __file__, "--worker", precision]
+    for option, value in vars(args).items():
+        if option in ("worker", "precisions", "baseline", "output", "tolerance") or value is None:
+            continue
+        flag = "--" + option.replace("_", "-")
+        command += [flag] + [str(v) for v in value] if isinstance(value, list) else [flag, str(value)]
+
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        logger.error(f"{precision} run failed:\n{completed.stderr}")
+        return None
+
+    # The worker prints its JSON result as the last line of stdout
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def environment_info(args):
+    """Versions and settings needed to reproduce a run"""
+    import torch
+    import transformers
+
+    return {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'torch': torch.__version__,
+        'transformers': transformers.__version__,
+        'model': args.model,
+        'seed': args.seed,
+        'threads': args.threads,
+        'max_length': args.max_length,
+        'repeats': args.repeats
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Compare a run against a baseline run.
+
+    A case regresses if its p50 latency rose, or its segment throughput
+    fell, by more than the tolerance.
+
+    Args:
+        results (dict): Results of this run
+        baseline (dict): Results of the baseline run
+        tolerance (float): Allowed relative change (e.g. 0.1 for 10%)
+
+    Returns:
+        list: Comparison record per case present in both runs
+    """
+    baseline_cases = {
+        case['name']: case for run in baseline['runs'].values() for case in run['cases']
+    }
+
+    comparisons = []
+    for run in results['runs'].values():
+        for case in run['cases']:
+            reference = baseline_cases.get(case['name'])
+            if reference is None:
+                continue
+
+            latency_change = case['latency_p50_s'] / reference['latency_p50_s'] - 1
+            throughput_change = case['segments_per_s'] / reference['segments_per_s'] - 1
+            comparisons.append({
+                'name': case['name'],
+                'latency_p50_change': latency_change,
+                'throughput_change': throughput_change,
+                'regression': latency_change > tolerance or throughput_change < -tolerance
+            })
+
+    return comparisons
+
+def print_results(results, comparisons=None):
+    """Print a summary table of a run (and its baseline comparison)"""
+    changes = {comparison['name']: comparison for comparison in comparisons or []}
+
+    print()
+    print(f"{'case':<44}{'seg/s':>9}{'tok/s':>9}{'p50 (s)':>9}{'p95 (s)':>9}{'p99 (s)':>9}"
+          + (f"{'vs base':>10}" if comparisons is not None else ""))
+    print("-" * (89 + (10 if comparisons is not None else 0)))
+    for run in results['runs'].values():
+        for case in run['cases']:
+            line = (f"{case['name']:<44}{case['segments_per_s']:>9.2f}{case['input_tokens_per_s']:>9.0f}"
+                    f"{case['latency_p50_s']:>9.3f}{case['latency_p95_s']:>9.3f}{case['latency_p99_s']:>9.3f}")
+            if case['name'] in changes:
+                comparison = changes[case['name']]
+                flag = " !" if comparison['regression'] else ""
+                line += f"{comparison['latency_p50_change']:>+9.0%}{flag}"
+            print(line)
+
+    print()
+    for precision, run in results['runs'].items():
+        print(f"{precision}: load {run['load_time_s']:.2f} s, RSS after load {run['rss_after_load_mb']:.0f} MB, "
+              f"peak RSS {run['peak_rss_mb']:.0f} MB")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark translation performance")
+    parser.add_argument("--model", help="Model to benchmark (default: a tiny random MBart built offline)")
+    parser.add_argument("--modes", nargs="+", choices=["single", "batch", "large"],
+                        default=["single", "batch", "large"], help="Translation paths to benchmark")
+    parser.add_argument("--languages", nargs="+", choices=["hindi", "tamil", "malayalam", "telugu"],
+                        default=["hindi"], help="Target languages")
+    parser.add_argument("--precisions", nargs="+", choices=["fp32", "bf16", "int8"], default=["fp32"],
+                        help="Precision modes")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8], help="Batch sizes for batch mode")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[8, 32, 96],
+                        help="Input lengths in words for single and batch mode")
+    parser.add_argument("--chunk-tokens", type=int, nargs="+", default=[64, 256],
+                        help="max_chunk_tokens values for large mode")
+    parser.add_argument("--document-words", type=int, default=600, help="Document length in words for large mode")
+    parser.add_argument("--segments", type=int, default=16, help="Segments per case in single and batch mode")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes per case")
+    parser.add_argument("--max-length", type=int, default=128, help="max_length passed to the translator")
+    parser.add_argument("--threads", type=int, help="torch threads (default: torch's choice)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for inputs and the tiny model")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Relative slowdown allowed before a case is flagged as a regression")
+    parser.add_argument("--worker", choices=["fp32", "bf16", "int8"], help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args, args.worker), ensure_ascii=False))
+        return
+
+    if args.model is None:
+        args.model = build_tiny_model(seed=args.seed)
+
+    results = {'environment': environment_info(args), 'runs': {}}
+    for precision in args.precisions:
+        logger.info(f"Benchmarking {precision}")
+        run = run_in_subprocess(args, precision)
+        if run:
+            results['runs'][precision] = run
+
+    if not results['runs']:
+        logger.error("Every benchmark run failed")
+        sys.exit(1)
+
+    comparisons = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons = compare(results, baseline, args.tolerance)
+        results['comparison'] = {'baseline': args.baseline, 'tolerance': args.tolerance, 'cases': comparisons}
+
+    print_results(results, comparisons)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        logger.info(f"Results saved to: {args.output}")
+
+    if comparisons:
+        regressions = [comparison['name'] for comparison in comparisons if comparison['regression']]
+        if regressions:
+            logger.warning(f"{len(regressions)} cases regressed by more than {args.tolerance:.0%}: "
+                           f"{', '.join(regressions)}")
+            sys.exit(1)
+        logger.info(f"No regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""
+Bulk translation of many files or a JSONL stream with one loaded model.
+
+Segments (paragraphs, table cells, records) are streamed from all inputs
+into windows that are translated in one batched call each, so many small
+files keep the model as busy as one large one. Outputs are written as
+inputs finish, and progress is checkpointed so a run that is killed picks
+up where it stopped when started again:
+
+- Files: each output is written under a temporary name and renamed when
+  complete, and finished inputs are appended to a checkpoint log in the
+  output directory. A rerun skips inputs logged as done (unless they
+  changed since).
+- JSONL: every output line is one finished record, flushed after each
+  window. A rerun skips as many input records as the output already holds.
+
+An input or record that cannot be translated is recorded as failed (in the
+checkpoint log, or as an error line of the JSONL output) and the run goes on
+with the rest; failures are listed in the run's statistics. A rerun does not
+retry failed files unless asked to (or they changed since).
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import logging
+import documents
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint log written to the output directory of a file run
+CHECKPOINT_FILE = ".bulk_checkpoint.jsonl"
+
+# Output format for each input format, unless one is chosen
+DEFAULT_OUTPUT_FORMATS = {".txt": ".txt", ".docx": ".docx", ".pdf": ".docx"}
+
+def find_inputs(patterns):
+    """
+    Expand glob patterns into input documents.
+
+    Args:
+        patterns (list): Glob patterns (``**`` matches any number of
+            directories) or paths of files or directories
+
+    Returns:
+        list: Sorted paths of .txt, .docx and .pdf files
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*")
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in documents.INPUT_FORMATS:
+                paths.add(os.path.normpath(path))
+    return sorted(paths)
+
+class _OpenFile:
+    """An input being translated, and the writer of its output"""
+
+    def __init__(self, path, relative_path, output_path):
+        self.path = path
+        self.relative_path = relative_path
+        self.output_path = output_path
+        base, extension = os.path.splitext(output_path)
+        self.partial_path = f"{base}.part{extension}"
+        self.writer = None
+        self.error = None
+        self.segments = 0
+
+class BulkTranslator:
+    """Translates many inputs with one translator, batching segments across inputs"""
+
+    def __init__(self, translator, target_language, source_language="english", max_chunk_tokens=256,
+                 max_length=1024, batch_size=8, window_segments=64):
+        """
+        Initialize the bulk translator.
+
+        Args:
+            translator (Translator): Loaded translator, shared by all inputs
+            target_language (str): Target language name
+            source_language (str): Source language name (default: "english")
+            max_chunk_tokens (int): Maximum tokens per chunk of a long paragraph
+            max_length (int): Maximum length for the model
+            batch_size (int): Chunks per model batch
+            window_segments (int): Segments (paragraphs, table cells or
+                records) translated together, across inputs
+        """
+        self.translator = translator
+        self.target_language = target_language
+        self.source_language = source_language
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.window_segments = window_segments
+
+    def _translate(self, blocks, target_language=None):
+        """Translate a window of blocks"""
+        return list(documents.translate_window(
+            self.translator, blocks, target_language or self.target_language, self.source_language,
+            max_chunk_tokens=self.max_chunk_tokens, max_length=self.max_length, batch_size=self.batch_size
+        ))
+
+    def _translate_owned(self, items, target_language=None):
+        """
+        Translate the blocks of ``(owner, block)`` items.
+
+        If the whole window fails, the blocks of each owner (input file or
+        record) are translated on their own, so one bad input only fails
+        itself.
+
+        Args:
+            items (list): ``(owner, block)`` pairs (items without a block
+                are passed over)
+            target_language (str, optional): Target language name (default:
+                the bulk translator's)
+
+        Returns:
+            tuple: ``(translated, errors)``: the translated block of each item
+            (None where there is none), and error messages by ``id(owner)``
+        """
+        positions = [i for i, (_, block) in enumerate(items) if block is not None]
+        translated = [None] * len(items)
+        errors = {}
+        try:
+            for i, block in zip(positions, self._translate([items[i][1] for i in positions], target_language)):
+                translated[i] = block
+            return translated, errors
+        except Exception as e:
+            logger.warning(f"Window of {len(positions)} segments failed ({str(e)}), retrying each input alone")
+
+        by_owner = {}
+        for i in positions:
+            by_owner.setdefault(id(items[i][0]), []).append(i)
+        for owner, owner_positions in by_owner.items():
+            try:
+                blocks = self._translate([items[i][1] for i in owner_positions], target_language)
+            except Exception as e:
+                errors[owner] = str(e)
+                continue
+            for i, block in zip(owner_positions, blocks):
+                translated[i] = block
+        return translated, errors
+
+    def _windows(self, items):
+        """
+        Group a stream of ``(owner, block)`` items into windows of about
+        window_segments segments (blocks without text ride along for free).
+        """
+        window = []
+        segments = 0
+        for item in items:
+            window.append(item)
+            if item[1] is not None:
+                segments += len(documents.block_texts(item[1]))
+            if segments >= self.window_segments:
+                yield window
+                window = []
+                segments = 0
+        if window:
+            yield window
+
+    def translate_files(self, paths, output_dir, input_root=None, output_format=None, retry_failed=False):
+        """
+        Translate documents into an output directory tree.
+
+        Each input is written to the same relative path under output_dir
+        (with the output format's extension). Inputs already translated by an
+        earlier run, according to the checkpoint log, are skipped, and so are
+        inputs that failed in an earlier run unless retry_failed is set.
+
+        Args:
+            paths (list): Input documents (.txt, .docx or .pdf)
+            output_dir (str): Directory for the translations (and the checkpoint log)
+            input_root (str, optional): Directory the relative output paths
+                are taken from (default: the inputs' common directory)
+            output_format (str, optional): '.txt' or '.docx' for every output
+                (default: .txt for text inputs, .docx for Word and PDF)
+            retry_failed (bool): Translate inputs that failed in an earlier
+                run again
+
+        Returns:
+            dict: Counts of translated, skipped and failed files and segments,
+            the failures (``{"input", "error"}``, earlier runs' included) and
+            elapsed seconds
+        """
+        if output_format is not None and output_format not in documents.OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format '{output_format}'. "
+                             f"Choose from: {', '.join(documents.OUTPUT_FORMATS)}")
+        # Earlier outputs are not inputs, even if the input pattern matches them
+        output_root = os.path.abspath(output_dir) + os.sep
+        paths = [path for path in paths if not os.path.abspath(path).startswith(output_root)]
+        if input_root is None and paths:
+            input_root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+
+        os.makedirs(output_dir, exist_ok=True)
+        checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        done, failed = self._read_checkpoint(checkpoint_path)
+
+        stats = {'files': 0, 'skipped': 0, 'failed': 0, 'segments': 0, 'failures': []}
+        start_time = time.time()
+
+        pending = []
+        for path in paths:
+            relative_path = os.path.relpath(os.path.abspath(path), input_root)
+            base, extension = os.path.splitext(relative_path)
+            output_path = os.path.join(output_dir, base + (output_format or DEFAULT_OUTPUT_FORMATS[extension.lower()]))
+            signature = self._signature(path)
+            if done.get(relative_path) == signature and os.path.exists(output_path):
+                stats['skipped'] += 1
+                continue
+            if not retry_failed and relative_path in failed and failed[relative_path]['signature'] == signature:
+                stats['failed'] += 1
+                stats['failures'].append({'input': relative_path, 'error': failed[relative_path]['error']})
+                continue
+            pending.append(_OpenFile(path, relative_path, output_path))
+
+        if stats['skipped']:
+            logger.info(f"Resuming: {stats['skipped']} of {len(paths)} files already translated")
+        if stats['failed']:
+            logger.info(f"Skipping {stats['failed']} files that failed in an earlier run")
+
+        with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+            for window in self._windows(self._file_blocks(pending)):
+                translated, errors = self._translate_owned(window)
+
+                for (open_file, block), translated_block in zip(window, translated):
+                    if open_file.error is None and id(open_file) in errors:
+                        logger.error(f"Could not translate {open_file.path}: {errors[id(open_file)]}")
+                        open_file.error = errors[id(open_file)]
+                        self._discard_output(open_file)
+                    if block is not None:
+                        if open_file.error is None:
+                            open_file.writer.write(translated_block)
+                        continue
+
+                    # End of this input: publish its output and log it as done (or failed)
+                    if open_file.error is not None:
+                        checkpoint.write(json.dumps({'input': open_file.relative_path,
+                                                     'signature': self._signature(open_file.path),
+                                                     'error': open_file.error}) + "\n")
+                        checkpoint.flush()
+                        stats['failed'] += 1
+                        stats['failures'].append({'input': open_file.relative_path, 'error': open_file.error})
+                        continue
+                    open_file.writer.close()
+                    os.replace(open_file.partial_path, open_file.output_path)
+                    checkpoint.write(json.dumps({'input': open_file.relative_path,
+                                                 'signature': self._signature(open_file.path)}) + "\n")
+                    checkpoint.flush()
+                    stats['files'] += 1
+                    stats['segments'] += open_file.segments
+                    logger.info(f"Translated {open_file.relative_path} ({stats['files']}/{len(pending)})")
+
+        if stats['failures']:
+            logger.error(f"{len(stats['failures'])} files could not be translated:")
+            for failure in stats['failures']:
+                logger.error(f"  {failure['input']}: {failure['error']}")
+
+        stats['elapsed_seconds'] = time.time() - start_time
+        return stats
+
+    @staticmethod
+    def _discard_output(open_file):
+        """Close and remove the partial output of an input that failed"""
+        if open_file.writer is not None:
+            try:
+                open_file.writer.close()
+            except Exception:
+                pass
+        if os.path.exists(open_file.partial_path):
+            os.remove(open_file.partial_path)
+
+    def _file_blocks(self, open_files):
+        """
+        Stream ``(file, block)`` items across inputs, with ``(file, None)``
+        marking the end of each input. An input that cannot be read is
+        reported and its partial output removed.
+        """
+        for open_file in open_files:
+            try:
+                os.makedirs(os.path.dirname(open_file.output_path) or ".", exist_ok=True)
+                open_file.writer = documents.open_writer(open_file.partial_path)
+                for block in documents.read_document(open_file.path):
+                    if open_file.error is not None:
+                        # Failed to translate; don't read the rest
+                        break
+                    open_file.segments += len(documents.block_texts(block))
+                    yield open_file, block
+            except (OSError, ValueError, ImportError) as e:
+                logger.error(f"Could not read {open_file.path}: {str(e)}")
+                open_file.error = str(e)
+                self._discard_output(open_file)
+            yield open_file, None
+
+    @staticmethod
+    def _signature(path):
+        """Size and modification time of an input, to notice inputs changed since they were translated"""
+        stat = os.stat(path)
+        return [stat.st_size, int(stat.st_mtime)]
+
+    @staticmethod
+    def _read_checkpoint(path):
+        """
+        Read the checkpoint log (a torn last line is ignored). The latest
+        entry of an input wins.
+
+        Returns:
+            tuple: ``(done, failed)``: relative path -> signature of inputs
+            logged as translated, and relative path -> ``{"signature",
+            "error"}`` of inputs logged as failed
+        """
+        done = {}
+        failed = {}
+        if not os.path.exists(path):
+            return done, failed
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if 'error' in entry:
+                    done.pop(entry['input'], None)
+                    failed[entry['input']] = {'signature': entry['signature'], 'error': entry['error']}
+                else:
+                    failed.pop(entry['input'], None)
+                    done[entry['input']] = entry['signature']
+        return done, failed
+
+    def translate_jsonl(self, input_path, output_path):
+        """
+        Translate a JSONL stream of records.
+
+        Each input line is an object with ``text`` and optionally ``id`` and
+        ``target_language`` (overriding the default target). Each output line
+        is ``{"id", "target_language", "translation"}`` (or ``"error"`` instead
+        of the translation for a record that failed), in input order. If the
+        output already holds records from an earlier run, that many input
+        records are skipped.
+
+        Args:
+            input_path (str): JSONL file, or '-' for standard input
+            output_path (str): JSONL file to append the translations to
+
+        Returns:
+            dict: Counts of translated, skipped and failed records and
+            segments, the failures of this run (``{"id", "error"}``) and
+            elapsed seconds
+        """
+        completed, last_id = self._resume_jsonl(output_path)
+        stats = {'records': 0, 'skipped': completed, 'failed': 0, 'segments': 0, 'failures': []}
+        start_time = time.time()
+
+        if completed:
+            logger.info(f"Resuming: {completed} records already translated")
+
+        source = sys.stdin if input_path == "-" else open(input_path, 'r', encoding='utf-8')
+        try:
+            with open(output_path, 'a', encoding='utf-8') as output:
+                for window in self._windows(self._records(source, completed, last_id)):
+                    self._write_records(window, output, stats)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        if stats['failures']:
+            logger.error(f"{len(stats['failures'])} records could not be translated:")
+            for failure in stats['failures']:
+                logger.error(f"  {failure['id']}: {failure['error']}")
+
+        stats['elapsed_seconds'] = time.time() - start_time
+        return stats
+
+    def _records(self, source, skip, last_id):
+        """Stream ``(record, block)`` items from JSONL lines, after the first skip records"""
+        number = 0
+        for line in source:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = {'error': f"Invalid JSON: {str(e)}"}
+            if not isinstance(record, dict):
+                record = {'error': "Record is not a JSON object"}
+            record.setdefault('id', number)
+
+            if number <= skip:
+                if number == skip and record['id'] != last_id:
+                    raise ValueError(f"Output does not match the input: record {number} is "
+                                     f"{record['id']!r} in the input but {last_id!r} in the output")
+                continue
+
+            target_language = record.get('target_language', self.target_language)
+            if 'error' not in record and target_language not in self.translator.language_codes:
+                record['error'] = f"Target language '{target_language}' not supported"
+            if 'error' not in record and not isinstance(record.get('text'), str):
+                record['error'] = "No text provided"
+            record['target_language'] = target_language
+
+            block = None if 'error' in record else documents.Block("paragraph", record['text'])
+            yield record, block
+
+    def _write_records(self, window, output, stats):
+        """Translate a window of records (grouped by target language) and append them in order"""
+        translations = {}
+        by_language = {}
+        for position, (record, block) in enumerate(window):
+            if block is not None:
+                by_language.setdefault(record['target_language'], []).append(position)
+
+        for target_language, positions in by_language.items():
+            translated, errors = self._translate_owned([window[position] for position in positions], target_language)
+            for position, block in zip(positions, translated):
+                record = window[position][0]
+                if id(record) in errors:
+                    record['error'] = f"Translation failed: {errors[id(record)]}"
+                else:
+                    translations[position] = block.text
+
+        for position, (record, block) in enumerate(window):
+            result = {'id': record['id'], 'target_language': record['target_language']}
+            if 'error' in record:
+                result['error'] = record['error']
+                stats['failed'] += 1
+                stats['failures'].append({'id': record['id'], 'error': record['error']})
+            else:
+                result['translation'] = translations[position]
+                stats['records'] += 1
+                stats['segments'] += len(documents.block_texts(block))
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+        output.flush()
+        os.fsync(output.fileno())
+
+    @staticmethod
+    def _resume_jsonl(output_path):
+        """
+        Count the records already in an output file, cutting off a line
+        torn by a kill.
+
+        Returns:
+            tuple: ``(records, id of the last record)``
+        """
+        if not os.path.exists(output_path):
+            return 0, None
+
+        records = 0
+        last_id = None
+        valid_bytes = 0
+        with open(output_path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    last_id = json.loads(line)['id']
+                except (ValueError, KeyError):
+                    break
+                records += 1
+                valid_bytes += len(line)
+
+        if valid_bytes < os.path.getsize(output_path):
+            logger.warning(f"Dropping an incomplete record at the end of {output_path}")
+            with open(output_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+        return records, last_id
@@ -0,0 +1,284 @@
+"""
+Two-tier translation cache.
+
+Translations are kept in an in-process LRU bounded by bytes, backed by a
+SQLite database on disk so cached segments survive restarts. The disk tier
+is bounded by entry count; the oldest entries are evicted first.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from utils import normalize_segment
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry bookkeeping cost (dict slot, OrderedDict links, str headers)
+_ENTRY_OVERHEAD_BYTES = 200
+
+# Share of max_disk_entries kept when the disk tier is trimmed, so trimming
+# runs once per many writes rather than on every one
+_DISK_TRIM_RATIO = 0.9
+
+def make_cache_key(segment, source_code, target_code, model_name, generation_params=None):
+    """
+    Build the cache key for a segment.
+
+    Args:
+        segment (str): Source text
+        source_code (str): MBart source language code (e.g. "en_XX")
+        target_code (str): MBart target language code (e.g. "hi_IN")
+        model_name (str): Name of the translation model
+        generation_params (dict, optional): Parameters that change the output
+
+    Returns:
+        str: Hex digest identifying the translation
+    """
+    payload = json.dumps(
+        [normalize_segment(segment), source_code, target_code, model_name, generation_params or {}],
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class TranslationCache:
+    """
+    Cache of finished translations keyed by :func:`make_cache_key`.
+
+    Lookups check the in-memory LRU first and fall back to the SQLite store;
+    disk hits are promoted into memory. All methods are thread-safe; the
+    disk tier has its own lock, so memory hits never wait for a disk write,
+    and a cache inherited by a forked worker reopens its own database
+    connection. Errors from the disk tier are logged and treated as misses,
+    so a busy or broken store never fails a translation.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, db_path=None, max_disk_entries=1000000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes (int): Memory budget for the in-process LRU
+            db_path (str, optional): SQLite file for the persistent tier
+                (no persistent tier if None)
+            max_disk_entries (int, optional): Entries kept in the persistent
+                tier (None for no limit)
+        """
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'disk_evictions': 0
+        }
+
+        self._db = None
+        self._db_pid = None
+        # Entries in the disk tier (approximate when workers share the file)
+        self._disk_entries = 0
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        """Open (and create if needed) the SQLite store"""
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # Several worker processes may share the file, so wait on locks
+        self._db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._db_pid = os.getpid()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # With WAL, commits don't wait for fsync; a crash can lose only the
+        # latest writes, which are cache entries
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, translation TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS translations_created_at ON translations (created_at)")
+        self._db.commit()
+        self._disk_entries = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        logger.info(f"Translation cache store opened: {self.db_path} ({self._disk_entries} entries)")
+
+    def _connection(self):
+        """SQLite connection for this process (None without a disk tier). Must hold the disk lock."""
+        if self._db is not None and self._db_pid != os.getpid():
+            # Connections must not be shared across fork(); open our own
+            self._open_db()
+        return self._db
+
+    @staticmethod
+    def _entry_size(key, translation):
+        """Approximate memory used by one entry"""
+        return len(key) + len(translation.encode("utf-8")) + _ENTRY_OVERHEAD_BYTES
+
+    def get(self, key):
+        """
+        Look up a translation.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            str or None: Cached translation, or None on a miss
+        """
+        with self._lock:
+            translation = self._entries.get(key)
+            if translation is not None:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                metrics.CACHE_LOOKUPS.labels(result="memory_hit").inc()
+                return translation
+
+        row = None
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT translation FROM translations WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Translation cache read error: {str(e)}")
+
+        with self._lock:
+            if row is not None:
+                self._stats['disk_hits'] += 1
+                metrics.CACHE_LOOKUPS.labels(result="disk_hit").inc()
+                self._remember(key, row[0])
+                return row[0]
+
+            self._stats['misses'] += 1
+            metrics.CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+
+    def put(self, key, translation):
+        """
+        Store a translation in both tiers.
+
+        Args:
+            key (str): Cache key
+            translation (str): Translated text
+        """
+        self.put_many([(key, translation)])
+
+    def put_many(self, items):
+        """
+        Store several translations, writing them to disk in one transaction.
+
+        Args:
+            items (list): ``(key, translation)`` pairs (None translations
+                are skipped)
+        """
+        items = [(key, translation) for key, translation in items if translation is not None]
+        if not items:
+            return
+
+        with self._lock:
+            for key, translation in items:
+                self._remember(key, translation)
+
+        with self._db_lock:
+            db = self._connection()
+            if db is None:
+                return
+            now = time.time()
+            try:
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO translations (key, translation, created_at) VALUES (?, ?, ?)",
+                        [(key, translation, now) for key, translation in items]
+                    )
+                # Replaced keys are counted too; trimming recounts
+                self._disk_entries += len(items)
+                if self.max_disk_entries is not None and self._disk_entries > self.max_disk_entries:
+                    self._trim_disk(db)
+            except sqlite3.Error as e:
+                logger.warning(f"Translation cache write error: {str(e)}")
+
+    def _trim_disk(self, db):
+        """Evict the oldest disk entries down to a share of the limit. Must hold the disk lock."""
+        self._disk_entries = db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if self._disk_entries <= self.max_disk_entries:
+            return
+
+        excess = self._disk_entries - int(self.max_disk_entries * _DISK_TRIM_RATIO)
+        with db:
+            db.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY created_at, rowid LIMIT ?)",
+                (excess,)
+            )
+        self._disk_entries -= excess
+        with self._lock:
+            self._stats['disk_evictions'] += excess
+        logger.debug(f"Evicted {excess} entries from the translation cache store")
+
+    def _remember(self, key, translation):
+        """Insert into the LRU and evict old entries. Must hold the lock."""
+        size = self._entry_size(key, translation)
+        if size > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= self._entry_size(key, previous)
+
+        self._entries[key] = translation
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            old_key, old_translation = self._entries.popitem(last=False)
+            self._bytes -= self._entry_size(old_key, old_translation)
+            self._stats['evictions'] += 1
+
+    def clear(self):
+        """Remove every entry from both tiers (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM translations")
+                db.commit()
+                self._disk_entries = 0
+
+    def stats(self):
+        """
+        Get cache counters and sizes.
+
+        Returns:
+            dict: Hit/miss/eviction counters and current sizes
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+            stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+            stats['memory_entries'] = len(self._entries)
+            stats['memory_bytes'] = self._bytes
+            stats['memory_max_bytes'] = self.max_bytes
+
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                stats['disk_entries'] = db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+                stats['disk_max_entries'] = self.max_disk_entries
+
+        return stats
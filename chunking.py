@@ -0,0 +1,176 @@
+"""
+Sentence-aware chunking of large texts.
+
+Text is split into lines and sentences, and sentences are packed into chunks
+up to a token budget. Every chunk remembers the whitespace that followed it
+in the original, so translated chunks can be stitched back together with the
+original line and paragraph structure.
+"""
+
+import re
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# A piece of text to translate, and the whitespace that follows it
+Chunk = namedtuple("Chunk", ["text", "separator"])
+
+# Line breaks (with any surrounding whitespace) are structural boundaries
+_LINE_BREAK_RE = re.compile(r"[ \t\r\f\v]*\n\s*")
+
+# Sentence end: terminal punctuation, optional closing quotes/brackets, then
+# whitespace followed by something that does not start with a lowercase letter
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…।])[\"'”’)\]]*\s+(?=[^a-z\s])")
+
+# Abbreviations whose trailing period does not end a sentence
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "no", "nos", "fig",
+    "figs", "vs", "etc", "inc", "ltd", "co", "corp", "dept", "approx", "rs"
+}
+
+def split_lines(text):
+    """
+    Split text on line breaks, keeping the breaks.
+
+    Args:
+        text (str): Text to split
+
+    Returns:
+        list: ``(line, separator)`` pairs, where separator is the whitespace
+        (including line breaks) that followed the line
+    """
+    lines = []
+    position = 0
+    text = text.lstrip()
+
+    for match in _LINE_BREAK_RE.finditer(text):
+        line = text[position:match.start()]
+        if line.strip():
+            lines.append((line.strip(), match.group()))
+        elif lines:
+            # Blank line: fold its whitespace into the previous separator
+            lines[-1] = (lines[-1][0], lines[-1][1] + match.group())
+        position = match.end()
+
+    tail = text[position:]
+    if tail.strip():
+        stripped = tail.rstrip()
+        lines.append((stripped.strip(), tail[len(stripped):]))
+    elif lines:
+        lines[-1] = (lines[-1][0], lines[-1][1] + tail)
+
+    return lines
+
+def split_sentences(text):
+    """
+    Split a line of text into sentences.
+
+    Args:
+        text (str): Text without line breaks
+
+    Returns:
+        list: Sentences, without surrounding whitespace
+    """
+    sentences = []
+    position = 0
+
+    for match in _SENTENCE_END_RE.finditer(text):
+        words = text[position:match.start()].split()
+        if words and words[-1].rstrip(".").lower() in _ABBREVIATIONS:
+            continue
+
+        # Keep closing quotes/brackets with the sentence they end
+        end = match.start() + len(match.group().rstrip())
+        sentences.append(text[position:end].strip())
+        position = match.end()
+
+    sentences.append(text[position:].strip())
+    return [sentence for sentence in sentences if sentence]
+
+def _split_long_sentence(sentence, max_tokens, count_tokens):
+    """Split a sentence that exceeds the budget on word boundaries"""
+    pieces = []
+    words = []
+    used = 0
+
+    for word in sentence.split():
+        word_tokens = count_tokens(word)
+        if words and used + word_tokens > max_tokens:
+            pieces.append(" ".join(words))
+            words = []
+            used = 0
+        words.append(word)
+        used += word_tokens
+
+    if words:
+        pieces.append(" ".join(words))
+
+    return pieces
+
+def chunk_text(text, max_tokens, count_tokens=None, pack=True):
+    """
+    Split text into chunks of whole sentences that fit a token budget.
+
+    Sentences are never merged across line breaks, and a sentence is only
+    broken up (on word boundaries) if it alone exceeds the budget. Chunks do
+    not overlap, so no text is translated twice.
+
+    Args:
+        text (str): Text to split
+        max_tokens (int): Maximum tokens per chunk
+        count_tokens (callable, optional): Function returning the token count
+            of a string (default: number of whitespace-separated words)
+        pack (bool): Pack consecutive sentences into chunks (False: one
+            chunk per sentence)
+
+    Returns:
+        list: List of :class:`Chunk`
+    """
+    if count_tokens is None:
+        count_tokens = lambda segment: len(segment.split())
+
+    chunks = []
+
+    for line, line_separator in split_lines(text):
+        pieces = []
+        for sentence in split_sentences(line):
+            sentence_tokens = count_tokens(sentence)
+            if sentence_tokens > max_tokens:
+                pieces.extend((piece, count_tokens(piece))
+                              for piece in _split_long_sentence(sentence, max_tokens, count_tokens))
+            else:
+                pieces.append((sentence, sentence_tokens))
+
+        # Greedily pack consecutive pieces of this line into chunks
+        current = []
+        used = 0
+        for piece, piece_tokens in pieces:
+            if current and (not pack or used + piece_tokens > max_tokens):
+                chunks.append(Chunk(" ".join(current), " "))
+                current = []
+                used = 0
+            current.append(piece)
+            used += piece_tokens
+
+        if current:
+            chunks.append(Chunk(" ".join(current), line_separator))
+
+    logger.debug(f"Split text into {len(chunks)} chunks")
+    return chunks
+
+def reassemble(chunks, translations):
+    """
+    Join translated chunks back together with the original separators.
+
+    Args:
+        chunks (list): Chunks returned by :func:`chunk_text`
+        translations (list): Translation of each chunk
+
+    Returns:
+        str: Combined translation
+    """
+    return "".join(
+        translation.strip() + chunk.separator
+        for chunk, translation in zip(chunks, translations)
+    ).rstrip()
@@ -0,0 +1,168 @@
+"""
+Script to compare model precision modes (fp32, bf16, int8).
+
+Each precision is measured in its own process so memory numbers are not
+mixed up. Reports load time, translation latency, resident memory and how
+closely each mode's output agrees with fp32.
+"""
+
+import argparse
+import difflib
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import time
+from utils import setup_logging
+
+# Set up logging
+setup_logging(log_level="INFO")
+logger = logging.getLogger(__name__)
+
+TEST_TEXTS = [
+    "Hello, how are you? This is a test of the translation system.",
+    "The quarterly report shows a 12% increase in revenue compared to last year.",
+    "Students are expected to submit their assessments before the end of the term.",
+    "Please review the attached document and share your feedback by Friday.",
+    "The committee approved the new budget after a long discussion about priorities."
+]
+
+def measure_precision(model_name, precision, target_language, quantized_model_path=None, repeats=3):
+    """
+    Load a translator in the given precision and time the test texts.
+
+    Args:
+        model_name (str): Model to load
+        precision (str): Precision mode
+        target_language (str): Target language for the test texts
+        quantized_model_path (str, optional): Saved int8 model location
+        repeats (int): Number of timed passes over the test texts
+
+    Returns:
+        dict: Load time, latencies, memory usage and translations
+    """
+    from translator import Translator
+    from utils import get_process_memory
+
+    start_time = time.perf_counter()
+    translator = Translator(model_name=model_name, device="cpu", precision=precision,
+                            quantized_model_path=quantized_model_path)
+    load_time = time.perf_counter() - start_time
+    rss_after_load = get_process_memory()['rss_mb']
+
+    # Warm-up pass (not timed)
+    translations = [translator.translate(text, target_language) for text in TEST_TEXTS]
+
+    latencies = []
+    for _ in range(repeats):
+        for text in TEST_TEXTS:
+            start_time = time.perf_counter()
+            translator.translate(text, target_language)
+            latencies.append(time.perf_counter() - start_time)
+
+    memory = get_process_memory()
+    return {
+        'precision': precision,
+        'load_time_s': load_time,
+        'latency_mean_s': statistics.mean(latencies),
+        'latency_median_s': statistics.median(latencies),
+        'rss_after_load_mb': rss_after_load,
+        'peak_rss_mb': memory['peak_rss_mb'],
+        'translations': translations
+    }
+
+def agreement(reference, candidate):
+    """
+    Compare translations against the fp32 reference.
+
+    Args:
+        reference (list): fp32 translations
+        candidate (list): Translations to compare
+
+    Returns:
+        dict: Exact match rate and mean word-level similarity
+    """
+    exact = sum(1 for a, b in zip(reference, candidate) if a == b)
+    similarity = [
+        difflib.SequenceMatcher(None, (a or "").split(), (b or "").split()).ratio()
+        for a, b in zip(reference, candidate)
+    ]
+    return {
+        'exact_match_rate': exact / len(reference),
+        'word_similarity': statistics.mean(similarity)
+    }
+
+def run_in_subprocess(args, precision):
+    """Measure one precision in a fresh interpreter and return its results"""
+    command = [
+        sys.executable, __file__,
+        "--worker", precision,
+        "--model", args.model,
+        "--language", args.language,
+        "--repeats", str(args.repeats)
+    ]
+    if args.quantized_model_path:
+        command += ["--quantized-model-path", args.quantized_model_path]
+
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        logger.error(f"{precision} run failed:\n{completed.stderr}")
+        return None
+
+    # The worker prints its JSON result as the last line of stdout
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compare model precision modes")
+    parser.add_argument("--model", default="facebook/mbart-large-50-many-to-many-mmt", help="Model to load")
+    parser.add_argument("--language", choices=["hindi", "tamil", "malayalam", "telugu"], default="hindi",
+                        help="Target language for testing")
+    parser.add_argument("--precisions", nargs="+", choices=["fp32", "bf16", "int8"],
+                        default=["fp32", "bf16", "int8"], help="Precision modes to compare")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed passes over the test texts")
+    parser.add_argument("--quantized-model-path", help="Load/save the int8 model here")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--worker", choices=["fp32", "bf16", "int8"], help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        result = measure_precision(args.model, args.worker, args.language,
+                                   args.quantized_model_path, args.repeats)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    precisions = args.precisions if "fp32" in args.precisions else ["fp32"] + args.precisions
+    results = {}
+    for precision in precisions:
+        logger.info(f"Measuring {precision}")
+        result = run_in_subprocess(args, precision)
+        if result:
+            results[precision] = result
+
+    if "fp32" not in results:
+        logger.error("fp32 reference run failed; cannot compare output agreement")
+        sys.exit(1)
+
+    reference = results["fp32"]["translations"]
+    for result in results.values():
+        result.update(agreement(reference, result["translations"]))
+
+    print()
+    print(f"{'precision':<10}{'load (s)':>10}{'mean (s)':>10}{'median (s)':>12}"
+          f"{'RSS (MB)':>10}{'peak (MB)':>11}{'exact':>8}{'similar':>9}")
+    print("-" * 80)
+    for precision, result in results.items():
+        print(f"{precision:<10}{result['load_time_s']:>10.2f}{result['latency_mean_s']:>10.3f}"
+              f"{result['latency_median_s']:>12.3f}{result['rss_after_load_mb']:>10.0f}"
+              f"{result['peak_rss_mb']:>11.0f}{result['exact_match_rate']:>8.0%}{result['word_similarity']:>9.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        logger.info(f"Results saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Building blocks for running one translator from many threads.
+
+- Tokenizers: a Hugging Face fast tokenizer keeps its truncation and
+  padding settings as mutable state, so a single instance used by two
+  threads at once can fail ("Already borrowed") or apply the other
+  thread's settings. :class:`TokenizerPool` hands each thread its own
+  instance.
+- Model execution: :class:`ModelSlots` bounds how many threads run the
+  model at the same time. Tokenizing, cache lookups and detokenizing
+  happen outside a slot, so request threads prepare the next batch while
+  another one runs.
+- Threads: with several slots, each model call should get only its share of
+  the cores, or the slots fight over them (see :func:`configure_torch_threads`).
+"""
+
+import os
+import copy
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class TokenizerPool:
+    """A fixed set of tokenizer instances, each used by one thread at a time"""
+
+    def __init__(self, tokenizer, size=4):
+        """
+        Initialize the pool.
+
+        Args:
+            tokenizer: Tokenizer to pool (copies of it are added)
+            size (int): Number of instances
+        """
+        self.size = max(1, size)
+        self._idle = queue.Queue()
+        self._idle.put(tokenizer)
+        for _ in range(self.size - 1):
+            self._idle.put(copy.deepcopy(tokenizer))
+
+    @contextmanager
+    def acquire(self):
+        """Borrow a tokenizer, waiting for one to be returned if all are in use"""
+        tokenizer = self._idle.get()
+        try:
+            yield tokenizer
+        finally:
+            self._idle.put(tokenizer)
+
+class ModelSlots:
+    """Limits how many threads run the model at the same time"""
+
+    def __init__(self, slots=1):
+        """
+        Initialize the slots.
+
+        Args:
+            slots (int): Model calls allowed to run at once
+        """
+        self.slots = max(1, slots)
+        self._semaphore = threading.BoundedSemaphore(self.slots)
+
+    @contextmanager
+    def acquire(self):
+        """Hold a slot while running the model"""
+        start_time = time.perf_counter()
+        with self._semaphore:
+            metrics.MODEL_SLOT_WAIT_SECONDS.observe(time.perf_counter() - start_time)
+            yield
+
+def configure_torch_threads(slots=1, intra_op_threads=None, inter_op_threads=1, cores=None):
+    """
+    Set torch's thread pools for a process serving with several model slots.
+
+    Every thread running the model uses the intra-op thread count (threads
+    inside a single matrix multiply), so the cores are divided between the
+    slots rather than oversubscribed. Inter-op parallelism is of little use
+    for a sequential decoder and is kept at one thread by default.
+
+    Args:
+        slots (int): Model slots of the process
+        intra_op_threads (int, optional): Intra-op threads per slot
+            (default: cores divided between the slots)
+        inter_op_threads (int, optional): Inter-op threads (None leaves
+            torch's default)
+        cores (int, optional): Cores available to the process (default:
+            all cores)
+
+    Returns:
+        int: Intra-op threads per slot
+    """
+    import torch
+
+    if intra_op_threads is None:
+        intra_op_threads = max(1, (cores or os.cpu_count() or 1) // max(1, slots))
+    torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Can only be set before torch runs any parallel work (e.g. in
+            # workers forked after warm-up)
+            logger.debug(f"torch inter-op threads already fixed at {torch.get_num_interop_threads()}")
+    return intra_op_threads
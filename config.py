@@ -3,7 +3,6 @@ Configuration settings for the translation tool.
 """
 
 import os
-import torch
 
 # Application settings
 APP_NAME = "Multilingual Report Translator"
@@ -11,14 +10,27 @@ APP_VERSION = "1.0.0"
 DEBUG = True
 HOST = "0.0.0.0"
 PORT = 5000
+WORKERS = 1  # more than 1 serves with pre-forked workers sharing the model
+THREADS_PER_WORKER = None  # torch threads per worker (None: CPU cores / WORKERS)
+MODEL_SLOTS = 1  # model calls run at once per worker, each with THREADS_PER_WORKER / MODEL_SLOTS torch threads
+TOKENIZER_POOL_SIZE = 4  # tokenizer instances per worker (one per thread tokenizing at the same time)
+INTER_OP_THREADS = 1  # torch inter-op threads (None for the torch default)
 
 # Model settings
 MODEL_NAME = "facebook/mbart-large-50-many-to-many-mmt"
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+DEVICE = None  # "cuda" or "cpu" (None: cuda when available)
 MAX_LENGTH = 1024
 BATCH_SIZE = 8
-CHUNK_SIZE = 500
-OVERLAP = 50
+MAX_BATCH_TOKENS = 4096  # padded tokens per batch (None for no limit)
+CHUNK_MAX_TOKENS = 256  # token budget per chunk for large texts
+PRECISION = "fp32"  # "fp32", "bf16", or "int8" (dynamic quantization, CPU only)
+INFERENCE_BACKEND = "torch"  # "torch" or "onnx" (ONNX Runtime, fp32 only)
+ONNX_NUM_THREADS = None  # ONNX Runtime intra-op threads (None for the runtime default)
+
+# Startup settings (the server loads and warms up the model before /ready reports ready)
+WARMUP_ENABLED = True  # False loads the model on the first translation request instead
+WARMUP_RUNS = 2  # warm-up rounds per target language
+WARMUP_MAX_LENGTH = 64
 
 # Supported languages
 SUPPORTED_LANGUAGES = {
@@ -34,9 +46,17 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+JOBS_DIR = os.path.join(BASE_DIR, "jobs")
+REVISIONS_DIR = os.path.join(BASE_DIR, "revisions")  # saved documents for incremental re-translation
+PRUNED_MODEL_DIR = None  # vocabulary-pruned model from prune_vocab.py, served instead of MODEL_NAME
+# The int8 and ONNX copies are kept with the model they were made from
+QUANTIZED_MODEL_PATH = os.path.join(PRUNED_MODEL_DIR or MODELS_DIR, "mbart-large-50-int8.pt")  # None to re-quantize on every start
+ONNX_MODEL_DIR = os.path.join(PRUNED_MODEL_DIR or MODELS_DIR, "mbart-large-50-onnx")  # None to re-export on every start
 
 # Ensure directories exist
-for directory in [TEMPLATES_DIR, STATIC_DIR, LOGS_DIR]:
+for directory in [TEMPLATES_DIR, STATIC_DIR, LOGS_DIR, CACHE_DIR, MODELS_DIR, JOBS_DIR, REVISIONS_DIR]:
     os.makedirs(directory, exist_ok=True)
 
 # Logging settings
@@ -45,4 +65,42 @@ LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_FILE = os.path.join(LOGS_DIR, "translator.log")
 
 # API settings
-API_TIMEOUT = 300  # seconds 
\ No newline at end of file
+API_TIMEOUT = 300  # seconds
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024  # largest document accepted by /translate_document
+
+# Document translation settings (PDF/DOCX/text files)
+DOCUMENT_WINDOW_SEGMENTS = 64  # paragraphs/table cells translated together
+
+# Tracing settings (per-request spans and profiles, requested with the X-Trace header)
+TRACING_ENABLED = False
+TRACE_TOKEN = None  # if set, traced requests must also send it in the X-Trace-Token header
+TRACES_DIR = os.path.join(LOGS_DIR, "traces")
+TRACES_MAX = 100  # traces kept in TRACES_DIR; the oldest are deleted
+
+# Background job settings (POST /jobs)
+JOB_WORKERS = 1  # jobs translated at the same time per process
+
+# Scheduler settings (dynamic micro-batching of concurrent /translate requests)
+SCHEDULER_ENABLED = True
+SCHEDULER_MODE = "micro"  # "micro" or "continuous" (continuous batching engine, greedy, torch backend only)
+SCHEDULER_MAX_WAIT_MS = 10
+SCHEDULER_MAX_BATCH_TOKENS = 4096
+SCHEDULER_MAX_BATCH_SIZE = 16  # also the running-set size of the continuous engine
+# Translation cache settings
+CACHE_ENABLED = True
+CACHE_MAX_BYTES = 64 * 1024 * 1024  # in-memory LRU budget
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "translations.sqlite3")  # None to disable the disk tier
+CACHE_MAX_DISK_ENTRIES = 1000000  # oldest entries are evicted beyond this (None for no limit)
+
+# Translation memory settings (near-duplicate segments with changed numbers/dates)
+MEMORY_ENABLED = True
+MEMORY_DB_PATH = os.path.join(CACHE_DIR, "translation_memory.sqlite3")  # None to keep it in memory only
+MEMORY_MIN_SIMILARITY = 0.8  # similarity of the masked texts for a stored segment to count as a match
+MEMORY_MAX_ENTRIES = 1000000  # oldest segments are evicted beyond this (None for no limit)
+
+# Generation settings
+GENERATION_PROFILE = "quality"  # default decoding profile: "fast" (greedy), "balanced" (2 beams) or "quality" (5 beams)
+LENGTH_MARGIN = 1.3  # output length budget = input tokens * learned ratio * margin (+ 16 tokens)
+LENGTH_STATS_PATH = os.path.join(CACHE_DIR, "output_lengths.json")  # None to relearn the ratios on every start
+DRAFT_MODEL_PATH = None  # small seq2seq model sharing the tokenizer, for speculative decoding of "fast" requests
+DRAFT_NUM_TOKENS = 4  # tokens the draft model proposes per pass of the translation model
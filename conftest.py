@@ -0,0 +1,69 @@
+"""
+Shared test fixtures.
+
+The tests run offline against the tiny random MBart that benchmark.py
+builds, so they check the serving logic, not translation quality.
+"""
+
+import pytest
+
+from benchmark import build_tiny_model
+
+# Manual scripts that need the full model or a running server
+collect_ignore = ["test_translator.py", "test_api.py"]
+
+@pytest.fixture(scope="session")
+def tiny_model(tmp_path_factory):
+    """Path of the tiny MBart checkpoint (built once per test session)"""
+    return build_tiny_model(str(tmp_path_factory.mktemp("tiny-mbart")))
+
+@pytest.fixture
+def translator(tiny_model):
+    """Translator over the tiny model, decoding greedily by default"""
+    from translator import Translator
+    return Translator(model_name=tiny_model, device="cpu", profile="fast")
+
+@pytest.fixture
+def record_calls(monkeypatch):
+    """
+    Wrap a method so every call is recorded before it runs.
+
+    ``calls = record_calls(translator, "translate")`` records the first
+    argument of each call (lists are copied); ``record`` receives the
+    call's arguments and returns what to record instead.
+    """
+    def wrap(target, name, record=None):
+        calls = []
+        method = getattr(target, name)
+
+        def recording(*args, **kwargs):
+            if record is not None:
+                calls.append(record(*args, **kwargs))
+            else:
+                calls.append(list(args[0]) if isinstance(args[0], list) else args[0])
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(target, name, recording)
+        return calls
+
+    return wrap
+
+@pytest.fixture
+def served_app(translator, monkeypatch, tmp_path):
+    """The app serving the tiny translator, with fresh lazy globals"""
+    import app as app_module
+    import config
+    monkeypatch.setattr(app_module, "translator", translator)
+    monkeypatch.setattr(app_module, "readiness", dict(app_module.readiness, status='idle', error=None))
+    for name in ("scheduler", "cache", "translation_memory", "job_manager", "document_revisions"):
+        monkeypatch.setattr(app_module, name, None)
+    monkeypatch.setattr(config, "SCHEDULER_MODE", "micro")
+    monkeypatch.setattr(config, "CACHE_DB_PATH", str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(config, "MEMORY_DB_PATH", str(tmp_path / "memory.sqlite3"))
+    monkeypatch.setattr(config, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(config, "REVISIONS_DIR", str(tmp_path / "revisions"))
+    yield app_module
+    if app_module.scheduler is not None:
+        app_module.scheduler.stop()
+    if app_module.job_manager is not None:
+        app_module.job_manager.shutdown()
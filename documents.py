@@ -0,0 +1,519 @@
+"""
+Streaming translation of PDF, DOCX and text documents.
+
+Documents are read as a stream of blocks (headings, paragraphs, list items,
+tables and page breaks) in document order: PDFs page by page, DOCX files
+straight from the XML inside the archive, element by element. Blocks are
+translated a window at a time, so long reports are batched through the
+model without the whole source document being held in memory, and written
+out as DOCX or plain text with the same block order and basic structure.
+Text output is written as it is translated; DOCX output is built in memory
+(by python-docx) and saved at the end.
+"""
+
+import os
+import re
+import time
+import logging
+import zipfile
+from collections import namedtuple
+from xml.etree import ElementTree
+from chunking import reassemble
+
+logger = logging.getLogger(__name__)
+
+# A unit of document structure. kind is "heading" (with level, 0 for a
+# title), "paragraph", "list_item", "table" (with rows of cell texts) or
+# "page_break"
+Block = namedtuple("Block", ["kind", "text", "level", "rows"], defaults=("", None, None))
+
+# Input formats accepted by read_document, and output formats of open_writer
+INPUT_FORMATS = (".pdf", ".docx", ".txt")
+OUTPUT_FORMATS = (".docx", ".txt")
+
+# WordprocessingML namespace
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_HEADING_STYLE_RE = re.compile(r"^Heading\s?(\d)$", re.IGNORECASE)
+
+# Lines ending like this end a paragraph in extracted PDF text
+_PDF_PARAGRAPH_END_RE = re.compile(r"[.!?:;…।][\"'”’)\]]*$")
+
+def _paragraph_text(paragraph):
+    """Text of a w:p element, with tabs and line breaks"""
+    parts = []
+    for run in paragraph.iter(_W + "r"):
+        for node in run:
+            if node.tag == _W + "t":
+                parts.append(node.text or "")
+            elif node.tag == _W + "tab":
+                parts.append("\t")
+            elif node.tag == _W + "cr" or (node.tag == _W + "br" and node.get(_W + "type") != "page"):
+                parts.append("\n")
+    return "".join(parts)
+
+def _paragraph_blocks(paragraph):
+    """Blocks for a top-level w:p element (page breaks around the paragraph)"""
+    properties = paragraph.find(_W + "pPr")
+    style = ""
+    numbered = False
+    page_break_before = False
+    if properties is not None:
+        style_element = properties.find(_W + "pStyle")
+        if style_element is not None:
+            style = style_element.get(_W + "val", "")
+        numbered = properties.find(_W + "numPr") is not None
+        page_break_before = properties.find(_W + "pageBreakBefore") is not None
+
+    if page_break_before:
+        yield Block("page_break")
+
+    text = _paragraph_text(paragraph)
+    heading = _HEADING_STYLE_RE.match(style)
+    if heading:
+        yield Block("heading", text, int(heading.group(1)))
+    elif style.lower() == "title":
+        yield Block("heading", text, 0)
+    elif numbered or style.lower().startswith("list"):
+        yield Block("list_item", text)
+    else:
+        yield Block("paragraph", text)
+
+    if any(node.get(_W + "type") == "page" for node in paragraph.iter(_W + "br")):
+        yield Block("page_break")
+
+def _table_rows(table):
+    """Rows of cell texts of a w:tbl element (nested tables are flattened into their cell)"""
+    rows = []
+    for row in table.findall(_W + "tr"):
+        rows.append([
+            "\n".join(_paragraph_text(paragraph) for paragraph in cell.iter(_W + "p"))
+            for cell in row.findall(_W + "tc")
+        ])
+    return rows
+
+def read_docx(path):
+    """
+    Stream the blocks of a DOCX file.
+
+    The document XML is parsed incrementally and every paragraph or table is
+    cleared and removed from the tree once it has been yielded, so memory
+    use does not grow with the length of the document.
+
+    Args:
+        path (str): DOCX file
+
+    Yields:
+        Block: Blocks in document order
+    """
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a valid DOCX file: {str(e)}") from e
+
+    with archive:
+        if "word/document.xml" not in archive.namelist():
+            raise ValueError("Not a valid DOCX file: word/document.xml is missing")
+
+        with archive.open("word/document.xml") as document:
+            table_depth = 0
+            # Open elements, so a processed one can be detached from its parent
+            open_elements = []
+            for event, element in ElementTree.iterparse(document, events=("start", "end")):
+                if event == "start":
+                    open_elements.append(element)
+                    if element.tag == _W + "tbl":
+                        table_depth += 1
+                    continue
+                open_elements.pop()
+
+                if element.tag == _W + "tbl":
+                    table_depth -= 1
+                    if table_depth > 0:
+                        continue
+                    yield Block("table", rows=_table_rows(element))
+                elif element.tag == _W + "p" and table_depth == 0:
+                    yield from _paragraph_blocks(element)
+                else:
+                    continue
+                element.clear()
+                if open_elements:
+                    open_elements[-1].remove(element)
+
+def _pdf_paragraphs(lines):
+    """
+    Join the wrapped lines of extracted PDF text into paragraphs.
+
+    A paragraph ends at a blank line, or at a line that ends a sentence and
+    is noticeably shorter than the longest line on the page. Words
+    hyphenated across lines are joined back together.
+    """
+    longest = max((len(line) for line in lines), default=0)
+    paragraphs = []
+    current = ""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if current:
+                paragraphs.append(current)
+                current = ""
+            continue
+
+        if not current:
+            current = line
+        elif current.endswith("-") and not current.endswith(" -"):
+            current = current[:-1] + line
+        else:
+            current += " " + line
+
+        if _PDF_PARAGRAPH_END_RE.search(line) and len(line) < 0.8 * longest:
+            paragraphs.append(current)
+            current = ""
+
+    if current:
+        paragraphs.append(current)
+    return paragraphs
+
+def read_pdf(path):
+    """
+    Stream the blocks of a PDF file, page by page.
+
+    Text is extracted one page at a time and joined into paragraphs. A
+    paragraph that runs on to the next page is held back and joined with
+    its continuation. Only the text layer is read (scanned pages without
+    one come out empty).
+
+    Args:
+        path (str): PDF file
+
+    Yields:
+        Block: Paragraph blocks, with a page_break block between pages
+    """
+    try:
+        from PyPDF2 import PdfReader
+        from PyPDF2.errors import PdfReadError
+    except ImportError as e:
+        raise ImportError("PDF support requires PyPDF2: pip install PyPDF2") from e
+
+    try:
+        reader = PdfReader(path)
+    except PdfReadError as e:
+        raise ValueError(f"Not a valid PDF file: {str(e)}") from e
+    carried = None
+    for page_number, page in enumerate(reader.pages):
+        if page_number > 0:
+            yield Block("page_break")
+
+        paragraphs = _pdf_paragraphs((page.extract_text() or "").splitlines())
+        if carried is not None:
+            if paragraphs:
+                paragraphs[0] = carried + " " + paragraphs[0]
+            else:
+                paragraphs = [carried]
+            carried = None
+
+        # The last paragraph continues on the next page unless it ends a sentence
+        if paragraphs and page_number < len(reader.pages) - 1 \
+                and not _PDF_PARAGRAPH_END_RE.search(paragraphs[-1]):
+            carried = paragraphs.pop()
+
+        for paragraph in paragraphs:
+            yield Block("paragraph", paragraph)
+
+    if carried is not None:
+        yield Block("paragraph", carried)
+
+def read_text(path):
+    """
+    Stream the blocks of a plain text file.
+
+    Paragraphs are separated by blank lines; form feeds mark page breaks.
+
+    Args:
+        path (str): UTF-8 text file
+
+    Yields:
+        Block: Paragraph and page_break blocks
+    """
+    lines = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            pages = line.split("\f")
+            for i, part in enumerate(pages):
+                if i > 0:
+                    if lines:
+                        yield Block("paragraph", "".join(lines).strip())
+                        lines = []
+                    yield Block("page_break")
+                if part.strip():
+                    lines.append(part)
+                elif lines:
+                    yield Block("paragraph", "".join(lines).strip())
+                    lines = []
+    if lines:
+        yield Block("paragraph", "".join(lines).strip())
+
+def read_document(path):
+    """
+    Stream the blocks of a document, choosing the reader by file extension.
+
+    Args:
+        path (str): .pdf, .docx or .txt file
+
+    Returns:
+        iterator: Blocks in document order
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        return read_pdf(path)
+    if extension == ".docx":
+        return read_docx(path)
+    if extension == ".txt":
+        return read_text(path)
+    raise ValueError(f"Unsupported document format '{extension}'. Choose from: {', '.join(INPUT_FORMATS)}")
+
+def block_texts(block):
+    """
+    Get the texts of a block that need translating.
+
+    Args:
+        block (Block): Block to look at
+
+    Returns:
+        list: Paragraph text or non-empty table cells (empty for page breaks)
+    """
+    if block.kind == "table":
+        return [cell for row in block.rows for cell in row if cell.strip()]
+    if block.text and block.text.strip():
+        return [block.text]
+    return []
+
+def translate_window(translator, window, target_language, source_language="english", max_chunk_tokens=256,
+                     max_length=1024, batch_size=8):
+    """
+    Translate the texts of a list of blocks in one batched call.
+
+    Every paragraph and table cell is split into chunks, all chunks are
+    translated together (length-bucketed), and each text is reassembled
+    from its chunks.
+
+    Args:
+        translator (Translator): Translator to use
+        window (list): Blocks to translate
+        target_language (str): Target language name
+        source_language (str): Source language name (default: "english")
+        max_chunk_tokens (int): Maximum tokens per chunk of a long paragraph
+        max_length (int): Maximum length for the model
+        batch_size (int): Chunks per model batch
+
+    Yields:
+        Block: Translated blocks, in the order of window
+
+    Raises:
+        RuntimeError: If a text could not be translated
+    """
+    chunked = [
+        translator.split_large_text(text, max_chunk_tokens)
+        for block in window for text in block_texts(block)
+    ]
+    chunk_texts = [chunk.text for chunks in chunked for chunk in chunks]
+
+    translations = []
+    if chunk_texts:
+        translations = translator.translate(chunk_texts, target_language, source_language,
+                                            batch_size=batch_size, max_length=max_length)
+        if translations is None or None in translations:
+            raise RuntimeError("Translation failed for one or more document segments")
+
+    texts = []
+    position = 0
+    for chunks in chunked:
+        texts.append(reassemble(chunks, translations[position:position + len(chunks)]))
+        position += len(chunks)
+
+    translated = iter(texts)
+    for block in window:
+        if block.kind == "table":
+            rows = [[next(translated) if cell.strip() else cell for cell in row] for row in block.rows]
+            yield block._replace(rows=rows)
+        elif block_texts(block):
+            yield block._replace(text=next(translated))
+        else:
+            yield block
+
+def translate_blocks(translator, blocks, target_language, source_language="english", max_chunk_tokens=256,
+                     max_length=1024, batch_size=8, window_segments=64):
+    """
+    Translate a stream of blocks, a window at a time.
+
+    Blocks are collected until they hold window_segments texts (paragraphs
+    or table cells), then all of them are chunked and translated in one
+    length-bucketed batch call, and the translated blocks are yielded in
+    order. Short paragraphs are thus batched together instead of going
+    through the model one by one.
+
+    Args:
+        translator (Translator): Translator to use
+        blocks (iterable): Blocks from one of the readers
+        target_language (str): Target language name
+        source_language (str): Source language name (default: "english")
+        max_chunk_tokens (int): Maximum tokens per chunk of a long paragraph
+        max_length (int): Maximum length for the model
+        batch_size (int): Chunks per model batch
+        window_segments (int): Texts translated per window
+
+    Yields:
+        Block: Translated blocks in document order
+
+    Raises:
+        RuntimeError: If part of a window could not be translated
+    """
+    window = []
+    segments = 0
+    for block in blocks:
+        window.append(block)
+        segments += len(block_texts(block))
+        if segments >= window_segments:
+            yield from translate_window(translator, window, target_language, source_language,
+                                         max_chunk_tokens, max_length, batch_size)
+            window = []
+            segments = 0
+
+    if window:
+        yield from translate_window(translator, window, target_language, source_language,
+                                     max_chunk_tokens, max_length, batch_size)
+
+class TextWriter:
+    """Writes blocks to a UTF-8 text file as they arrive"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self._first = True
+
+    def write(self, block):
+        """Append a block (paragraphs are separated by blank lines, pages by form feeds)"""
+        if block.kind == "page_break":
+            self._file.write("\n\f")
+            return
+        if block.kind == "table":
+            text = "\n".join("\t".join(cell.replace("\n", " ") for cell in row) for row in block.rows)
+        elif block.kind == "list_item":
+            text = f"- {block.text}"
+        else:
+            text = block.text
+
+        if not self._first:
+            self._file.write("\n\n")
+        self._file.write(text)
+        self._first = False
+
+    def close(self):
+        self._file.write("\n")
+        self._file.close()
+
+class DocxWriter:
+    """
+    Builds a DOCX file from blocks, saved on close.
+
+    python-docx holds the whole document in memory until it is saved, so
+    unlike TextWriter this does not stream: memory use grows with the
+    length of the translation.
+    """
+
+    def __init__(self, path):
+        try:
+            import docx
+        except ImportError as e:
+            raise ImportError("DOCX output requires python-docx: pip install python-docx") from e
+
+        self.path = path
+        self._document = docx.Document()
+
+    def write(self, block):
+        """Append a block with the matching built-in style"""
+        if block.kind == "heading":
+            self._document.add_heading(block.text, level=min(block.level or 0, 9))
+        elif block.kind == "list_item":
+            self._document.add_paragraph(block.text, style="List Bullet")
+        elif block.kind == "table":
+            if not block.rows:
+                return
+            columns = max(len(row) for row in block.rows)
+            table = self._document.add_table(rows=len(block.rows), cols=columns)
+            table.style = "Table Grid"
+            for row, cells in zip(table.rows, block.rows):
+                for cell, text in zip(row.cells, cells):
+                    cell.text = text
+        elif block.kind == "page_break":
+            self._document.add_page_break()
+        else:
+            self._document.add_paragraph(block.text)
+
+    def close(self):
+        self._document.save(self.path)
+
+def open_writer(path):
+    """
+    Open a writer for an output document, choosing the format by file extension.
+
+    Args:
+        path (str): .docx or .txt file
+
+    Returns:
+        TextWriter or DocxWriter: Writer with write(block) and close()
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".docx":
+        return DocxWriter(path)
+    if extension == ".txt":
+        return TextWriter(path)
+    raise ValueError(f"Unsupported output format '{extension}'. Choose from: {', '.join(OUTPUT_FORMATS)}")
+
+def translate_document(translator, input_path, output_path, target_language, source_language="english",
+                       max_chunk_tokens=256, max_length=1024, batch_size=8, window_segments=64):
+    """
+    Translate a PDF, DOCX or text document into a DOCX or text file.
+
+    Args:
+        translator (Translator): Translator to use
+        input_path (str): Document to translate (.pdf, .docx or .txt)
+        output_path (str): Where to write the translation (.docx or .txt)
+        target_language (str): Target language name
+        source_language (str): Source language name (default: "english")
+        max_chunk_tokens (int): Maximum tokens per chunk of a long paragraph
+        max_length (int): Maximum length for the model
+        batch_size (int): Chunks per model batch
+        window_segments (int): Texts translated per window
+
+    Returns:
+        dict: Number of blocks, translated segments (paragraphs and table
+        cells) and pages (page breaks + 1), and elapsed seconds
+    """
+    start_time = time.time()
+    stats = {'blocks': 0, 'segments': 0, 'pages': 1}
+
+    def counted(blocks):
+        for block in blocks:
+            stats['segments'] += len(block_texts(block))
+            yield block
+
+    writer = open_writer(output_path)
+    try:
+        blocks = translate_blocks(
+            translator, counted(read_document(input_path)), target_language, source_language,
+            max_chunk_tokens=max_chunk_tokens, max_length=max_length, batch_size=batch_size,
+            window_segments=window_segments
+        )
+        for block in blocks:
+            writer.write(block)
+            stats['blocks'] += 1
+            if block.kind == "page_break":
+                stats['pages'] += 1
+    finally:
+        writer.close()
+
+    stats['elapsed_seconds'] = time.time() - start_time
+    logger.info(f"Translated {input_path} to {output_path}: {stats['segments']} segments on "
+                f"{stats['pages']} pages in {stats['elapsed_seconds']:.2f} seconds")
+    return stats
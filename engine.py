@@ -0,0 +1,528 @@
+"""
+Continuous batching generation engine.
+
+``model.generate`` keeps every row of a batch busy until the longest output
+in it is finished. This engine runs its own greedy decode loop over MBart
+instead: it keeps a running set of sequences, each with its own key/value
+cache, retires sequences as soon as they emit end-of-sentence and admits
+queued requests into the freed slots at the next decoder step.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import torch
+import torch.nn.functional as F
+
+import metrics
+from utils import follow_future, normalize_segment
+from generation import repeated_tail, trim_repetition
+
+logger = logging.getLogger(__name__)
+
+class _Sequence:
+    """A request being decoded (or waiting to be admitted)"""
+
+    __slots__ = ("text", "source_code", "target_code", "cache_key", "future", "enqueued_at",
+                 "input_ids", "source_length", "tokens", "forced", "start", "budget")
+
+    def __init__(self, text, source_code, target_code, input_ids, cache_key=None):
+        self.text = text
+        self.source_code = source_code
+        self.target_code = target_code
+        self.cache_key = cache_key
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.input_ids = input_ids
+        self.source_length = len(input_ids)
+        self.tokens = None
+        self.forced = None
+        self.start = None
+        self.budget = None
+
+class ContinuousBatchingEngine:
+    """
+    Iteration-level scheduler and decode loop for the PyTorch MBart model.
+
+    Each decoder step runs every running sequence forward by one token. The
+    sequences' self-attention caches share one tensor per layer, where a
+    sequence only attends to the columns written since it was admitted, and
+    positions are tracked per sequence, so sequences of any age and any
+    target language decode side by side. Decoding is greedy (no beam
+    search), which is what makes retiring single sequences possible.
+
+    Exposes the same ``submit``/``translate`` interface as
+    :class:`scheduler.BatchScheduler`. All model work happens on one
+    dispatcher thread, holding one of the translator's model slots;
+    requests are tokenized on the submitting thread and finished sequences
+    are detokenized on a separate thread, so neither delays the next step.
+    """
+
+    def __init__(self, translator, max_running=16, max_batch_tokens=4096, max_length=1024):
+        """
+        Initialize the engine.
+
+        Args:
+            translator (Translator): Loaded translator (torch backend)
+            max_running (int): Maximum number of sequences decoded together
+            max_batch_tokens (int): Maximum padded source tokens
+                (longest input * running sequences) held in the running set
+            max_length (int): Maximum length of input and output sequences
+        """
+        if translator.backend_name != "torch":
+            raise ValueError("The continuous batching engine requires the torch backend")
+
+        self.translator = translator
+        self.max_running = max_running
+        self.max_batch_tokens = max_batch_tokens
+        self.max_length = max_length
+
+        model = translator.model
+        self._model = model
+        self._decoder = model.get_decoder()
+        # transformers >= 4.38 scales token embeddings inside embed_tokens
+        # (MBartScaledWordEmbedding); before that the decoder scaled a plain nn.Embedding
+        if hasattr(self._decoder.embed_tokens, "embed_scale"):
+            self._embed_scale = 1.0
+        else:
+            self._embed_scale = math.sqrt(model.config.d_model) if model.config.scale_embedding else 1.0
+        self._device = translator.device
+        self._eos_token_id = model.config.eos_token_id
+
+        self._queue = deque()
+        self._in_flight = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        # Finished sequences are detokenized off the decode loop's thread
+        self._finisher = None
+
+        # Running set: one row per sequence in every tensor below
+        self._rows = []
+        self._self_cache = []   # per layer (keys, values): rows x heads x columns x head_dim
+        self._cross_cache = []  # per layer (keys, values): rows x heads x source tokens x head_dim
+        self._source_mask = None
+
+        self._stats = {
+            'steps': 0,
+            'admitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'cache_hits': 0,
+            'memory_hits': 0,
+            'deduplicated': 0,
+            'row_steps': 0
+        }
+
+    def start(self):
+        """Start the dispatcher thread"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+
+        self._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="engine-detokenize")
+        self._thread = threading.Thread(target=self._run, name="continuous-batching", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Continuous batching engine started (max running {self.max_running}, "
+            f"max batch tokens {self.max_batch_tokens})"
+        )
+
+    def stop(self):
+        """Stop the dispatcher thread and fail any requests still waiting or running"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._finisher is not None:
+            # Sequences already finished still get their translations
+            self._finisher.shutdown(wait=True)
+            self._finisher = None
+
+        with self._condition:
+            while self._queue:
+                self._queue.popleft().future.set_exception(RuntimeError("Engine stopped"))
+        self._fail_running(RuntimeError("Engine stopped"))
+
+    def submit(self, text, target_language, source_language="english", profile=None):
+        """
+        Queue a text for translation.
+
+        Args:
+            text (str): Text to translate
+            target_language (str): Target language name
+            source_language (str): Source language name (default: "english")
+            profile (str, optional): Generation profile; the engine decodes
+                greedily, so only "fast" (or None) is accepted
+
+        Returns:
+            concurrent.futures.Future: Resolves to the translated text
+        """
+        if not isinstance(text, str):
+            raise TypeError("Text must be a string")
+        if profile not in (None, "fast"):
+            raise ValueError(f"Profile '{profile}' not supported by the continuous batching engine (greedy only)")
+
+        language_codes = self.translator.language_codes
+        if source_language not in language_codes:
+            raise ValueError(f"Source language '{source_language}' not supported")
+        if target_language not in language_codes:
+            raise ValueError(f"Target language '{target_language}' not supported")
+
+        source_code = language_codes[source_language]
+        target_code = language_codes[target_language]
+
+        cache_key = None
+        cache = self.translator.cache
+        if cache is not None:
+            # Greedy decoding is the "fast" profile, so entries are shared with the translator
+            cache_key = self.translator._cache_key(text, source_code, target_code, self.max_length, "fast")
+            cached = cache.get(cache_key)
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+                with self._condition:
+                    self._stats['cache_hits'] += 1
+                return future
+
+        memory = self.translator.memory
+        if memory is not None:
+            remembered = self.translator._memory_lookup(text, source_code, target_code, self.max_length, "fast")
+            if remembered is not None:
+                if cache_key is not None:
+                    cache.put(cache_key, remembered)
+                future = Future()
+                future.set_result(remembered)
+                with self._condition:
+                    self._stats['memory_hits'] += 1
+                return future
+
+        if not self._running:
+            self.start()
+
+        # Tokenized on the caller's thread, with the source language passed explicitly
+        input_ids = self.translator.backend.tokenize([text], self.max_length, source_code)[0]
+
+        # An identical segment already queued or decoding is shared, not decoded again
+        key = (source_code, target_code, normalize_segment(text))
+        with self._condition:
+            leader = self._in_flight.get(key)
+            if leader is not None:
+                self._stats['deduplicated'] += 1
+                metrics.DEDUPLICATED_SEGMENTS.labels(stage="in_flight").inc()
+                return follow_future(leader)
+
+            sequence = _Sequence(text, source_code, target_code, input_ids, cache_key)
+            self._in_flight[key] = sequence.future
+            self._queue.append(sequence)
+            self._condition.notify()
+
+        sequence.future.add_done_callback(lambda future: self._forget(key, future))
+        return sequence.future
+
+    def _forget(self, key, future):
+        """Stop sharing a finished sequence with new identical requests"""
+        with self._condition:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def translate(self, text, target_language, source_language="english", timeout=None, profile=None):
+        """
+        Translate a text through the engine and wait for the result.
+
+        Args:
+            text (str): Text to translate
+            target_language (str): Target language name
+            source_language (str): Source language name (default: "english")
+            timeout (float, optional): Seconds to wait for the result
+            profile (str, optional): Generation profile ("fast" or None)
+
+        Returns:
+            str: Translated text
+        """
+        return self.submit(text, target_language, source_language, profile).result(timeout=timeout)
+
+    def stats(self):
+        """
+        Get engine counters.
+
+        Returns:
+            dict: Step/admission/completion counters, current queue and
+            running set sizes, and the mean number of sequences per step
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats['queued'] = len(self._queue)
+        stats['running'] = len(self._rows)
+        stats['mean_running'] = stats['row_steps'] / stats['steps'] if stats['steps'] else 0.0
+        return stats
+
+    def _run(self):
+        """Dispatcher loop: admit queued requests into free slots, then decode one step"""
+        while True:
+            with self._condition:
+                while self._running and not self._queue and not self._rows:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                admitted = self._take_admissions()
+
+            try:
+                with self.translator.slots.acquire():
+                    if admitted:
+                        self._admit(admitted)
+                    if self._rows:
+                        self._step()
+            except Exception as e:
+                logger.error(f"Continuous batching error: {str(e)}")
+                languages = {code: language for language, code in self.translator.language_codes.items()}
+                for sequence in admitted:
+                    if not sequence.future.done():
+                        sequence.future.set_exception(e)
+                        metrics.TRANSLATION_ERRORS.labels(language=languages[sequence.target_code]).inc()
+                self._fail_running(e)
+
+    def _take_admissions(self):
+        """Pop queued requests that fit in the free slots. Must hold the lock."""
+        admitted = []
+        longest = max((row.source_length for row in self._rows), default=0)
+
+        while self._queue and len(self._rows) + len(admitted) < self.max_running:
+            sequence = self._queue[0]
+            candidate_longest = max(longest, sequence.source_length)
+            rows = len(self._rows) + len(admitted) + 1
+            if (self._rows or admitted) and candidate_longest * rows > self.max_batch_tokens:
+                break
+
+            longest = candidate_longest
+            admitted.append(self._queue.popleft())
+
+        return admitted
+
+    def _admit(self, sequences):
+        """Encode new requests and add them to the running set"""
+        longest = max(sequence.source_length for sequence in sequences)
+        input_ids = torch.full((len(sequences), longest), self.translator.tokenizer.pad_token_id, dtype=torch.long)
+        for row, sequence in enumerate(sequences):
+            input_ids[row, :sequence.source_length] = torch.tensor(sequence.input_ids, dtype=torch.long)
+        new_mask = (torch.arange(longest)[None, :] < torch.tensor([[sequence.source_length] for sequence in sequences]))
+        input_ids = input_ids.to(self._device)
+        new_mask = new_mask.to(self._device)
+
+        encoder_states = self.translator.backend.encode(input_ids, new_mask.long()).last_hidden_state
+        with torch.no_grad():
+            new_cross = [
+                (self._split_heads(layer.encoder_attn, layer.encoder_attn.k_proj(encoder_states)),
+                 self._split_heads(layer.encoder_attn, layer.encoder_attn.v_proj(encoder_states)))
+                for layer in self._decoder.layers
+            ]
+
+        decoder_start_token_id = self.translator.backend.decoder_start_token_id
+        lang_code_to_id = self.translator.tokenizer.lang_code_to_id
+        columns = self._self_cache[0][0].shape[2] if self._rows else 0
+        now = time.monotonic()
+        for sequence in sequences:
+            metrics.QUEUE_WAIT_SECONDS.labels(scheduler="continuous").observe(now - sequence.enqueued_at)
+            sequence.tokens = [decoder_start_token_id]
+            sequence.forced = [lang_code_to_id[sequence.target_code]]
+            # New tokens after the language code, learned per target language
+            sequence.budget = self.translator.length_predictor.budget(
+                sequence.source_length - 2, sequence.target_code, self.max_length - 2
+            )
+            # Columns written before this sequence joined are masked out for it
+            sequence.start = columns
+
+        if not self._rows:
+            self._cross_cache = new_cross
+            self._source_mask = new_mask
+            self._self_cache = [
+                (keys.new_zeros(keys.shape[:2] + (0, keys.shape[3])),) * 2 for keys, _ in new_cross
+            ]
+        else:
+            # Right-pad cross-attention caches to a common source length
+            source_length = max(self._source_mask.shape[1], new_mask.shape[1])
+            self._cross_cache = [
+                (torch.cat([self._pad_columns(old_keys, source_length), self._pad_columns(new_keys, source_length)]),
+                 torch.cat([self._pad_columns(old_values, source_length), self._pad_columns(new_values, source_length)]))
+                for (old_keys, old_values), (new_keys, new_values) in zip(self._cross_cache, new_cross)
+            ]
+            self._source_mask = torch.cat([
+                F.pad(self._source_mask, (0, source_length - self._source_mask.shape[1])),
+                F.pad(new_mask, (0, source_length - new_mask.shape[1]))
+            ])
+            self._self_cache = [
+                (torch.cat([keys, keys.new_zeros((len(sequences),) + keys.shape[1:])]),
+                 torch.cat([values, values.new_zeros((len(sequences),) + values.shape[1:])]))
+                for keys, values in self._self_cache
+            ]
+
+        self._rows.extend(sequences)
+        with self._condition:
+            self._stats['admitted'] += len(sequences)
+
+    def _step(self):
+        """Run every running sequence forward by one token and retire finished ones"""
+        decoder = self._decoder
+        step_start = time.perf_counter()
+        input_ids = torch.tensor([[row.tokens[-1]] for row in self._rows], device=self._device)
+        positions = torch.tensor([len(row.tokens) - 1 for row in self._rows], device=self._device)
+        starts = torch.tensor([row.start for row in self._rows], device=self._device)
+
+        with torch.no_grad():
+            hidden_states = decoder.embed_tokens(input_ids) * self._embed_scale
+            hidden_states = hidden_states + decoder.embed_positions.weight[positions + decoder.embed_positions.offset][:, None, :]
+            hidden_states = decoder.layernorm_embedding(hidden_states)
+
+            # The new column is written for every row
+            columns = self._self_cache[0][0].shape[2] + 1
+            self_mask = (torch.arange(columns, device=self._device)[None, :] >= starts[:, None])[:, None, None, :]
+            source_mask = self._source_mask[:, None, None, :]
+
+            for index, layer in enumerate(decoder.layers):
+                residual = hidden_states
+                hidden_states = layer.self_attn_layer_norm(hidden_states)
+                attention = layer.self_attn
+                keys, values = self._self_cache[index]
+                keys = torch.cat([keys, self._split_heads(attention, attention.k_proj(hidden_states))], dim=2)
+                values = torch.cat([values, self._split_heads(attention, attention.v_proj(hidden_states))], dim=2)
+                self._self_cache[index] = (keys, values)
+                hidden_states = residual + self._attend(attention, hidden_states, keys, values, self_mask)
+
+                residual = hidden_states
+                hidden_states = layer.encoder_attn_layer_norm(hidden_states)
+                keys, values = self._cross_cache[index]
+                hidden_states = residual + self._attend(layer.encoder_attn, hidden_states, keys, values, source_mask)
+
+                residual = hidden_states
+                hidden_states = layer.final_layer_norm(hidden_states)
+                hidden_states = layer.fc2(layer.activation_fn(layer.fc1(hidden_states)))
+                hidden_states = residual + hidden_states
+
+            hidden_states = decoder.layer_norm(hidden_states)
+            logits = self._model.lm_head(hidden_states[:, 0]) + self._model.final_logits_bias
+            next_tokens = logits.argmax(dim=-1).tolist()
+
+        finished = []
+        for row, next_token in zip(self._rows, next_tokens):
+            # No end-of-sentence is forced at max_length (as in Translator), so a
+            # cut-off sequence does not look like it ended on its own
+            if row.forced:
+                next_token = row.forced.pop(0)
+            row.tokens.append(next_token)
+            finished.append(next_token == self._eos_token_id or len(row.tokens) >= self.max_length
+                            or len(row.tokens) - 2 >= row.budget or repeated_tail(row.tokens[2:]) > 0)
+
+        metrics.ENGINE_STEP_SECONDS.observe(time.perf_counter() - step_start)
+        metrics.ENGINE_RUNNING.observe(len(self._rows))
+        with self._condition:
+            self._stats['steps'] += 1
+            self._stats['row_steps'] += len(self._rows)
+
+        if any(finished):
+            self._retire([row for row, done in zip(self._rows, finished) if done])
+            self._keep([i for i, done in enumerate(finished) if not done])
+
+    def _retire(self, rows):
+        """Trim finished sequences and hand them over to be detokenized"""
+        length_predictor = self.translator.length_predictor
+        for row in rows:
+            if row.tokens[-1] == self._eos_token_id:
+                length_predictor.observe(row.source_length - 2, len(row.tokens) - 3, row.target_code)
+                continue
+            period = repeated_tail(row.tokens[2:])
+            if period:
+                metrics.GENERATION_STOPS.labels(reason="repetition").inc()
+                row.tokens = trim_repetition(row.tokens, period)
+            else:
+                metrics.GENERATION_STOPS.labels(reason="length_budget").inc()
+
+        self._finisher.submit(self._finish, rows)
+
+    def _finish(self, rows):
+        """Detokenize retired sequences and resolve their futures (finisher thread)"""
+        try:
+            translations = self.translator.backend.detokenize([row.tokens for row in rows])
+            memory = self.translator.memory
+            for row, translation in zip(rows, translations):
+                if row.cache_key is not None:
+                    self.translator.cache.put(row.cache_key, translation)
+                if memory is not None:
+                    self.translator._memory_add(row.text, row.source_code, row.target_code, self.max_length,
+                                                "fast", translation)
+                row.future.set_result(translation)
+        except Exception as e:
+            logger.error(f"Continuous batching error: {str(e)}")
+            languages = {code: language for language, code in self.translator.language_codes.items()}
+            for row in rows:
+                if not row.future.done():
+                    row.future.set_exception(e)
+                    metrics.TRANSLATION_ERRORS.labels(language=languages[row.target_code]).inc()
+            with self._condition:
+                self._stats['failed'] += len(rows)
+            return
+
+        with self._condition:
+            self._stats['completed'] += len(rows)
+
+    def _keep(self, indices):
+        """Shrink the running set to the given rows and drop unused cache columns"""
+        self._rows = [self._rows[i] for i in indices]
+        if not self._rows:
+            self._self_cache = []
+            self._cross_cache = []
+            self._source_mask = None
+            return
+
+        index = torch.tensor(indices, device=self._device)
+        # Columns before the oldest remaining sequence joined are masked for every row
+        first_column = min(row.start for row in self._rows)
+        source_length = max(row.source_length for row in self._rows)
+        for row in self._rows:
+            row.start -= first_column
+
+        self._self_cache = [
+            (keys.index_select(0, index)[:, :, first_column:], values.index_select(0, index)[:, :, first_column:])
+            for keys, values in self._self_cache
+        ]
+        self._cross_cache = [
+            (keys.index_select(0, index)[:, :, :source_length], values.index_select(0, index)[:, :, :source_length])
+            for keys, values in self._cross_cache
+        ]
+        self._source_mask = self._source_mask.index_select(0, index)[:, :source_length]
+
+    def _fail_running(self, error):
+        """Fail every running sequence and empty the running set"""
+        languages = {code: language for language, code in self.translator.language_codes.items()}
+        for row in self._rows:
+            if not row.future.done():
+                row.future.set_exception(error)
+                metrics.TRANSLATION_ERRORS.labels(language=languages[row.target_code]).inc()
+        with self._condition:
+            self._stats['failed'] += len(self._rows)
+        self._keep([])
+
+    @staticmethod
+    def _split_heads(attention, states):
+        """Reshape batch x length x embed projections to batch x heads x length x head_dim"""
+        batch_size, length, _ = states.shape
+        return states.view(batch_size, length, attention.num_heads, attention.head_dim).transpose(1, 2)
+
+    @staticmethod
+    def _pad_columns(states, length):
+        """Zero-pad a batch x heads x length x head_dim tensor to the given length"""
+        return F.pad(states, (0, 0, 0, length - states.shape[2]))
+
+    @classmethod
+    def _attend(cls, attention, hidden_states, keys, values, mask):
+        """Attention of one new token per row over cached keys/values, with output projection"""
+        query = cls._split_heads(attention, attention.q_proj(hidden_states))
+        output = F.scaled_dot_product_attention(query, keys, values, attn_mask=mask, scale=attention.scaling)
+        return attention.out_proj(output.transpose(1, 2).reshape(hidden_states.shape))
@@ -0,0 +1,279 @@
+"""
+Generation profiles, output length budgets and repetition guards.
+
+A profile picks the decoding strategy for a request (greedy, small beam or
+full beam search). Instead of letting every decode run to ``max_length``,
+each input gets a budget of new tokens from its own token count times the
+output/input ratio seen for its target language in earlier translations,
+and sequences that start repeating the same few tokens are stopped early.
+Both bound the worst-case latency of a request.
+"""
+
+import os
+import json
+import math
+import logging
+import threading
+from collections import deque
+
+import torch
+from transformers import StoppingCriteria
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Decoding settings of each profile (passed to ``generate``)
+PROFILES = {
+    "fast": {"num_beams": 1, "do_sample": False},
+    "balanced": {"num_beams": 2, "do_sample": False, "early_stopping": True},
+    "quality": {"num_beams": 5, "do_sample": False, "early_stopping": True}
+}
+
+def repeated_tail(tokens, max_period=8, min_tokens=16, min_repeats=3):
+    """
+    Find a block of tokens repeated back to back at the end of a sequence.
+
+    Args:
+        tokens (list): Generated token ids
+        max_period (int): Longest repeating block to look for
+        min_tokens (int): Tokens the repeats must cover together
+        min_repeats (int): Times the block must occur
+
+    Returns:
+        int: Length of the repeating block, or 0 if the tail does not repeat
+    """
+    for period in range(1, max_period + 1):
+        span = period * max(min_repeats, math.ceil(min_tokens / period))
+        if len(tokens) < span:
+            break
+        tail = tokens[-span:]
+        if all(tail[i] == tail[i % period] for i in range(period, span)):
+            return period
+    return 0
+
+def trim_repetition(tokens, period):
+    """
+    Drop the back-to-back copies of a repeating tail, keeping the first one.
+
+    Args:
+        tokens (list): Generated token ids ending in a repeated block
+        period (int): Length of the block (from :func:`repeated_tail`)
+
+    Returns:
+        list: Tokens with the repeats removed
+    """
+    end = len(tokens)
+    while end - 2 * period >= 0 and tokens[end - period:end] == tokens[end - 2 * period:end - period]:
+        end -= period
+    return tokens[:end]
+
+class LengthPredictor:
+    """
+    Learns how many output tokens each target language needs per input token.
+
+    Ratios are taken from translations that finished on their own (not
+    cut off by a budget or guard). The budget for an input uses a high
+    quantile of the recent ratios for its language, so few translations
+    are cut short. Thread-safe; the learned ratios can be saved to a file
+    so a restarted server does not start from the default again.
+    """
+
+    def __init__(self, default_ratio=2.5, margin=1.3, slack=16, quantile=0.99, window=2000,
+                 min_samples=50, path=None, save_every=200):
+        """
+        Initialize the predictor.
+
+        Args:
+            default_ratio (float): Output/input token ratio used until a
+                language has min_samples observations
+            margin (float): Factor applied on top of the learned ratio
+            slack (int): Tokens added to every budget (short inputs vary most)
+            quantile (float): Quantile of the recent ratios used for budgets
+            window (int): Recent translations kept per language
+            min_samples (int): Observations needed before the learned ratio is used
+            path (str, optional): JSON file to load and save the observations
+            save_every (int): Observations between saves
+        """
+        self.default_ratio = default_ratio
+        self.margin = margin
+        self.slack = slack
+        self.quantile = quantile
+        self.window = window
+        self.min_samples = min_samples
+        self.path = path
+        self.save_every = save_every
+
+        self._ratios = {}
+        self._learned = {}
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for language_code, ratios in json.load(f).items():
+                        self._ratios[language_code] = deque(ratios, maxlen=window)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not load output length statistics from {path}: {str(e)}")
+
+    def ratio(self, language_code):
+        """
+        Output/input token ratio budgeted for a target language.
+
+        Args:
+            language_code (str): MBart target language code
+
+        Returns:
+            float: Learned quantile ratio (or the default) times the margin
+        """
+        with self._lock:
+            learned = self._learned.get(language_code)
+            if learned is None:
+                ratios = self._ratios.get(language_code, ())
+                if len(ratios) >= self.min_samples:
+                    ordered = sorted(ratios)
+                    learned = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+                else:
+                    learned = self.default_ratio
+                self._learned[language_code] = learned
+        return learned * self.margin
+
+    def budget(self, input_tokens, language_code, max_tokens):
+        """
+        Maximum new tokens for one input.
+
+        Args:
+            input_tokens (int): Source tokens (without special tokens)
+            language_code (str): MBart target language code
+            max_tokens (int): Hard limit on new tokens
+
+        Returns:
+            int: Token budget for the translation
+        """
+        return max(1, min(max_tokens, math.ceil(input_tokens * self.ratio(language_code)) + self.slack))
+
+    def observe(self, input_tokens, output_tokens, language_code):
+        """
+        Record a translation that finished on its own.
+
+        Args:
+            input_tokens (int): Source tokens (without special tokens)
+            output_tokens (int): Generated tokens (without special tokens)
+            language_code (str): MBart target language code
+        """
+        if input_tokens <= 0:
+            return
+        with self._lock:
+            ratios = self._ratios.setdefault(language_code, deque(maxlen=self.window))
+            ratios.append(output_tokens / input_tokens)
+            # Recomputed on next use
+            self._learned.pop(language_code, None)
+            self._unsaved += 1
+            save = self.path is not None and self._unsaved >= self.save_every
+        if save:
+            self.save()
+
+    def save(self):
+        """Write the recent observations to the predictor's file"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {language_code: list(ratios) for language_code, ratios in self._ratios.items()}
+            self._unsaved = 0
+        try:
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save output length statistics to {self.path}: {str(e)}")
+
+    def stats(self):
+        """
+        Get the learned ratios.
+
+        Returns:
+            dict: Per target language code: observations and budgeted ratio
+        """
+        with self._lock:
+            languages = {language_code: len(ratios) for language_code, ratios in self._ratios.items()}
+        return {language_code: {'samples': samples, 'ratio': self.ratio(language_code)}
+                for language_code, samples in languages.items()}
+
+class GenerationGuard(StoppingCriteria):
+    """
+    Stops each sequence of a ``generate`` call at its own token budget, or
+    as soon as its tail repeats the same block of tokens.
+
+    Works with greedy and beam search: rows of the decoder batch (beams
+    included) are mapped back to the input they belong to.
+    """
+
+    def __init__(self, budgets, prompt_length, max_period=8, min_tokens=16, min_repeats=3):
+        """
+        Initialize the guard.
+
+        Args:
+            budgets (list): Maximum new tokens of each input
+            prompt_length (int): Decoder tokens before the first generated
+                one (decoder start and language code)
+            max_period (int): Longest repeating block to look for
+            min_tokens (int): Tokens the repeats must cover together
+            min_repeats (int): Times the block must occur
+        """
+        self.budgets = torch.tensor(budgets)
+        self.prompt_length = prompt_length
+        self.max_period = max_period
+        self.min_tokens = min_tokens
+        self.min_repeats = min_repeats
+
+    def __call__(self, input_ids, scores, **kwargs):
+        rows, length = input_ids.shape
+        generated = length - self.prompt_length
+        budgets = self.budgets.to(input_ids.device).repeat_interleave(rows // len(self.budgets))
+        done = generated >= budgets
+
+        for period in range(1, self.max_period + 1):
+            repeats = max(self.min_repeats, math.ceil(self.min_tokens / period))
+            if generated < period * repeats:
+                break
+            blocks = input_ids[:, -period * repeats:].reshape(rows, repeats, period)
+            done |= (blocks == blocks[:, :1]).all(dim=2).all(dim=1)
+
+        return done
+
+    def finish(self, sequences, eos_token_id, pad_token_id):
+        """
+        Trim repeated tails off generated sequences and count why each stopped.
+
+        Args:
+            sequences (torch.Tensor or list): Output of ``generate`` (or
+                token id lists), one row per input
+            eos_token_id (int): End-of-sentence token
+            pad_token_id (int): Padding token
+
+        Returns:
+            tuple: ``(sequences, natural)``: token id lists with repeats
+            removed, and for each whether it ended with end-of-sentence
+            (only those show how long a translation needs to be)
+        """
+        trimmed = []
+        natural = []
+        for tokens in (sequences.tolist() if torch.is_tensor(sequences) else sequences):
+            while tokens and tokens[-1] == pad_token_id:
+                tokens.pop()
+            if tokens and tokens[-1] == eos_token_id:
+                natural.append(True)
+                trimmed.append(tokens)
+                continue
+
+            natural.append(False)
+            period = repeated_tail(tokens[self.prompt_length:], self.max_period, self.min_tokens, self.min_repeats)
+            if period:
+                metrics.GENERATION_STOPS.labels(reason="repetition").inc()
+                tokens = trim_repetition(tokens, period)
+            else:
+                metrics.GENERATION_STOPS.labels(reason="length_budget").inc()
+            trimmed.append(tokens)
+        return trimmed, natural
@@ -0,0 +1,262 @@
+"""
+Background translation jobs for long reports.
+
+A job's source chunks, finished chunk translations and status are saved to
+disk after every batch, so a restarted server resumes a job where it
+stopped instead of translating it again. Job files are the source of truth,
+which keeps status consistent when several worker processes serve the API.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from chunking import Chunk, reassemble
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class JobManager:
+    """
+    Runs large-text translation jobs on a background worker pool.
+
+    Jobs move through ``queued`` -> ``running`` -> ``completed`` or
+    ``failed``. While a process runs a job it holds an exclusive lock on the
+    job, so other worker processes never translate the same job twice; the
+    lock is released automatically if the process dies.
+    """
+
+    def __init__(self, translator_factory, jobs_dir, workers=1, max_chunk_tokens=256, batch_size=8):
+        """
+        Initialize the job manager.
+
+        Args:
+            translator_factory (callable): Returns the Translator to use
+            jobs_dir (str): Directory where job state is stored
+            workers (int): Number of jobs translated at the same time
+            max_chunk_tokens (int): Maximum number of tokens per chunk
+            batch_size (int): Number of chunks translated (and saved) together
+        """
+        self.translator_factory = translator_factory
+        self.jobs_dir = jobs_dir
+        self.max_chunk_tokens = max_chunk_tokens
+        self.batch_size = batch_size
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translation-job")
+        self._save_lock = threading.Lock()
+
+    def _job_path(self, job_id):
+        """Path of a job's state file"""
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _load(self, job_id):
+        """Read a job's state, or None if it does not exist"""
+        try:
+            with open(self._job_path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, job):
+        """Write a job's state atomically"""
+        path = self._job_path(job['id'])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with self._save_lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+
+    def _claim(self, job_id):
+        """
+        Take the exclusive lock on a job.
+
+        Returns:
+            file or None: Open lock file (keep it open while running), or
+            None if another process is running the job
+        """
+        lock_file = open(os.path.join(self.jobs_dir, f"{job_id}.lock"), 'w')
+        if fcntl is None:
+            return lock_file
+
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def resume(self):
+        """
+        Queue every job on disk that has not finished.
+
+        Returns:
+            int: Number of jobs queued
+        """
+        resumed = 0
+        for file_name in sorted(os.listdir(self.jobs_dir)):
+            if not file_name.endswith(".json"):
+                continue
+            job = self._load(file_name[:-len(".json")])
+            if job and job['status'] in ("queued", "running"):
+                self._executor.submit(self._run, job['id'])
+                resumed += 1
+
+        if resumed:
+            logger.info(f"Resuming {resumed} unfinished translation jobs")
+        return resumed
+
+    def submit(self, text, target_language, source_language="english"):
+        """
+        Create a job and queue it.
+
+        Args:
+            text (str): Text to translate
+            target_language (str): Target language name
+            source_language (str): Source language name (default: "english")
+
+        Returns:
+            str: Job id
+        """
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': "queued",
+            'text': text,
+            'source_language': source_language,
+            'target_language': target_language,
+            'chunks': None,
+            'translations': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'chunks_per_second': None
+        }
+        self._save(job)
+        self._executor.submit(self._run, job['id'])
+
+        logger.info(f"Queued translation job {job['id']} ({len(text)} characters)")
+        return job['id']
+
+    def get(self, job_id):
+        """
+        Get the status of a job.
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            dict or None: Status, progress and (when completed) the
+            translation, or None if the job does not exist
+        """
+        job = self._load(job_id)
+        if job is None:
+            return None
+
+        total = len(job['chunks']) if job['chunks'] is not None else None
+        done = sum(1 for t in job['translations'] if t is not None) if job['translations'] is not None else 0
+
+        status = {
+            'job_id': job['id'],
+            'status': job['status'],
+            'source_language': job['source_language'],
+            'target_language': job['target_language'],
+            'chunks_done': done,
+            'chunks_total': total,
+            'progress': done / total if total else 0.0,
+            'eta_seconds': None,
+            'created_at': job['created_at'],
+            'finished_at': job['finished_at']
+        }
+
+        if job['status'] == "running" and total:
+            if job.get('chunks_per_second'):
+                status['eta_seconds'] = (total - done) / job['chunks_per_second']
+        elif job['status'] == "completed":
+            chunks = [Chunk(*chunk) for chunk in job['chunks']]
+            status['translation'] = reassemble(chunks, job['translations'])
+        elif job['status'] == "failed":
+            status['error'] = job['error']
+
+        return status
+
+    def _run(self, job_id):
+        """Translate a job's remaining chunks, saving after every batch"""
+        lock_file = self._claim(job_id)
+        if lock_file is None:
+            logger.info(f"Job {job_id} is being run by another process")
+            return
+
+        try:
+            job = self._load(job_id)
+            if job is None or job['status'] not in ("queued", "running"):
+                return
+
+            translator = self.translator_factory()
+            job['status'] = "running"
+            job['started_at'] = job['started_at'] or time.time()
+
+            if job['chunks'] is None:
+                chunks = translator.split_large_text(job['text'], self.max_chunk_tokens)
+                job['chunks'] = [list(chunk) for chunk in chunks]
+                job['translations'] = [None] * len(chunks)
+            self._save(job)
+
+            pending = [i for i, t in enumerate(job['translations']) if t is None]
+            if len(pending) < len(job['chunks']):
+                done = len(job['chunks']) - len(pending)
+                logger.info(f"Resuming job {job_id}: {done} of {len(job['chunks'])} chunks already done")
+
+            start_time = time.time()
+            for batch_start in range(0, len(pending), self.batch_size):
+                batch = pending[batch_start:batch_start + self.batch_size]
+                translations = translator.translate(
+                    [job['chunks'][i][0] for i in batch],
+                    job['target_language'], job['source_language'],
+                    batch_size=self.batch_size
+                )
+
+                failed = [i for i, t in zip(batch, translations) if t is None]
+                if failed:
+                    raise RuntimeError(f"Translation failed for chunk {failed[0] + 1} of {len(job['chunks'])}")
+
+                # Rate of this run, so resumed jobs don't count the downtime
+                done_this_run = batch_start + len(batch)
+                job['chunks_per_second'] = done_this_run / max(time.time() - start_time, 1e-6)
+
+                for i, translation in zip(batch, translations):
+                    job['translations'][i] = translation
+                self._save(job)
+
+            job['status'] = "completed"
+            job['finished_at'] = time.time()
+            self._save(job)
+            logger.info(f"Job {job_id} completed in {job['finished_at'] - job['started_at']:.2f} seconds")
+
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            job = self._load(job_id)
+            if job is not None:
+                job.update(status="failed", error=str(e), finished_at=time.time())
+                self._save(job)
+
+        finally:
+            job = self._load(job_id)
+            if job is None or job['status'] in ("completed", "failed"):
+                # Finished jobs are never claimed again
+                try:
+                    os.remove(os.path.join(self.jobs_dir, f"{job_id}.lock"))
+                except OSError:
+                    pass
+            lock_file.close()
+
+    def shutdown(self, wait=True):
+        """Stop the worker pool (unfinished jobs resume on the next start)"""
+        self._executor.shutdown(wait=wait)
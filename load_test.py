@@ -0,0 +1,463 @@
+"""
+Load generator for the Flask API.
+
+Drives /translate and /batch_translate with a mix of payloads (short
+labels, paragraphs, full reports) either at a fixed concurrency (closed
+loop) or at a fixed arrival rate (open loop), and reports achieved
+requests per second, error rates and latency percentiles over time.
+
+With --stand-in the app is served in-process with a deterministic stand-in
+translator that simulates model cost, so the serving layer (scheduler,
+request handling, JSON) can be profiled without loading the model.
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from chunking import chunk_text, reassemble
+from concurrency import ModelSlots
+from utils import percentile
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "the report shows revenue growth of twelve percent compared to last year and "
+    "students are expected to submit their assessments before the end of the term "
+    "please review the attached document and share your feedback by friday "
+    "committee approved new budget after long discussion about priorities for "
+    "each department while costs in the region remained stable during quarter"
+).split()
+
+def make_sentences(rng, num_words):
+    """Synthetic English sentences totalling num_words words"""
+    sentences = []
+    while num_words > 0:
+        length = min(num_words, rng.randint(8, 16))
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        num_words -= length
+    return " ".join(sentences)
+
+def make_label(rng):
+    """Short table label or heading"""
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+
+def make_paragraph(rng):
+    """Paragraph of a few sentences (under the 1000 character large-text threshold)"""
+    return make_sentences(rng, rng.randint(40, 120))
+
+def make_report(rng):
+    """Multi-paragraph report (translated with translate_large_text by the API)"""
+    return "\n\n".join(make_sentences(rng, rng.randint(80, 160)) for _ in range(rng.randint(3, 6)))
+
+PAYLOADS = {
+    "label": make_label,
+    "paragraph": make_paragraph,
+    "report": make_report
+}
+
+def parse_mix(spec):
+    """
+    Parse a payload mix such as "label=6,paragraph=3,report=1".
+
+    Returns:
+        dict: Payload kind -> relative weight
+    """
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in PAYLOADS:
+            raise argparse.ArgumentTypeError(f"Unknown payload '{kind}'. Choose from: {', '.join(PAYLOADS)}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+class StandInTranslator:
+    """
+    Deterministic stand-in for :class:`translator.Translator`.
+
+    Returns a tagged copy of the input instead of a translation, and holds a
+    model slot for ``overhead_ms + token_ms * padded tokens`` per batch to
+    mimic the model being busy, so the serving layer sees realistic queueing.
+    """
+
+    def __init__(self, overhead_ms=5.0, token_ms=0.2, model_slots=1):
+        """
+        Initialize the stand-in.
+
+        Args:
+            overhead_ms (float): Simulated cost of every model call
+            token_ms (float): Simulated cost per padded input token
+            model_slots (int): Simulated model calls allowed at once
+        """
+        self.overhead = overhead_ms / 1000.0
+        self.token_cost = token_ms / 1000.0
+        self.model_name = "stand-in"
+        self.backend_name = "stand-in"
+        self.precision = "fp32"
+        self.cache = None
+        self.profile = "quality"
+        self.language_codes = {
+            "english": "en_XX",
+            "hindi": "hi_IN",
+            "tamil": "ta_IN",
+            "malayalam": "ml_IN",
+            "telugu": "te_IN"
+        }
+        self.slots = ModelSlots(model_slots)
+
+    def count_tokens(self, text, add_special_tokens=True):
+        """Whitespace tokens (plus the language code and end-of-sentence tokens)"""
+        return len(text.split()) + (2 if add_special_tokens else 0)
+
+    def _run_model(self, texts, target_language):
+        """Simulate one batched model call"""
+        longest = max(self.count_tokens(text) for text in texts)
+        with self.slots.acquire():
+            time.sleep(self.overhead + self.token_cost * longest * len(texts))
+        code = self.language_codes[target_language]
+        return [f"[{code}] {text}" for text in texts]
+
+    def translate(self, text, target_language, source_language="english", batch_size=8, max_length=1024,
+                  max_batch_tokens=None, stats=None, profile=None):
+        """Stand-in for Translator.translate"""
+        if target_language not in self.language_codes:
+            raise ValueError(f"Target language '{target_language}' not supported")
+        if isinstance(text, str):
+            return self._run_model([text], target_language)[0]
+
+        translations = []
+        for start in range(0, len(text), batch_size):
+            translations.extend(self._run_model(text[start:start + batch_size], target_language))
+        return translations
+
+    def split_large_text(self, text, max_chunk_tokens=256):
+        """Stand-in for Translator.split_large_text"""
+        return chunk_text(text, max_chunk_tokens - 2)
+
+    def translate_large_text(self, text, target_language, source_language="english",
+                             max_chunk_tokens=256, max_length=1024, profile=None):
+        """Stand-in for Translator.translate_large_text"""
+        chunks = self.split_large_text(text, max_chunk_tokens)
+        translations = self.translate([chunk.text for chunk in chunks], target_language, source_language)
+        return reassemble(chunks, translations)
+
+    def translate_large_text_iter(self, text, target_language, source_language="english",
+                                  max_chunk_tokens=256, max_length=1024, batch_size=8, profile=None):
+        """Stand-in for Translator.translate_large_text_iter"""
+        chunks = self.split_large_text(text, max_chunk_tokens)
+        for i, chunk in enumerate(chunks):
+            separator = chunk.separator if i < len(chunks) - 1 else ""
+            yield self.translate(chunk.text, target_language, source_language).strip() + separator
+
+def start_stand_in_server(overhead_ms, token_ms):
+    """
+    Serve the app in a background thread with the stand-in translator.
+
+    Returns:
+        str: Base URL of the server
+    """
+    from werkzeug.serving import make_server
+    import app as app_module
+    import config
+
+    # The continuous batching engine needs the real model
+    config.SCHEDULER_MODE = "micro"
+    app_module.translator = StandInTranslator(overhead_ms, token_ms, config.MODEL_SLOTS)
+
+    # One access log line per request would drown out the report
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="stand-in-server", daemon=True).start()
+
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    logger.info(f"Serving the app with a stand-in translator at {base_url}")
+    return base_url
+
+class LoadGenerator:
+    """Sends requests with a payload mix and records the outcome of each"""
+
+    def __init__(self, base_url, mix, batch_fraction, batch_items, languages, seed=0, timeout=300):
+        """
+        Initialize the load generator.
+
+        Args:
+            base_url (str): Base URL of the API
+            mix (dict): Payload kind -> relative weight
+            batch_fraction (float): Share of requests sent to /batch_translate
+            batch_items (int): Texts per /batch_translate request
+            languages (list): Target languages to pick from
+            seed (int): Seed for payload generation
+            timeout (float): Request timeout in seconds
+        """
+        self.base_url = base_url
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.batch_fraction = batch_fraction
+        self.batch_items = batch_items
+        self.languages = languages
+        self.timeout = timeout
+
+        self.records = []
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._records_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        """HTTP session of the calling thread (keeps connections alive)"""
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def next_request(self):
+        """
+        Pick the next request from the mix.
+
+        Returns:
+            tuple: ``(endpoint, kind, payload)``
+        """
+        with self._rng_lock:
+            rng = self._rng
+            language = rng.choice(self.languages)
+            if rng.random() < self.batch_fraction:
+                # Reports go through /translate only; batches hold labels and paragraphs
+                kinds = [kind for kind in self.kinds if kind != "report"]
+                weights = [weight for kind, weight in zip(self.kinds, self.weights) if kind != "report"]
+                if not kinds:
+                    kinds, weights = ["label"], [1]
+                texts = [PAYLOADS[kind](rng) for kind in rng.choices(kinds, weights, k=self.batch_items)]
+                return "batch_translate", "batch", {"texts": texts, "target_language": language}
+
+            kind = rng.choices(self.kinds, self.weights)[0]
+            return "translate", kind, {"text": PAYLOADS[kind](rng), "target_language": language}
+
+    def send(self, scheduled_at=None):
+        """
+        Send one request and record its outcome.
+
+        Args:
+            scheduled_at (float, optional): perf_counter time the request was
+                due (open loop); latency is measured from here so delays in
+                the load generator itself are not hidden
+        """
+        endpoint, kind, payload = self.next_request()
+        start_time = time.perf_counter() if scheduled_at is None else scheduled_at
+
+        error = None
+        try:
+            response = self._session().post(f"{self.base_url}/{endpoint}", json=payload, timeout=self.timeout)
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+
+        end_time = time.perf_counter()
+        with self._records_lock:
+            self.records.append({
+                'endpoint': endpoint,
+                'kind': kind,
+                'start': start_time,
+                'end': end_time,
+                'latency': end_time - start_time,
+                'error': error
+            })
+
+    def run_closed_loop(self, concurrency, duration):
+        """Keep concurrency requests in flight for duration seconds"""
+        deadline = time.perf_counter() + duration
+
+        def client():
+            while time.perf_counter() < deadline:
+                self.send()
+
+        threads = [threading.Thread(target=client, name=f"load-client-{i}") for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open_loop(self, rate, duration, max_in_flight):
+        """Start requests with Poisson arrivals at rate per second for duration seconds"""
+        arrivals = random.Random(self._rng.random())
+        start_time = time.perf_counter()
+        next_arrival = start_time
+
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="load-client") as executor:
+            while next_arrival < start_time + duration:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, next_arrival)
+                next_arrival += arrivals.expovariate(rate)
+
+def summarize(records, duration=None):
+    """
+    Throughput, error rate and latency percentiles of a set of requests.
+
+    Args:
+        records (list): Request records from LoadGenerator
+        duration (float, optional): Time span to compute the rate over
+            (default: first start to last end)
+
+    Returns:
+        dict: Summary statistics
+    """
+    if not records:
+        return {'requests': 0, 'rps': 0.0, 'errors': 0, 'error_rate': 0.0}
+
+    if duration is None:
+        duration = max(r['end'] for r in records) - min(r['start'] for r in records)
+    latencies = [r['latency'] for r in records if r['error'] is None]
+    errors = sum(1 for r in records if r['error'] is not None)
+
+    summary = {
+        'requests': len(records),
+        'rps': len(records) / duration if duration > 0 else 0.0,
+        'errors': errors,
+        'error_rate': errors / len(records)
+    }
+    if latencies:
+        summary.update({
+            'latency_p50_s': percentile(latencies, 50),
+            'latency_p95_s': percentile(latencies, 95),
+            'latency_p99_s': percentile(latencies, 99),
+            'latency_max_s': max(latencies)
+        })
+    return summary
+
+def build_report(records, interval):
+    """
+    Summaries over the whole run, per request type and per time window.
+
+    Args:
+        records (list): Request records from LoadGenerator
+        interval (float): Window length in seconds (requests are placed in
+            the window they completed in)
+
+    Returns:
+        dict: Overall, per-type and per-window summaries, and error counts
+    """
+    if not records:
+        return {'overall': summarize(records), 'by_type': {}, 'windows': [], 'errors': {}}
+
+    start_time = min(r['start'] for r in records)
+    windows = defaultdict(list)
+    by_type = defaultdict(list)
+    errors = defaultdict(int)
+    for record in records:
+        windows[int((record['end'] - start_time) // interval)].append(record)
+        by_type[f"{record['endpoint']}/{record['kind']}"].append(record)
+        if record['error'] is not None:
+            errors[record['error']] += 1
+
+    return {
+        'overall': summarize(records),
+        'by_type': {name: summarize(group) for name, group in sorted(by_type.items())},
+        'windows': [
+            dict(summarize(windows[index], interval), start_s=index * interval)
+            for index in range(max(windows) + 1)
+        ],
+        'errors': dict(errors)
+    }
+
+def print_report(report):
+    """Print the per-window and per-type tables of a report"""
+    def row(label, summary):
+        latency = "".join(
+            f"{summary[key]:>9.3f}" if key in summary else f"{'-':>9}"
+            for key in ('latency_p50_s', 'latency_p95_s', 'latency_p99_s')
+        )
+        return (f"{label:<28}{summary['requests']:>9}{summary['rps']:>9.1f}"
+                f"{summary['error_rate']:>9.1%}{latency}")
+
+    header = f"{'':<28}{'requests':>9}{'rps':>9}{'errors':>9}{'p50 (s)':>9}{'p95 (s)':>9}{'p99 (s)':>9}"
+
+    print()
+    print(header)
+    print("-" * len(header))
+    for window in report['windows']:
+        print(row(f"t={window['start_s']:.0f}s", window))
+    print("-" * len(header))
+    for name, summary in report['by_type'].items():
+        print(row(name, summary))
+    print("-" * len(header))
+    print(row("overall", report['overall']))
+
+    if report['errors']:
+        print()
+        print("Errors: " + ", ".join(f"{error} x{count}" for error, count in report['errors'].items()))
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Load test the Flask API endpoints")
+    parser.add_argument("--url", default="http://localhost:5000", help="Base URL of the API")
+    parser.add_argument("--stand-in", action="store_true",
+                        help="Serve the app in-process with a deterministic stand-in translator")
+    parser.add_argument("--stand-in-overhead-ms", type=float, default=5.0,
+                        help="Simulated cost of each stand-in model call")
+    parser.add_argument("--stand-in-token-ms", type=float, default=0.2,
+                        help="Simulated cost per padded token of each stand-in model call")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight (closed loop)")
+    parser.add_argument("--rate", type=float, help="Arrival rate in requests/s (open loop; overrides --concurrency)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Open loop limit on concurrent requests")
+    parser.add_argument("--duration", type=float, default=30, help="Test duration in seconds")
+    parser.add_argument("--interval", type=float, default=5, help="Reporting window in seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("label=6,paragraph=3,report=1"),
+                        help="Payload mix, e.g. label=6,paragraph=3,report=1")
+    parser.add_argument("--batch-fraction", type=float, default=0.1, help="Share of requests sent to /batch_translate")
+    parser.add_argument("--batch-items", type=int, default=16, help="Texts per /batch_translate request")
+    parser.add_argument("--languages", nargs="+", choices=["hindi", "tamil", "malayalam", "telugu"],
+                        default=["hindi", "tamil", "malayalam", "telugu"], help="Target languages")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for payload generation")
+    parser.add_argument("--timeout", type=float, default=300, help="Request timeout in seconds")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+
+    args = parser.parse_args()
+
+    base_url = args.url
+    if args.stand_in:
+        base_url = start_stand_in_server(args.stand_in_overhead_ms, args.stand_in_token_ms)
+
+    generator = LoadGenerator(base_url, args.mix, args.batch_fraction, args.batch_items, args.languages,
+                              seed=args.seed, timeout=args.timeout)
+
+    if args.rate:
+        logger.info(f"Open loop: {args.rate} requests/s for {args.duration:.0f} seconds against {base_url}")
+        generator.run_open_loop(args.rate, args.duration, args.max_in_flight)
+    else:
+        logger.info(f"Closed loop: {args.concurrency} concurrent clients for {args.duration:.0f} seconds "
+                    f"against {base_url}")
+        generator.run_closed_loop(args.concurrency, args.duration)
+
+    report = build_report(generator.records, args.interval)
+    print_report(report)
+
+    if args.output:
+        report['settings'] = {
+            'url': base_url,
+            'stand_in': args.stand_in,
+            'concurrency': None if args.rate else args.concurrency,
+            'rate': args.rate,
+            'duration': args.duration,
+            'mix': args.mix,
+            'batch_fraction': args.batch_fraction,
+            'batch_items': args.batch_items,
+            'languages': args.languages
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Prometheus-style metrics for the translator.
+
+A small, dependency-free set of counters, gauges and histograms, rendered
+in the Prometheus text exposition format by the /metrics endpoint. Metrics
+are kept per process: with pre-forked workers each scrape reports the
+worker that served it.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Every metric created in this module, in the order they are rendered
+REGISTRY = []
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+def _escape(value):
+    """Escape a label value for the exposition format"""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values, extra=None):
+    """Render ``{name="value",...}`` (empty string without labels)"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    """Render a sample value"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _LabeledMetric:
+    """A metric bound to one set of label values"""
+
+    def __init__(self, metric, key):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount=1):
+        self._metric._inc(self._key, amount)
+
+    def set(self, value):
+        self._metric._set(self._key, value)
+
+    def observe(self, value):
+        self._metric._observe(self._key, value)
+
+    def time(self):
+        return self._metric._time(self._key)
+
+class _Metric:
+    """Base class: a named metric with optional labels"""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        Create and register a metric.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            labelnames (tuple): Names of the metric's labels
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, **labels):
+        """
+        Select the child metric for a set of label values.
+
+        Returns:
+            _LabeledMetric: Metric bound to the label values
+        """
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels: {', '.join(self.labelnames)}")
+        return _LabeledMetric(self, tuple(str(labels[name]) for name in self.labelnames))
+
+    def _unlabeled(self):
+        """Key for a metric without labels"""
+        if self.labelnames:
+            raise ValueError(f"{self.name} requires labels: {', '.join(self.labelnames)}")
+        return ()
+
+    def _time(self, key):
+        raise TypeError(f"{self.type} metrics cannot time blocks")
+
+    def render(self):
+        """
+        Render the metric in the text exposition format.
+
+        Returns:
+            list: Lines of text
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_samples(key, value))
+        return lines
+
+    def _render_samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Counter(_Metric):
+    """A count that only goes up"""
+
+    type = "counter"
+
+    def inc(self, amount=1):
+        """Increase the counter"""
+        self._inc(self._unlabeled(), amount)
+
+    def _inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """A value that can be set to anything"""
+
+    type = "gauge"
+
+    def set(self, value):
+        """Set the gauge"""
+        self._set(self._unlabeled(), value)
+
+    def _set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        """
+        Create and register a histogram.
+
+        Args:
+            name (str): Metric name
+            documentation (str): Help text
+            labelnames (tuple): Names of the metric's labels
+            buckets (tuple): Upper bounds of the buckets (+Inf is added)
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value):
+        """Record an observation"""
+        self._observe(self._unlabeled(), value)
+
+    def time(self):
+        """Context manager that observes the seconds spent in the block"""
+        return self._time(self._unlabeled())
+
+    def _observe(self, key, value):
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def _time(self, key):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(key, time.perf_counter() - start_time)
+
+    def _render_samples(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['buckets']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+def render():
+    """
+    Render every registered metric.
+
+    Returns:
+        str: Metrics in the Prometheus text exposition format
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Model stages
+TOKENIZE_SECONDS = Histogram("translator_tokenize_seconds", "Time spent tokenizing a batch of inputs")
+ENCODE_SECONDS = Histogram("translator_encode_seconds", "Time spent in the encoder per batch")
+DECODE_SECONDS = Histogram("translator_decode_seconds", "Time spent decoding (generating) per batch")
+DETOKENIZE_SECONDS = Histogram("translator_detokenize_seconds", "Time spent turning output tokens into text per batch")
+INPUT_TOKENS = Histogram("translator_input_tokens", "Tokens per input segment", buckets=TOKEN_BUCKETS)
+OUTPUT_TOKENS = Histogram("translator_output_tokens", "Tokens per translated segment", buckets=TOKEN_BUCKETS)
+BATCH_SIZE = Histogram("translator_batch_size", "Sequences per generate call", buckets=BATCH_BUCKETS)
+MODEL_LOAD_SECONDS = Gauge("translator_model_load_seconds", "Time taken to load the model", ("backend", "precision"))
+
+# Request scheduling
+QUEUE_WAIT_SECONDS = Histogram("translator_queue_wait_seconds",
+                               "Time a request waited in the scheduler before its batch started", ("scheduler",))
+MODEL_SLOT_WAIT_SECONDS = Histogram("translator_model_slot_wait_seconds",
+                                    "Time a model call waited for a free model slot")
+ENGINE_STEP_SECONDS = Histogram("translator_engine_step_seconds", "Time per continuous batching decoder step")
+ENGINE_RUNNING = Histogram("translator_engine_running_sequences",
+                           "Sequences decoded per continuous batching step", buckets=BATCH_BUCKETS)
+
+# Outcomes
+CACHE_LOOKUPS = Counter("translator_cache_lookups_total", "Translation cache lookups", ("result",))
+TRANSLATION_MEMORY_LOOKUPS = Counter("translator_memory_lookups_total", "Translation memory lookups",
+                                    ("result",))
+GENERATION_STOPS = Counter("translator_generation_stops_total",
+                           "Decodes stopped before end-of-sentence by a length budget or repetition guard",
+                           ("reason",))
+DRAFT_TOKENS = Counter("translator_draft_tokens_total",
+                       "Tokens proposed by the speculative decoding draft model", ("result",))
+DEDUPLICATED_SEGMENTS = Counter("translator_deduplicated_segments_total",
+                                "Segments answered with the translation of an identical segment", ("stage",))
+TRANSLATION_ERRORS = Counter("translator_translation_errors_total", "Segments that failed to translate",
+                             ("language",))
+HTTP_REQUESTS = Counter("translator_http_requests_total", "API requests", ("endpoint", "status"))
+HTTP_REQUEST_SECONDS = Histogram("translator_http_request_seconds", "API request latency", ("endpoint",))
@@ -0,0 +1,325 @@
+"""
+Script to prune MBart-50's vocabulary down to the languages we serve.
+
+MBart-50 has a 250k-token vocabulary shared by 50 languages, but English to
+Hindi, Tamil, Malayalam and Telugu only ever uses a small fraction of it.
+Every decode step still computes logits (and a softmax) over all of them,
+and the embedding matrix and LM head hold most of the model's parameters.
+
+This tool tokenizes a corpus of the served languages, keeps only the tokens
+it uses (plus every special and language code token, and the single
+characters of the corpus so rarer words can still be spelled out), and
+saves a model whose embeddings, LM head and logits bias are cut down to
+those rows. The tokenizer is rewritten to number the kept tokens 0..N-1, so
+the pruned model needs no id mapping at run time; the mapping from old to
+new ids is saved alongside for reference. Point ``PRUNED_MODEL_DIR`` in
+``config.py`` at the output directory to serve it.
+"""
+
+import argparse
+import collections
+import difflib
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from utils import setup_logging
+
+# Set up logging
+setup_logging(log_level="INFO")
+logger = logging.getLogger(__name__)
+
+# Model weights with one row (or column) per vocabulary entry
+VOCAB_ROW_WEIGHTS = (
+    "model.shared.weight",
+    "model.encoder.embed_tokens.weight",
+    "model.decoder.embed_tokens.weight",
+    "lm_head.weight"
+)
+
+# Model and generation config entries holding token ids
+TOKEN_ID_SETTINGS = (
+    "pad_token_id", "bos_token_id", "eos_token_id", "decoder_start_token_id",
+    "forced_bos_token_id", "forced_eos_token_id"
+)
+
+def read_corpus(paths):
+    """
+    Read corpus lines from text files.
+
+    Args:
+        paths (list): Text files (one sentence or paragraph per line, any
+            of the served languages)
+
+    Returns:
+        list: Non-empty lines
+    """
+    lines = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines.extend(line.strip() for line in f if line.strip())
+    return lines
+
+def count_tokens(tokenizer, lines, batch_size=256):
+    """
+    Count how often each token id occurs in the corpus.
+
+    Args:
+        tokenizer: MBart-50 tokenizer
+        lines (list): Corpus lines
+        batch_size (int): Lines tokenized per call
+
+    Returns:
+        collections.Counter: Token id -> occurrences
+    """
+    counts = collections.Counter()
+    for start in range(0, len(lines), batch_size):
+        batch = lines[start:start + batch_size]
+        for ids in tokenizer(batch, add_special_tokens=False)["input_ids"]:
+            counts.update(ids)
+    return counts
+
+def select_vocab(tokenizer, counts, lines, min_count=1):
+    """
+    Choose the token ids to keep.
+
+    Args:
+        tokenizer: MBart-50 tokenizer
+        counts (collections.Counter): Token occurrences in the corpus
+        lines (list): Corpus lines (their characters are kept as tokens)
+        min_count (int): Occurrences a token needs to be kept
+
+    Returns:
+        list: Kept token ids in ascending order (the new id of a token is
+        its position in this list)
+    """
+    vocab = tokenizer.get_vocab()
+
+    # Special tokens and every language code, so the tokenizer's ids all stay valid
+    kept = set(tokenizer.all_special_ids)
+    kept.update(token_id for token_id in vocab.values() if token_id >= tokenizer.vocab_size)
+    kept.update(token_id for token_id, count in counts.items() if count >= min_count)
+
+    # Single characters (word-initial or not) let unseen words be spelled out
+    characters = set()
+    for line in lines:
+        characters.update(line)
+    for character in characters:
+        for piece in (character, "▁" + character):
+            if piece in vocab:
+                kept.add(vocab[piece])
+
+    return sorted(kept)
+
+def prune_model(model, kept_ids):
+    """
+    Cut a model's vocabulary-sized weights down to the kept tokens.
+
+    Args:
+        model (MBartForConditionalGeneration): Full model
+        kept_ids (list): Token ids to keep, in their new order
+
+    Returns:
+        MBartForConditionalGeneration: Pruned model
+    """
+    import copy
+    import torch
+    from transformers import MBartForConditionalGeneration
+
+    old_to_new = {old_id: new_id for new_id, old_id in enumerate(kept_ids)}
+    index = torch.tensor(kept_ids, dtype=torch.long)
+
+    state_dict = model.state_dict()
+    for name in VOCAB_ROW_WEIGHTS:
+        if name in state_dict:
+            state_dict[name] = state_dict[name].index_select(0, index).clone()
+    state_dict["final_logits_bias"] = state_dict["final_logits_bias"].index_select(1, index).clone()
+
+    model_config = copy.deepcopy(model.config)
+    model_config.vocab_size = len(kept_ids)
+    generation_config = copy.deepcopy(model.generation_config)
+    for settings in (model_config, generation_config):
+        for setting in TOKEN_ID_SETTINGS:
+            token_id = getattr(settings, setting, None)
+            if token_id is not None:
+                setattr(settings, setting, old_to_new[token_id])
+
+    pruned = MBartForConditionalGeneration(model_config)
+    pruned.load_state_dict(state_dict)
+    pruned.tie_weights()
+    pruned.generation_config = generation_config
+    return pruned.to(model.dtype).eval()
+
+def prune_tokenizer_file(path, kept_ids):
+    """
+    Renumber a fast tokenizer's ``tokenizer.json`` to the kept tokens.
+
+    Pieces of the Unigram model that are not kept are dropped (text is then
+    segmented with the pieces that remain), and special tokens get their new
+    ids.
+
+    Args:
+        path (str): tokenizer.json to rewrite in place
+        kept_ids (list): Token ids to keep, in their new order
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    old_to_new = {old_id: new_id for new_id, old_id in enumerate(kept_ids)}
+    model = data["model"]
+    if model.get("type") != "Unigram":
+        raise ValueError(f"Only Unigram tokenizers can be pruned, not {model.get('type')}")
+
+    model["vocab"] = [model["vocab"][old_id] for old_id in kept_ids if old_id < len(model["vocab"])]
+    model["unk_id"] = old_to_new[model["unk_id"]]
+    for token in data["added_tokens"]:
+        token["id"] = old_to_new[token["id"]]
+
+    # Fixed special token ids of the post-processor (MBart sets it per source language)
+    special_tokens = (data.get("post_processor") or {}).get("special_tokens", {})
+    for token in special_tokens.values():
+        token["ids"] = [old_to_new[token_id] for token_id in token["ids"]]
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+def prune(model_name, corpus_paths, output_dir, min_count=1):
+    """
+    Build and save a vocabulary-pruned model and tokenizer.
+
+    Args:
+        model_name (str): Full model to prune
+        corpus_paths (list): Text files of the served languages
+        output_dir (str): Directory to save the pruned model to
+        min_count (int): Occurrences a token needs in the corpus to be kept
+
+    Returns:
+        dict: Summary of the pruning (also saved as the mapping file)
+    """
+    from transformers import MBart50TokenizerFast, MBartForConditionalGeneration
+    from translator import Translator
+
+    lines = read_corpus(corpus_paths)
+    if not lines:
+        raise ValueError("The corpus is empty")
+
+    tokenizer = MBart50TokenizerFast.from_pretrained(model_name)
+    counts = count_tokens(tokenizer, lines)
+    kept_ids = select_vocab(tokenizer, counts, lines, min_count)
+    kept = set(kept_ids)
+    covered = sum(count for token_id, count in counts.items() if token_id in kept)
+    logger.info(f"Keeping {len(kept_ids)} of {len(tokenizer)} tokens "
+                f"({covered / sum(counts.values()):.2%} of corpus tokens)")
+
+    model = MBartForConditionalGeneration.from_pretrained(model_name)
+    pruned = prune_model(model, kept_ids)
+
+    os.makedirs(output_dir, exist_ok=True)
+    pruned.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    prune_tokenizer_file(os.path.join(output_dir, "tokenizer.json"), kept_ids)
+
+    # The SentencePiece model still has the full vocabulary; the pruned
+    # tokenizer is loaded from tokenizer.json alone
+    sentencepiece_path = os.path.join(output_dir, "sentencepiece.bpe.model")
+    if os.path.exists(sentencepiece_path):
+        os.remove(sentencepiece_path)
+
+    summary = {
+        'source_model': model_name,
+        'vocab_size': len(kept_ids),
+        'source_vocab_size': len(tokenizer),
+        'corpus_lines': len(lines),
+        'corpus_tokens': sum(counts.values()),
+        'corpus_coverage': covered / sum(counts.values()),
+        'min_count': min_count,
+        'parameters': sum(p.numel() for p in pruned.parameters()),
+        'source_parameters': sum(p.numel() for p in model.parameters()),
+        'kept_ids': kept_ids
+    }
+    with open(os.path.join(output_dir, Translator.PRUNED_VOCAB_FILE), 'w', encoding='utf-8') as f:
+        json.dump(summary, f)
+
+    logger.info(f"Saved pruned model to {output_dir} ({summary['parameters']:,} parameters, "
+                f"was {summary['source_parameters']:,})")
+    return summary
+
+def check(model_name, pruned_dir, texts, target_languages, max_length=256):
+    """
+    Compare the pruned model's translations with the full model's.
+
+    Args:
+        model_name (str): Full model
+        pruned_dir (str): Pruned model directory
+        texts (list): English texts to translate
+        target_languages (list): Target language names
+        max_length (int): Maximum length of the translations
+
+    Returns:
+        dict: Per target language: exact match rate, word-level similarity
+        and the time each model took
+    """
+    from translator import Translator
+
+    results = {}
+    outputs = {}
+    for name in (model_name, pruned_dir):
+        translator = Translator(model_name=name, device="cpu")
+        for language in target_languages:
+            start_time = time.perf_counter()
+            outputs[name, language] = translator.translate(texts, language, max_length=max_length)
+            results.setdefault(language, {})['full_s' if name == model_name else 'pruned_s'] = \
+                time.perf_counter() - start_time
+        del translator
+
+    for language in target_languages:
+        reference = outputs[model_name, language]
+        candidate = outputs[pruned_dir, language]
+        results[language]['exact_match_rate'] = sum(1 for a, b in zip(reference, candidate) if a == b) / len(texts)
+        results[language]['word_similarity'] = statistics.mean(
+            difflib.SequenceMatcher(None, (a or "").split(), (b or "").split()).ratio()
+            for a, b in zip(reference, candidate)
+        )
+    return results
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Prune MBart-50's vocabulary to the served languages")
+    parser.add_argument("--model", default="facebook/mbart-large-50-many-to-many-mmt", help="Model to prune")
+    parser.add_argument("--corpus", nargs="+", required=True,
+                        help="Text files in the served languages (one sentence or paragraph per line)")
+    parser.add_argument("--output", required=True, help="Directory to save the pruned model to")
+    parser.add_argument("--min-count", type=int, default=1, help="Occurrences a token needs to be kept")
+    parser.add_argument("--check", type=int, default=0,
+                        help="Translate this many English corpus lines with both models and compare (default: skip)")
+    parser.add_argument("--check-languages", nargs="+", choices=["hindi", "tamil", "malayalam", "telugu"],
+                        default=["hindi", "tamil", "malayalam", "telugu"], help="Target languages for --check")
+
+    args = parser.parse_args()
+
+    try:
+        summary = prune(args.model, args.corpus, args.output, args.min_count)
+    except (OSError, ValueError) as e:
+        logger.error(f"Pruning failed: {str(e)}")
+        sys.exit(1)
+
+    print()
+    print(f"Vocabulary: {summary['source_vocab_size']:,} -> {summary['vocab_size']:,} tokens "
+          f"({summary['corpus_coverage']:.2%} of corpus tokens kept)")
+    print(f"Parameters: {summary['source_parameters']:,} -> {summary['parameters']:,}")
+
+    if args.check:
+        # The first corpus file should be English for this comparison
+        texts = read_corpus(args.corpus[:1])[:args.check]
+        results = check(args.model, args.output, texts, args.check_languages)
+        print()
+        print(f"{'language':<12}{'exact':>8}{'similar':>9}{'full (s)':>10}{'pruned (s)':>12}")
+        print("-" * 51)
+        for language, result in results.items():
+            print(f"{language:<12}{result['exact_match_rate']:>8.0%}{result['word_similarity']:>9.2f}"
+                  f"{result['full_s']:>10.2f}{result['pruned_s']:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Incremental re-translation of revised documents.
+
+A document sent with an id is split into sentences, and its sentences and
+their translations are saved per document and target language. When a new
+revision arrives it is diffed against the saved one sentence by sentence:
+unchanged sentences (and sentences that only moved) keep their saved
+translation, only inserted or edited sentences go to the model, and the
+result is joined back together with the new revision's line breaks.
+"""
+
+import os
+import glob
+import json
+import time
+import difflib
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from chunking import reassemble
+from utils import normalize_segment
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class DocumentRevisions:
+    """
+    Translates documents revision by revision, reusing unchanged sentences.
+
+    Each (document id, target language) pair is saved as a JSON file in the
+    store directory. Revisions of the same document are translated one at a
+    time, also across worker processes sharing the directory.
+    """
+
+    def __init__(self, translator_factory, store_dir, max_chunk_tokens=256, batch_size=8):
+        """
+        Initialize the revision store.
+
+        Args:
+            translator_factory (callable): Returns the Translator to use
+            store_dir (str): Directory where documents are saved
+            max_chunk_tokens (int): Maximum tokens per sentence (longer
+                sentences are split on word boundaries)
+            batch_size (int): Number of sentences translated together
+        """
+        self.translator_factory = translator_factory
+        self.store_dir = store_dir
+        self.max_chunk_tokens = max_chunk_tokens
+        self.batch_size = batch_size
+
+        os.makedirs(store_dir, exist_ok=True)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _path(self, document_id, target_language):
+        """Path of a saved document (ids are hashed, so any string is a safe id)"""
+        digest = hashlib.sha256(document_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.store_dir, f"{digest}.{target_language}.json")
+
+    @contextmanager
+    def _locked(self, path):
+        """Hold the lock on a saved document, in this process and across processes"""
+        with self._locks_lock:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{path}.lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _load(path):
+        """Read a saved document, or None if there is none"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save(path, document):
+        """Write a saved document atomically"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _settings(translator, source_language, max_length, profile):
+        """Settings that change translations; saved ones are only reused if these match"""
+        return {
+            'model_name': translator.model_name,
+            'precision': translator.precision,
+            'backend': translator.backend_name,
+            'profile': profile or translator.profile,
+            'source_language': source_language,
+            'max_length': max_length
+        }
+
+    def translate(self, document_id, text, target_language, source_language="english", max_length=1024,
+                  profile=None):
+        """
+        Translate a revision of a document, reusing the previous revision's work.
+
+        Args:
+            document_id (str): Id of the document (any string)
+            text (str): Full text of the new revision
+            target_language (str): Target language name
+            source_language (str): Source language name (default: "english")
+            max_length (int): Maximum length for the model
+            profile (str, optional): Generation profile (default: the translator's)
+
+        Returns:
+            dict: ``translation``, the ``revision`` number (1 for a new
+            document) and ``stats``: sentences in the revision, how many were
+            unchanged, moved, or translated, how many were removed, and
+            elapsed seconds
+
+        Raises:
+            RuntimeError: If a changed sentence could not be translated (the
+                saved revision is left as it was)
+        """
+        translator = self.translator_factory()
+        if source_language not in translator.language_codes:
+            raise ValueError(f"Source language '{source_language}' not supported")
+        if target_language not in translator.language_codes:
+            raise ValueError(f"Target language '{target_language}' not supported")
+
+        start_time = time.time()
+        path = self._path(document_id, target_language)
+        settings = self._settings(translator, source_language, max_length, profile)
+
+        with self._locked(path):
+            previous = self._load(path)
+            old_segments = []
+            if previous is not None and previous['settings'] == settings:
+                old_segments = previous['segments']
+
+            chunks = translator.split_large_text(text, self.max_chunk_tokens, pack=False)
+            old_texts = [normalize_segment(segment['text']) for segment in old_segments]
+            new_texts = [normalize_segment(chunk.text) for chunk in chunks]
+            translations = [None] * len(chunks)
+
+            # Sentences in runs the two revisions share keep their translation
+            matcher = difflib.SequenceMatcher(None, old_texts, new_texts, autojunk=False)
+            removed = 0
+            new_set = set(new_texts)
+            for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+                if tag == "equal":
+                    for offset in range(old_end - old_start):
+                        translations[new_start + offset] = old_segments[old_start + offset]['translation']
+                elif tag in ("delete", "replace"):
+                    removed += sum(1 for old_text in old_texts[old_start:old_end] if old_text not in new_set)
+            unchanged = sum(1 for translation in translations if translation is not None)
+
+            # So do sentences that moved elsewhere in the document
+            saved = {old_text: segment['translation'] for old_text, segment in zip(old_texts, old_segments)}
+            moved = 0
+            for i, new_text in enumerate(new_texts):
+                if translations[i] is None and new_text in saved:
+                    translations[i] = saved[new_text]
+                    moved += 1
+
+            changed = [i for i, translation in enumerate(translations) if translation is None]
+            if changed:
+                logger.info(f"Document {document_id}: translating {len(changed)} of {len(chunks)} sentences")
+                translated = translator.translate(
+                    [chunks[i].text for i in changed], target_language, source_language,
+                    batch_size=self.batch_size, max_length=max_length, profile=profile
+                )
+                failed = len(changed) if translated is None else sum(1 for t in translated if t is None)
+                if failed:
+                    raise RuntimeError(f"Translation failed for {failed} of {len(changed)} changed sentences")
+                for i, translation in zip(changed, translated):
+                    translations[i] = translation
+
+            revision = previous['revision'] + 1 if previous is not None else 1
+            self._save(path, {
+                'document_id': document_id,
+                'target_language': target_language,
+                'revision': revision,
+                'settings': settings,
+                'updated_at': time.time(),
+                'segments': [
+                    {'text': chunk.text, 'separator': chunk.separator, 'translation': translation}
+                    for chunk, translation in zip(chunks, translations)
+                ]
+            })
+
+        return {
+            'translation': reassemble(chunks, translations),
+            'revision': revision,
+            'stats': {
+                'sentences': len(chunks),
+                'unchanged': unchanged,
+                'moved': moved,
+                'translated': len(changed),
+                'removed': removed,
+                'elapsed_seconds': time.time() - start_time
+            }
+        }
+
+    def get(self, document_id, target_language):
+        """
+        Get the saved revision of a document.
+
+        Args:
+            document_id (str): Id of the document
+            target_language (str): Target language name
+
+        Returns:
+            dict or None: Revision number, last update time and number of
+            sentences, or None if the document was never translated
+        """
+        document = self._load(self._path(document_id, target_language))
+        if document is None:
+            return None
+        return {
+            'document_id': document_id,
+            'target_language': target_language,
+            'revision': document['revision'],
+            'updated_at': document['updated_at'],
+            'sentences': len(document['segments'])
+        }
+
+    def delete(self, document_id):
+        """
+        Forget a document in every target language.
+
+        Args:
+            document_id (str): Id of the document
+
+        Returns:
+            int: Number of saved translations removed
+        """
+        pattern = self._path(document_id, "*")
+        removed = 0
+        for path in glob.glob(pattern):
+            with self._locked(path):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            try:
+                os.remove(f"{path}.lock")
+            except OSError:
+                pass
+        return removed
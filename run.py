@@ -3,10 +3,17 @@ Script to run the translation application.
 """
 
 import os
+import gc
+import signal
+import socket
 import argparse
 import logging
+import threading
+from werkzeug.serving import make_server
+import app as app_module
 from app import app
 from utils import setup_logging, check_gpu_availability
+from concurrency import configure_torch_threads
 import config
 
 # Set up logging
@@ -17,15 +24,155 @@ setup_logging(
 )
 logger = logging.getLogger(__name__)
 
+def run_worker(sock, host, port, threads_per_worker):
+    """
+    Serve requests in a forked worker process.
+    
+    Args:
+        sock (socket.socket): Listening socket shared by all workers
+        host (str): Host the socket is bound to
+        port (int): Port the socket is bound to
+        threads_per_worker (int): torch intra-op threads for this worker
+            (divided between its model slots)
+    """
+    # Each worker gets its own slice of the cores so workers don't oversubscribe
+    threads_per_slot = configure_torch_threads(config.MODEL_SLOTS, inter_op_threads=config.INTER_OP_THREADS,
+                                               cores=threads_per_worker)
+    
+    # Workers that did not inherit a warm model (ONNX Runtime) warm their own
+    # before accepting connections; until then they queue on the socket
+    if config.WARMUP_ENABLED and app_module.readiness['status'] != 'ready':
+        app_module.warm_up()
+    
+    # Pick up translation jobs left unfinished by a previous run
+    app_module.get_job_manager()
+    
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    logger.info(f"Worker {os.getpid()} serving with {config.MODEL_SLOTS} model slots of "
+                f"{threads_per_slot} torch threads")
+    server.serve_forever()
+
+def serve_prefork(host, port, workers, threads_per_worker=None):
+    """
+    Load the model once, then fork workers that share it copy-on-write.
+    
+    The model weights are loaded in this (master) process before forking,
+    so every worker maps the same physical pages instead of holding its own
+    copy; pages are only duplicated if a worker writes to them, which
+    inference never does. Dead workers are restarted.
+    
+    Args:
+        host (str): Host to listen on
+        port (int): Port to listen on
+        workers (int): Number of worker processes
+        threads_per_worker (int, optional): torch intra-op threads per worker
+            (default: CPU cores divided evenly between workers)
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Pre-fork serving requires a platform with fork()")
+        
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    
+    if config.INFERENCE_BACKEND == "onnx":
+        # ONNX Runtime sessions are not fork-safe; each worker loads its own
+        logger.warning("ONNX Runtime backend: each worker loads its own copy of the model")
+    elif config.WARMUP_ENABLED:
+        if not app_module.warm_up():
+            raise RuntimeError(f"Could not load the model: {app_module.readiness['error']}")
+    else:
+        app_module.get_translator()
+        
+    # Keep the garbage collector from touching (and so copying) objects
+    # created before the fork
+    gc.collect()
+    gc.freeze()
+    
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+    
+    children = set()
+    shutting_down = False
+    
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run_worker(sock, host, port, threads_per_worker)
+            finally:
+                os._exit(0)
+        children.add(pid)
+    
+    def shutdown(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    
+    for _ in range(workers):
+        spawn()
+    logger.info(f"Started {workers} workers with {threads_per_worker} torch threads each")
+    
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        
+        if not shutting_down:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            spawn()
+    
+    sock.close()
+    logger.info("All workers stopped")
+
 def main():
     """Run the translation application"""
     parser = argparse.ArgumentParser(description="Run the translation application")
     parser.add_argument("--host", default=config.HOST, help="Host to run the server on")
     parser.add_argument("--port", type=int, default=config.PORT, help="Port to run the server on")
     parser.add_argument("--debug", action="store_true", default=config.DEBUG, help="Run in debug mode")
+    parser.add_argument("--precision", choices=["fp32", "bf16", "int8"], default=config.PRECISION,
+                        help="Model precision (int8 uses dynamic quantization on CPU)")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default=config.INFERENCE_BACKEND,
+                        help="Inference engine (onnx uses ONNX Runtime)")
+    parser.add_argument("--scheduler", choices=["micro", "continuous"], default=config.SCHEDULER_MODE,
+                        help="Request batching: micro-batches or the continuous batching engine")
+    parser.add_argument("--workers", type=int, default=config.WORKERS,
+                        help="Worker processes; more than 1 serves with pre-forked workers sharing one model")
+    parser.add_argument("--threads-per-worker", type=int, default=config.THREADS_PER_WORKER,
+                        help="torch threads per worker (default: CPU cores divided between workers)")
+    parser.add_argument("--model-slots", type=int, default=config.MODEL_SLOTS,
+                        help="Model calls run at once per worker (the worker's torch threads are divided between them)")
+    parser.add_argument("--draft-model", default=config.DRAFT_MODEL_PATH,
+                        help="Draft model for speculative decoding of 'fast' requests (torch backend)")
+    parser.add_argument("--no-warmup", action="store_true", default=not config.WARMUP_ENABLED,
+                        help="Load the model on the first translation request instead of at startup")
     
     args = parser.parse_args()
     
+    # The translator is created lazily by the app and reads these settings
+    config.PRECISION = args.precision
+    config.INFERENCE_BACKEND = args.backend
+    config.SCHEDULER_MODE = args.scheduler
+    config.MODEL_SLOTS = args.model_slots
+    config.DRAFT_MODEL_PATH = args.draft_model
+    config.WARMUP_ENABLED = not args.no_warmup
+    
     # Check GPU availability
     gpu_info = check_gpu_availability()
     if gpu_info['available']:
@@ -34,13 +181,32 @@ def main():
         logger.info("GPU not available, using CPU. Translation will be slower.")
     
     # Ensure directories exist
-    for directory in [config.TEMPLATES_DIR, config.STATIC_DIR, config.LOGS_DIR]:
+    for directory in [config.TEMPLATES_DIR, config.STATIC_DIR, config.LOGS_DIR, config.CACHE_DIR, config.MODELS_DIR,
+                      config.JOBS_DIR]:
         os.makedirs(directory, exist_ok=True)
     
     # Print application info
-    logger.info(f"Starting {config.APP_NAME} v{config.APP_VERSION}")
+    logger.info(f"Starting {config.APP_NAME} v{config.APP_VERSION} ({args.backend}, {args.precision})")
     logger.info(f"Server running at http://{args.host}:{args.port}")
     
+    if args.workers > 1:
+        serve_prefork(args.host, args.port, args.workers, args.threads_per_worker)
+        return
+    
+    # Divide the cores between the model slots before torch starts any work
+    threads_per_slot = configure_torch_threads(config.MODEL_SLOTS, inter_op_threads=config.INTER_OP_THREADS,
+                                               cores=args.threads_per_worker)
+    logger.info(f"{config.MODEL_SLOTS} model slots of {threads_per_slot} torch threads")
+    
+    # Load and warm up the model, and pick up translation jobs left
+    # unfinished by a previous run (in the serving process only, not in the
+    # debug reloader's parent). The server starts meanwhile so /health and
+    # /ready answer; translation requests get 503 until the model is ready.
+    if not args.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        if config.WARMUP_ENABLED:
+            threading.Thread(target=app_module.warm_up, name="model-warmup", daemon=True).start()
+        app_module.get_job_manager()
+    
     # Run the Flask app
     app.run(
         host=args.host,
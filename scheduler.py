@@ -0,0 +1,253 @@
+"""
+Dynamic micro-batching scheduler for the translation API.
+
+Concurrent requests for the same language pair are collected over a short
+window and translated together with a single padded generate call. A
+request for a segment that is already queued or being translated waits for
+that translation instead of adding another copy.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import metrics
+from utils import follow_future, normalize_segment
+
+logger = logging.getLogger(__name__)
+
+class _PendingRequest:
+    """A single text waiting to be translated"""
+
+    __slots__ = ("text", "num_tokens", "enqueued_at", "future")
+
+    def __init__(self, text, num_tokens):
+        self.text = text
+        self.num_tokens = num_tokens
+        self.enqueued_at = time.monotonic()
+        self.future = Future()
+
+class BatchScheduler:
+    """
+    Collects translation requests from many threads and runs them in batches.
+
+    Requests are grouped by (source language, target language, generation
+    profile). A group is
+    flushed as soon as its oldest request has waited ``max_wait_ms``, or when
+    it holds enough work to fill ``max_batch_tokens`` / ``max_batch_size``.
+    Batches run on one more worker thread than the translator has model
+    slots, so the next batch is tokenized while the current one holds the
+    model; while every worker is busy, waiting requests keep joining their
+    groups.
+    """
+
+    def __init__(self, translator, max_wait_ms=10, max_batch_tokens=4096, max_batch_size=16):
+        """
+        Initialize the scheduler.
+
+        Args:
+            translator (Translator): Translator used to run the batches
+            max_wait_ms (float): Maximum time a request waits for companions
+            max_batch_tokens (int): Maximum padded tokens (longest input * batch size) per batch
+            max_batch_size (int): Maximum number of requests per batch
+        """
+        self.translator = translator
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+
+        self._pending = {}
+        self._in_flight = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        workers = translator.slots.slots + 1
+        self._executor = None
+        self._workers = workers
+        self._free_workers = threading.Semaphore(workers)
+
+    def start(self):
+        """Start the dispatcher thread"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="batch-worker")
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Batch scheduler started (max wait {self.max_wait * 1000:.0f} ms, "
+            f"max batch tokens {self.max_batch_tokens}, max batch size {self.max_batch_size})"
+        )
+
+    def stop(self):
+        """Stop the dispatcher thread and fail any requests still waiting"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            # Batches already handed to workers finish
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        with self._condition:
+            for queue in self._pending.values():
+                while queue:
+                    queue.popleft().future.set_exception(RuntimeError("Scheduler stopped"))
+            self._pending.clear()
+
+    def submit(self, text, target_language, source_language="english", profile=None):
+        """
+        Queue a text for translation.
+
+        Args:
+            text (str): Text to translate
+            target_language (str): Target language name
+            source_language (str): Source language name (default: "english")
+            profile (str, optional): Generation profile (default: the translator's)
+
+        Returns:
+            concurrent.futures.Future: Resolves to the translated text
+        """
+        if not isinstance(text, str):
+            raise TypeError("Text must be a string")
+
+        if not self._running:
+            self.start()
+
+        profile = profile or self.translator.profile
+        key = (source_language, target_language, profile, normalize_segment(text))
+
+        # Counted in the caller's thread, off the threads running the model
+        try:
+            num_tokens = self.translator.count_tokens(text)
+        except Exception as e:
+            # Let the batch itself surface the error to the caller
+            logger.error(f"Token counting error: {str(e)}")
+            num_tokens = 0
+
+        with self._condition:
+            leader = self._in_flight.get(key)
+            if leader is not None:
+                metrics.DEDUPLICATED_SEGMENTS.labels(stage="in_flight").inc()
+                return follow_future(leader)
+
+            pending = _PendingRequest(text, num_tokens)
+            self._in_flight[key] = pending.future
+            self._pending.setdefault((source_language, target_language, profile), deque()).append(pending)
+            self._condition.notify()
+
+        pending.future.add_done_callback(lambda future: self._forget(key, future))
+        return pending.future
+
+    def _forget(self, key, future):
+        """Stop sharing a finished request with new identical ones"""
+        with self._condition:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def translate(self, text, target_language, source_language="english", timeout=None, profile=None):
+        """
+        Translate a text through the scheduler and wait for the result.
+
+        Args:
+            text (str): Text to translate
+            target_language (str): Target language name
+            source_language (str): Source language name (default: "english")
+            timeout (float, optional): Seconds to wait for the result
+            profile (str, optional): Generation profile (default: the translator's)
+
+        Returns:
+            str: Translated text
+        """
+        return self.submit(text, target_language, source_language, profile).result(timeout=timeout)
+
+    def _run(self):
+        """Dispatcher loop: wait for a free worker and a ready group, then hand the group over"""
+        while True:
+            self._free_workers.acquire()
+            with self._condition:
+                key, batch, wait = self._next_batch()
+                while self._running and batch is None:
+                    self._condition.wait(timeout=wait)
+                    key, batch, wait = self._next_batch()
+                if not self._running:
+                    self._free_workers.release()
+                    return
+
+            future = self._executor.submit(self._run_batch, key, batch)
+            future.add_done_callback(lambda _: self._free_workers.release())
+
+    def _next_batch(self):
+        """
+        Pick the next group that is ready to run. Must hold the lock.
+
+        Returns:
+            tuple: ``(key, batch, None)`` for a ready group, or
+            ``(None, None, wait_seconds)`` when nothing is ready yet
+            (``wait_seconds`` is None if there is no pending work)
+        """
+        now = time.monotonic()
+        next_wait = None
+
+        for key, queue in self._pending.items():
+            if not queue:
+                continue
+
+            longest = max(pending.num_tokens for pending in queue)
+            waited = now - queue[0].enqueued_at
+            if (waited >= self.max_wait
+                    or len(queue) >= self.max_batch_size
+                    or longest * len(queue) >= self.max_batch_tokens):
+                return key, self._take_batch(queue), None
+
+            remaining = self.max_wait - waited
+            next_wait = remaining if next_wait is None else min(next_wait, remaining)
+
+        return None, None, next_wait
+
+    def _take_batch(self, queue):
+        """Pop requests off a queue while they fit in the batch limits"""
+        batch = [queue.popleft()]
+        longest = batch[0].num_tokens
+
+        while queue and len(batch) < self.max_batch_size:
+            candidate_longest = max(longest, queue[0].num_tokens)
+            if candidate_longest * (len(batch) + 1) > self.max_batch_tokens:
+                break
+            longest = candidate_longest
+            batch.append(queue.popleft())
+
+        return batch
+
+    def _run_batch(self, key, batch):
+        """Translate a batch and hand each result back to its waiting request"""
+        source_language, target_language, profile = key
+        texts = [pending.text for pending in batch]
+
+        now = time.monotonic()
+        for pending in batch:
+            metrics.QUEUE_WAIT_SECONDS.labels(scheduler="micro").observe(now - pending.enqueued_at)
+
+        logger.debug(f"Running batch of {len(batch)} {profile} requests for {source_language}->{target_language}")
+
+        try:
+            translations = self.translator.translate(
+                texts, target_language, source_language, batch_size=len(texts), profile=profile
+            )
+        except Exception as e:
+            logger.error(f"Scheduled batch translation error: {str(e)}")
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        for pending, translation in zip(batch, translations):
+            pending.future.set_result(translation)
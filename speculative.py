@@ -0,0 +1,156 @@
+"""
+Speculative decoding with a small draft model.
+
+Decoding dominates the cost of MBart-large: every output token needs a full
+pass through the large decoder. Here a small draft model that shares the
+tokenizer proposes a few tokens at a time, and the large model checks all
+of them in a single decoder pass. Proposals are kept up to the first token
+the large model would have chosen differently, and that token comes from
+the same pass, so each pass adds at least one token and the output is the
+large model's own greedy translation.
+"""
+
+import threading
+import torch
+from transformers.modeling_outputs import BaseModelOutput
+import metrics
+from generation import repeated_tail
+
+class SpeculativeDecoder:
+    """
+    Greedy decoding of the translation model, accelerated by a draft model.
+
+    Sequences are decoded one at a time, since each accepts a different
+    number of proposals per pass, so the translator only uses it for
+    single-sequence batches and leaves larger ones to batched generate.
+    Counters of proposed and accepted tokens show whether the draft model
+    pays off.
+    """
+
+    def __init__(self, backend, draft_backend, num_draft_tokens=4):
+        """
+        Initialize the decoder.
+
+        Args:
+            backend (InferenceBackend): Backend of the translation model
+            draft_backend (InferenceBackend): Backend of the draft model
+                (same tokenizer)
+            num_draft_tokens (int): Tokens the draft model proposes per pass
+                of the translation model
+        """
+        self.backend = backend
+        self.draft_backend = draft_backend
+        self.num_draft_tokens = num_draft_tokens
+        self.eos_token_id = backend.model.config.eos_token_id
+
+        self._stats = {'sequences': 0, 'passes': 0, 'proposed_tokens': 0, 'accepted_tokens': 0,
+                       'generated_tokens': 0}
+        self._lock = threading.Lock()
+
+    def generate(self, encoded, encoder_outputs, decoder_prompts, budgets):
+        """
+        Decode a batch of inputs.
+
+        Args:
+            encoded (dict): Right-padded ``input_ids`` and ``attention_mask``
+            encoder_outputs (BaseModelOutput): Outputs of the translation
+                model's encoder for ``encoded``
+            decoder_prompts (list): Tokens each output starts with (decoder
+                start and language code)
+            budgets (list): Maximum new tokens after the prompt of each output
+
+        Returns:
+            list: Token ids of each output, prompt included
+        """
+        draft_states = self.draft_backend.encode(**encoded).last_hidden_state
+        lengths = encoded["attention_mask"].sum(dim=1).tolist()
+
+        outputs = []
+        with metrics.DECODE_SECONDS.time():
+            for row, (length, prompt, budget) in enumerate(zip(lengths, decoder_prompts, budgets)):
+                # Without the padding, which a single sequence doesn't need
+                outputs.append(self._decode(
+                    BaseModelOutput(last_hidden_state=encoder_outputs.last_hidden_state[row:row + 1, :length]),
+                    BaseModelOutput(last_hidden_state=draft_states[row:row + 1, :length]),
+                    encoded["attention_mask"][row:row + 1, :length],
+                    list(prompt), budget
+                ))
+        return outputs
+
+    def _decode(self, encoder_outputs, draft_encoder_outputs, attention_mask, tokens, budget):
+        """Decode one sequence, a pass of the translation model at a time"""
+        device = attention_mask.device
+        prompt_length = len(tokens)
+        cache = draft_cache = None
+        # Tokens whose keys/values each model has cached
+        cached = draft_cached = 0
+        passes = proposed = accepted = 0
+
+        while True:
+            remaining = budget - (len(tokens) - prompt_length)
+            if (remaining <= 0 or (len(tokens) > prompt_length and tokens[-1] == self.eos_token_id)
+                    or repeated_tail(tokens[prompt_length:])):
+                break
+
+            # The draft model proposes tokens (the translation model adds one more)
+            proposal = []
+            while len(proposal) < min(self.num_draft_tokens, remaining - 1):
+                draft_input = torch.tensor([(tokens + proposal)[draft_cached:]], device=device)
+                logits, draft_cache = self.draft_backend.decode_step(
+                    draft_encoder_outputs, attention_mask, draft_input, draft_cache
+                )
+                draft_cached = len(tokens) + len(proposal)
+                proposal.append(int(logits[0].argmax()))
+                if proposal[-1] == self.eos_token_id:
+                    break
+
+            # The translation model scores the last token and every proposal in one pass
+            model_input = torch.tensor([(tokens + proposal)[cached:]], device=device)
+            logits, cache = self.backend.decode_tokens(encoder_outputs, attention_mask, model_input, cache)
+            choices = logits[0, -(len(proposal) + 1):].argmax(dim=-1).tolist()
+
+            matched = 0
+            while matched < len(proposal) and proposal[matched] == choices[matched]:
+                matched += 1
+            if matched == len(proposal) and proposal and proposal[-1] == self.eos_token_id:
+                tokens.extend(proposal)
+            else:
+                tokens.extend(proposal[:matched] + [choices[matched]])
+
+            # Keys/values of rejected proposals are dropped
+            cached = min(cached + model_input.shape[1], len(tokens) - 1)
+            cache.crop(cached)
+            if proposal:
+                draft_cached = min(draft_cached, len(tokens) - 1)
+                draft_cache.crop(draft_cached)
+
+            passes += 1
+            proposed += len(proposal)
+            accepted += matched
+
+        metrics.DRAFT_TOKENS.labels(result="accepted").inc(accepted)
+        metrics.DRAFT_TOKENS.labels(result="rejected").inc(proposed - accepted)
+        with self._lock:
+            self._stats['sequences'] += 1
+            self._stats['passes'] += passes
+            self._stats['proposed_tokens'] += proposed
+            self._stats['accepted_tokens'] += accepted
+            self._stats['generated_tokens'] += len(tokens) - prompt_length
+        return tokens
+
+    def stats(self):
+        """
+        Get the acceptance counters.
+
+        Returns:
+            dict: Sequences decoded, passes of the translation model, draft
+            tokens proposed and accepted, the acceptance rate, and tokens
+            generated per pass (1.0 means the draft model saved nothing)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['acceptance_rate'] = (stats['accepted_tokens'] / stats['proposed_tokens']
+                                    if stats['proposed_tokens'] else 0.0)
+        stats['tokens_per_pass'] = stats['generated_tokens'] / stats['passes'] if stats['passes'] else 0.0
+        stats['num_draft_tokens'] = self.num_draft_tokens
+        return stats
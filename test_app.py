@@ -0,0 +1,61 @@
+"""
+Tests for the Flask app's lazily created services and readiness.
+"""
+
+import threading
+
+import pytest
+
+import config
+
+@pytest.mark.parametrize("getter", ["get_scheduler", "get_cache", "get_memory", "get_job_manager", "get_revisions"])
+def test_concurrent_first_use_creates_one_instance(served_app, getter):
+    barrier = threading.Barrier(8)
+    instances = []
+
+    def first_use():
+        barrier.wait()
+        instances.append(getattr(served_app, getter)())
+
+    threads = [threading.Thread(target=first_use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(instances) == 8
+    assert len({id(instance) for instance in instances}) == 1
+
+def test_stats_report_the_continuous_engine(served_app, monkeypatch):
+    client = served_app.app.test_client()
+    assert client.get('/stats').get_json() == {'mode': "micro", 'started': False}
+
+    monkeypatch.setattr(config, "SCHEDULER_MODE", "continuous")
+    served_app.get_scheduler().translate("Revenue grew.", "hindi", timeout=60)
+    stats = client.get('/stats').get_json()
+    assert stats['mode'] == "continuous"
+    assert stats['engine']['completed'] == 1
+
+def test_ready_only_after_warm_up(served_app):
+    client = served_app.app.test_client()
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == "idle"
+
+    assert served_app.warm_up(runs=1)
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.get_json()['ready'] is True
+
+@pytest.mark.parametrize("status", ["loading", "failed"])
+def test_translation_is_refused_until_ready(served_app, status):
+    served_app.readiness['status'] = status
+    client = served_app.app.test_client()
+
+    response = client.post('/translate', json={'text': "Revenue grew.", 'target_language': "hindi"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert response.get_json()['status'] == status
+    assert client.get('/ready').status_code == 503
+    # Endpoints that don't need the model still answer
+    assert client.get('/health').status_code == 200
@@ -0,0 +1,42 @@
+"""
+Tests for the ONNX Runtime backend's cached export.
+"""
+
+import json
+import os
+
+import pytest
+
+from benchmark import build_tiny_model
+
+pytest.importorskip("optimum.onnxruntime")
+
+def load_onnx(model_name, export_dir):
+    from translator import Translator
+    return Translator(model_name=model_name, device="cpu", profile="fast", backend="onnx",
+                      onnx_model_dir=export_dir)
+
+def test_export_is_reused(tiny_model, tmp_path):
+    export_dir = str(tmp_path / "onnx")
+    load_onnx(tiny_model, export_dir)
+    encoder_path = os.path.join(export_dir, "encoder_model.onnx")
+    modified = os.stat(encoder_path).st_mtime_ns
+
+    load_onnx(tiny_model, export_dir)
+    assert os.stat(encoder_path).st_mtime_ns == modified
+
+def test_export_from_another_model_is_replaced(translator, tiny_model, tmp_path):
+    export_dir = str(tmp_path / "onnx")
+    load_onnx(tiny_model, export_dir)
+
+    other_model = build_tiny_model(str(tmp_path / "other-model"), seed=1)
+    onnx_translator = load_onnx(other_model, export_dir)
+    with open(os.path.join(export_dir, "export_manifest.json"), encoding='utf-8') as f:
+        assert json.load(f)['source_model'] == other_model
+
+    from translator import Translator
+    torch_translator = Translator(model_name=other_model, device="cpu", profile="fast")
+    text = "The quarterly report is ready for review."
+    expected = torch_translator.translate(text, "hindi", max_length=32)
+    assert onnx_translator.translate(text, "hindi", max_length=32) == expected
+    assert translator.translate(text, "hindi", max_length=32) != expected
@@ -0,0 +1,26 @@
+"""
+Tests for the benchmark suite's statistics and baseline comparison.
+"""
+
+from benchmark import compare, summarize
+
+def run(*cases):
+    return {'runs': {'fp32': {'cases': [summarize(name, {}, latencies, 10, 100, 100)
+                                        for name, latencies in cases]}}}
+
+def test_summary_reports_throughput_and_percentiles():
+    case = summarize("batch", {'batch_size': 8}, [0.1, 0.2, 0.3, 0.4], segments=20, input_tokens=400,
+                     output_tokens=300)
+    assert case['calls'] == 4
+    assert case['segments_per_s'] == 20
+    assert case['input_tokens_per_s'] == 400
+    assert (case['latency_p50_s'], case['latency_p95_s'], case['latency_p99_s']) == (0.2, 0.4, 0.4)
+
+def test_only_changes_beyond_the_tolerance_regress():
+    baseline = run(("steady", [1.0]), ("slower", [1.0]), ("faster", [1.0]), ("removed", [1.0]))
+    results = run(("steady", [1.05]), ("slower", [1.5]), ("faster", [0.5]), ("added", [1.0]))
+
+    comparisons = {comparison['name']: comparison for comparison in compare(results, baseline, 0.1)}
+    assert sorted(comparisons) == ["faster", "slower", "steady"]
+    assert [name for name, comparison in sorted(comparisons.items()) if comparison['regression']] == ["slower"]
+    assert round(comparisons['slower']['latency_p50_change'], 6) == 0.5
@@ -0,0 +1,37 @@
+"""
+Tests for length-bucketed batch translation.
+"""
+
+from translator import Translator
+
+TEXTS = [
+    "The quarterly report, which covers every region and business line, is ready for review by the board.",
+    "Costs fell.",
+    "Revenue grew by 12 percent.",
+    "Margins were stable across all regions this quarter.",
+    "Thanks.",
+    "The board will meet next week to discuss the results and approve the dividend."
+]
+
+def test_buckets_group_inputs_by_length():
+    input_ids = [[0] * length for length in (9, 2, 5, 7, 1, 8)]
+    batches = Translator._length_buckets(input_ids, batch_size=2)
+
+    assert batches == [[4, 1], [2, 3], [5, 0]]
+    assert sorted(i for batch in batches for i in batch) == list(range(len(input_ids)))
+
+def test_buckets_respect_the_token_budget():
+    input_ids = [[0] * length for length in (9, 2, 5, 7, 1, 8)]
+    for batch in Translator._length_buckets(input_ids, batch_size=8, max_batch_tokens=16):
+        assert len(batch) == 1 or max(len(input_ids[i]) for i in batch) * len(batch) <= 16
+
+def test_batch_translations_come_back_in_input_order(translator, record_calls):
+    expected = [translator.translate(text, "hindi", max_length=64) for text in TEXTS]
+    translator.cache = None
+    batches = record_calls(translator, "_pad_batch", record=lambda input_ids: [len(ids) for ids in input_ids])
+
+    assert translator.translate(TEXTS, "hindi", batch_size=2, max_length=64) == expected
+    # Batches were formed by length, not input order
+    assert len(batches) == 3
+    assert [length for batch in batches for length in batch] == sorted(length for batch in batches
+                                                                       for length in batch)
@@ -0,0 +1,136 @@
+"""
+Tests for bulk translation: checkpoint-resume and per-input failures.
+"""
+
+import json
+import os
+
+import pytest
+
+from bulk import CHECKPOINT_FILE, BulkTranslator, find_inputs
+
+PARAGRAPHS = [
+    "The report shows revenue growth.",
+    "Students submit their assessments.",
+    "Please review the attached document.",
+    "Costs remained stable."
+]
+
+@pytest.fixture
+def inputs(tmp_path):
+    """Five text files of four paragraphs each, one in a subdirectory"""
+    root = tmp_path / "in"
+    (root / "sub").mkdir(parents=True)
+    for i in range(5):
+        path = root / ("sub" if i == 4 else "") / f"report{i}.txt"
+        path.write_text("\n\n".join(f"{paragraph} Part {i}." for paragraph in PARAGRAPHS), encoding="utf-8")
+    return root
+
+def poison(translator, marker="POISON"):
+    """Make the translator fail (return None) for any text containing marker"""
+    translate = translator.translate
+
+    def poisoned_translate(text, *args, **kwargs):
+        if isinstance(text, list):
+            return [None if marker in item else result
+                    for item, result in zip(text, translate(text, *args, **kwargs))]
+        return None if marker in text else translate(text, *args, **kwargs)
+
+    translator.translate = poisoned_translate
+
+def read_outputs(output_dir):
+    """Relative path -> content of every output file"""
+    outputs = {}
+    for directory, _, files in os.walk(output_dir):
+        for name in files:
+            if name != CHECKPOINT_FILE:
+                path = os.path.join(directory, name)
+                with open(path, 'r', encoding='utf-8') as f:
+                    outputs[os.path.relpath(path, output_dir)] = f.read()
+    return outputs
+
+def test_rerun_skips_translated_files(translator, inputs, tmp_path):
+    output_dir = str(tmp_path / "out")
+    bulk = BulkTranslator(translator, "hindi", window_segments=6)
+    stats = bulk.translate_files(find_inputs([str(inputs)]), output_dir)
+    assert (stats['files'], stats['skipped'], stats['failed'], stats['segments']) == (5, 0, 0, 20)
+    assert sorted(read_outputs(output_dir)) == sorted(
+        [f"report{i}.txt" for i in range(4)] + [os.path.join("sub", "report4.txt")]
+    )
+
+    stats = bulk.translate_files(find_inputs([str(inputs)]), output_dir)
+    assert (stats['files'], stats['skipped']) == (0, 5)
+
+def test_interrupted_run_resumes(translator, inputs, tmp_path):
+    expected_dir = str(tmp_path / "expected")
+    BulkTranslator(translator, "hindi", window_segments=6).translate_files(find_inputs([str(inputs)]), expected_dir)
+
+    output_dir = str(tmp_path / "out")
+    translate = translator.translate
+    calls = []
+
+    def killed_translate(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > 2:
+            raise KeyboardInterrupt("killed")
+        return translate(*args, **kwargs)
+
+    translator.translate = killed_translate
+    with pytest.raises(KeyboardInterrupt):
+        BulkTranslator(translator, "hindi", window_segments=6).translate_files(find_inputs([str(inputs)]), output_dir)
+    translator.translate = translate
+
+    stats = BulkTranslator(translator, "hindi", window_segments=6).translate_files(
+        find_inputs([str(inputs)]), output_dir
+    )
+    assert stats['skipped'] > 0
+    assert stats['files'] + stats['skipped'] == 5
+    assert read_outputs(output_dir) == read_outputs(expected_dir)
+
+def test_failed_file_is_recorded_and_the_run_continues(translator, inputs, tmp_path):
+    (inputs / "report2.txt").write_text("First paragraph.\n\nA POISON paragraph.", encoding="utf-8")
+    poison(translator)
+    output_dir = str(tmp_path / "out")
+    bulk = BulkTranslator(translator, "hindi", window_segments=6)
+
+    stats = bulk.translate_files(find_inputs([str(inputs)]), output_dir)
+    assert (stats['files'], stats['failed']) == (4, 1)
+    assert [failure['input'] for failure in stats['failures']] == ["report2.txt"]
+    assert "report2.txt" not in read_outputs(output_dir)
+    assert not os.path.exists(os.path.join(output_dir, "report2.part.txt"))
+    with open(os.path.join(output_dir, CHECKPOINT_FILE), 'r', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry['input'] for entry in entries if 'error' in entry] == ["report2.txt"]
+
+    # A rerun reports the failure without translating it again
+    stats = bulk.translate_files(find_inputs([str(inputs)]), output_dir)
+    assert (stats['files'], stats['skipped'], stats['failed']) == (0, 4, 1)
+
+    # Once fixed, it is retried on request
+    del translator.translate
+    stats = bulk.translate_files(find_inputs([str(inputs)]), output_dir, retry_failed=True)
+    assert (stats['files'], stats['skipped'], stats['failed']) == (1, 4, 0)
+    assert "report2.txt" in read_outputs(output_dir)
+
+def test_jsonl_failed_record_gets_an_error_line(translator, tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    records = [{'id': i, 'text': paragraph} for i, paragraph in enumerate(PARAGRAPHS)]
+    records.insert(2, {'id': "bad", 'text': "A POISON record."})
+    records.append({'id': "tamil", 'text': PARAGRAPHS[0], 'target_language': "tamil"})
+    input_path.write_text("\n".join(json.dumps(record) for record in records) + "\n", encoding="utf-8")
+    output_path = str(tmp_path / "out.jsonl")
+    poison(translator)
+    bulk = BulkTranslator(translator, "hindi", window_segments=3)
+
+    stats = bulk.translate_jsonl(str(input_path), output_path)
+    assert (stats['records'], stats['failed']) == (5, 1)
+    assert [failure['id'] for failure in stats['failures']] == ["bad"]
+    with open(output_path, 'r', encoding='utf-8') as f:
+        results = [json.loads(line) for line in f]
+    assert [result['id'] for result in results] == [record['id'] for record in records]
+    assert 'error' in results[2] and 'translation' not in results[2]
+    assert results[-1]['target_language'] == "tamil"
+
+    # Every record is in the output, so a rerun has nothing left to do
+    stats = bulk.translate_jsonl(str(input_path), output_path)
+    assert (stats['records'], stats['skipped']) == (0, 6)
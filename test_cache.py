@@ -0,0 +1,71 @@
+"""
+Tests for the two-tier translation cache.
+"""
+
+from cache import TranslationCache, make_cache_key
+
+def test_key_covers_language_model_and_parameters():
+    key = make_cache_key("Revenue grew.", "en_XX", "hi_IN", "model", {'max_length': 1024})
+    assert key == make_cache_key("  Revenue   grew. ", "en_XX", "hi_IN", "model", {'max_length': 1024})
+    assert key != make_cache_key("Revenue grew.", "en_XX", "ta_IN", "model", {'max_length': 1024})
+    assert key != make_cache_key("Revenue grew.", "en_XX", "hi_IN", "other-model", {'max_length': 1024})
+    assert key != make_cache_key("Revenue grew.", "en_XX", "hi_IN", "model", {'max_length': 64})
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TranslationCache(max_bytes=700)
+    cache.put("a", "x" * 100)
+    cache.put("b", "x" * 100)
+    cache.get("a")
+    cache.put("c", "x" * 100)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.stats()['evictions'] == 1
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    TranslationCache(db_path=db_path).put_many([("a", "one"), ("b", "two"), ("c", None)])
+
+    cache = TranslationCache(db_path=db_path)
+    assert cache.get("a") == "one"
+    assert cache.get("b") == "two"
+    assert cache.get("c") is None
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['misses'], stats['disk_entries']) == (2, 1, 2)
+
+    # Disk hits are promoted into memory
+    cache.get("a")
+    assert cache.stats()['memory_hits'] == 1
+
+def test_disk_tier_evicts_oldest_entries(tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.sqlite3"), max_disk_entries=10)
+    for i in range(12):
+        cache.put(f"key-{i}", f"translation {i}")
+
+    reopened = TranslationCache(db_path=str(tmp_path / "cache.sqlite3"), max_disk_entries=10)
+    stats = reopened.stats()
+    assert stats['disk_entries'] <= 10
+    assert cache.stats()['disk_evictions'] > 0
+    assert reopened.get("key-0") is None
+    assert reopened.get("key-11") == "translation 11"
+
+def test_clear_empties_both_tiers(tmp_path):
+    cache = TranslationCache(db_path=str(tmp_path / "cache.sqlite3"))
+    cache.put("a", "one")
+    cache.clear()
+
+    assert cache.get("a") is None
+    assert cache.stats()['disk_entries'] == 0
+
+def test_translator_serves_repeated_batches_from_cache(translator, tmp_path):
+    translator.cache = TranslationCache(db_path=str(tmp_path / "cache.sqlite3"))
+    texts = ["The report shows revenue growth.", "Costs remained stable."]
+    first = translator.translate(texts, "hindi")
+
+    stats = {}
+    assert translator.translate(texts, "hindi", stats=stats) == first
+    assert (stats['cache_hits'], stats['model_segments']) == (2, 0)
+
+    # A different profile is a different translation
+    translator.translate(texts, "hindi", stats=stats, profile="balanced")
+    assert stats['cache_hits'] == 0
@@ -0,0 +1,65 @@
+"""
+Tests for sentence-aware chunking and reassembly.
+"""
+
+import logging
+
+import pytest
+
+from chunking import Chunk, chunk_text, reassemble, split_sentences
+from utils import split_text_into_chunks
+
+def test_sentences_split_on_terminal_punctuation_only():
+    text = 'Dr. Rao presented the report. Revenue rose 4.5% in Q3! "Costs fell." Next steps follow.'
+    assert split_sentences(text) == [
+        "Dr. Rao presented the report.", "Revenue rose 4.5% in Q3!", '"Costs fell."', "Next steps follow."
+    ]
+
+def test_sentences_are_packed_up_to_the_budget():
+    chunks = chunk_text("One two three. Four five. Six seven eight nine.", 5)
+    assert chunks == [Chunk("One two three. Four five.", " "), Chunk("Six seven eight nine.", "")]
+
+def test_long_sentence_is_split_on_words():
+    chunks = chunk_text("a b c d e f g", 3)
+    assert [chunk.text for chunk in chunks] == ["a b c", "d e f", "g"]
+
+def test_chunks_never_cross_line_breaks():
+    chunks = chunk_text("Title\n\nFirst sentence. Second one.\nLast line.", 100)
+    assert chunks == [Chunk("Title", "\n\n"), Chunk("First sentence. Second one.", "\n"), Chunk("Last line.", "")]
+
+def test_one_chunk_per_sentence_without_packing():
+    chunks = chunk_text("First sentence. Second one.", 100, pack=False)
+    assert [chunk.text for chunk in chunks] == ["First sentence.", "Second one."]
+
+def test_reassembly_keeps_the_original_layout():
+    text = "Heading\n\nFirst sentence. Second one.\n  Indented line."
+    chunks = chunk_text(text, 3)
+    translations = [chunk.text.upper() for chunk in chunks]
+    assert reassemble(chunks, translations) == "HEADING\n\nFIRST SENTENCE. SECOND ONE.\n  INDENTED LINE."
+
+def test_chunks_cover_the_text_without_overlap():
+    text = " ".join(f"Sentence number {i} of the report." for i in range(50))
+    chunks = chunk_text(text, 20)
+    assert " ".join(chunk.text for chunk in chunks) == text
+
+def test_split_text_into_chunks_ignores_deprecated_overlap(caplog):
+    text = "First sentence. Second one."
+    with caplog.at_level(logging.WARNING):
+        chunks = split_text_into_chunks(text, chunk_size=20, overlap=5)
+    assert chunks == split_text_into_chunks(text, chunk_size=20) == ["First sentence.", "Second one."]
+    assert "deprecated" in caplog.text
+
+def test_large_text_accepts_deprecated_chunk_arguments(translator):
+    text = "Revenue grew. Margins held. Costs fell in every region this quarter."
+    with pytest.warns(DeprecationWarning):
+        translation = translator.translate_large_text(text, "hindi", chunk_size=45, overlap=5, max_length=32)
+
+    # chunk_size counts characters, as in split_text_into_chunks
+    chunks = split_text_into_chunks(text, chunk_size=45)
+    assert chunks == ["Revenue grew. Margins held.", "Costs fell in every region this quarter."]
+    assert translation == " ".join(translator.translate(chunks, "hindi", max_length=32))
+
+    with pytest.warns(DeprecationWarning):
+        streamed = "".join(translator.translate_large_text_iter(text, "hindi", chunk_size=45, overlap=5,
+                                                                max_length=32))
+    assert streamed == translation
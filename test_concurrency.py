@@ -0,0 +1,29 @@
+"""
+Tests for running one translator from many threads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+REQUESTS = [
+    ("The quarterly report is ready for review.", "english", "hindi"),
+    ("Margins were stable.", "english", "tamil"),
+    ("राजस्व में वृद्धि हुई।", "hindi", "english"),
+    ("Costs fell slightly.", "english", "telugu")
+] * 4
+
+def test_tokenize_matches_tokenizer_source_language(translator):
+    tokenizer = translator.tokenizer
+    for text, source_language, _ in REQUESTS[:4]:
+        source_code = translator.language_codes[source_language]
+        tokenizer.src_lang = source_code
+        expected = tokenizer(text, truncation=True, max_length=64)["input_ids"]
+        assert translator.backend.tokenize([text], 64, source_code) == [expected]
+
+def test_concurrent_requests_match_serial(translator):
+    def translate(request):
+        text, source_language, target_language = request
+        return translator.translate(text, target_language, source_language, max_length=32)
+
+    expected = [translate(request) for request in REQUESTS]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(translate, REQUESTS)) == expected
@@ -0,0 +1,47 @@
+"""
+Tests for in-batch and cross-request segment deduplication.
+"""
+
+from engine import ContinuousBatchingEngine
+from scheduler import BatchScheduler
+from utils import deduplicate_segments
+
+def test_segments_differing_in_whitespace_are_one_segment():
+    unique, positions = deduplicate_segments(["Total", "Net  income", "Total ", "Net income\n", "Total"])
+    assert unique == ["Total", "Net  income"]
+    assert positions == [0, 1, 0, 1, 0]
+
+def test_batch_translates_each_distinct_segment_once(translator, record_calls):
+    batches = record_calls(translator, "_generate_batches")
+    texts = ["Total", "Revenue grew.", "Total", " Total", "Revenue grew."]
+    stats = {}
+    translations = translator.translate(texts, "hindi", stats=stats)
+
+    assert batches == [["Total", "Revenue grew."]]
+    assert translations[0] == translations[2] == translations[3]
+    assert translations[1] == translations[4]
+    assert (stats['unique_segments'], stats['duplicate_segments'], stats['model_segments']) == (2, 3, 2)
+
+def test_scheduler_shares_in_flight_requests(translator, record_calls):
+    batches = record_calls(translator, "translate")
+    scheduler = BatchScheduler(translator, max_wait_ms=300)
+    try:
+        futures = [scheduler.submit(text, "hindi") for text in ("Revenue grew.", "Revenue  grew.", "Total")]
+        results = [future.result(timeout=60) for future in futures]
+    finally:
+        scheduler.stop()
+
+    assert batches == [["Revenue grew.", "Total"]]
+    assert results[0] == results[1]
+
+def test_engine_shares_in_flight_requests(translator):
+    engine = ContinuousBatchingEngine(translator, max_length=40)
+    try:
+        futures = [engine.submit(text, "hindi") for text in ("Revenue grew.", " Revenue grew.", "Total")]
+        results = [future.result(timeout=60) for future in futures]
+        stats = engine.stats()
+    finally:
+        engine.stop()
+
+    assert results[0] == results[1]
+    assert (stats['deduplicated'], stats['completed']) == (1, 2)
@@ -0,0 +1,99 @@
+"""
+Tests for streaming document translation.
+"""
+
+import pytest
+
+import documents
+from documents import Block
+
+PARAGRAPHS = [
+    "The quarterly report is ready for review.",
+    "Revenue grew by 12 percent.",
+    "Margins were stable."
+]
+CELLS = [["Region", "Revenue"], ["North", "Margins were stable."]]
+
+@pytest.fixture
+def report_docx(tmp_path):
+    """DOCX with a heading, paragraphs, a list item, a table and a page break"""
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_heading("Quarterly report", level=1)
+    document.add_paragraph(PARAGRAPHS[0])
+    document.add_paragraph(PARAGRAPHS[1], style="List Bullet")
+    table = document.add_table(rows=len(CELLS), cols=len(CELLS[0]))
+    for row, texts in zip(table.rows, CELLS):
+        for cell, text in zip(row.cells, texts):
+            cell.text = text
+    document.add_page_break()
+    document.add_paragraph(PARAGRAPHS[2])
+    path = str(tmp_path / "report.docx")
+    document.save(path)
+    return path
+
+def test_docx_blocks_are_read_in_order(report_docx):
+    assert list(documents.read_docx(report_docx)) == [
+        Block("heading", "Quarterly report", 1),
+        Block("paragraph", PARAGRAPHS[0]),
+        Block("list_item", PARAGRAPHS[1]),
+        Block("table", rows=CELLS),
+        Block("paragraph", ""),
+        Block("page_break"),
+        Block("paragraph", PARAGRAPHS[2])
+    ]
+
+def test_docx_reader_detaches_processed_elements(report_docx, monkeypatch):
+    parsers = []
+    iterparse = documents.ElementTree.iterparse
+
+    def recording(*args, **kwargs):
+        parser = iterparse(*args, **kwargs)
+        parsers.append(parser)
+        return parser
+
+    monkeypatch.setattr(documents.ElementTree, "iterparse", recording)
+    list(documents.read_docx(report_docx))
+
+    body = parsers[0].root.find(documents._W + "body")
+    assert [child.tag for child in body] == [documents._W + "sectPr"]
+
+def test_docx_roundtrip(translator, report_docx, tmp_path):
+    output_path = str(tmp_path / "report_hindi.docx")
+    stats = documents.translate_document(translator, report_docx, output_path, "hindi", max_length=64,
+                                         window_segments=2)
+    assert (stats['segments'], stats['pages']) == (8, 2)
+
+    expected = [translator.translate(text, "hindi", max_length=64) for text in
+                ["Quarterly report"] + PARAGRAPHS + [cell for row in CELLS for cell in row]]
+    blocks = [block for block in documents.read_docx(output_path) if block.kind != "page_break"]
+    texts = [block.text for block in blocks if block.kind != "table" and block.text]
+    assert texts == expected[:4]
+    assert [block.kind for block in blocks if block.text] == ["heading", "paragraph", "list_item", "paragraph"]
+    assert [block.rows for block in blocks if block.kind == "table"] == [[expected[4:6], expected[6:8]]]
+
+def test_text_roundtrip(translator, tmp_path):
+    input_path = tmp_path / "notes.txt"
+    input_path.write_text(f"{PARAGRAPHS[0]}\n{PARAGRAPHS[1]}\n\n{PARAGRAPHS[2]}\n\f\nSee appendix.\n",
+                          encoding="utf-8")
+    assert list(documents.read_text(str(input_path))) == [
+        Block("paragraph", f"{PARAGRAPHS[0]}\n{PARAGRAPHS[1]}"),
+        Block("paragraph", PARAGRAPHS[2]),
+        Block("page_break"),
+        Block("paragraph", "See appendix.")
+    ]
+
+    output_path = str(tmp_path / "notes_hindi.txt")
+    documents.translate_document(translator, str(input_path), output_path, "hindi", max_length=64)
+    blocks = list(documents.read_text(output_path))
+    assert [block.kind for block in blocks] == ["paragraph", "paragraph", "page_break", "paragraph"]
+    assert blocks[1].text == translator.translate(PARAGRAPHS[2], "hindi", max_length=64)
+    assert blocks[3].text == translator.translate("See appendix.", "hindi", max_length=64)
+
+def test_window_keeps_block_structure(translator):
+    window = [Block("heading", "Quarterly report", 1), Block("page_break"), Block("table", rows=CELLS)]
+    translated = list(documents.translate_window(translator, window, "hindi", max_length=64))
+
+    assert [block.kind for block in translated] == ["heading", "page_break", "table"]
+    assert translated[0].text == translator.translate("Quarterly report", "hindi", max_length=64)
+    assert translated[2].rows == [translator.translate(row, "hindi", max_length=64) for row in CELLS]
@@ -0,0 +1,83 @@
+"""
+Tests for the continuous batching engine.
+"""
+
+import random
+import time
+
+import pytest
+import torch
+
+from cache import TranslationCache
+from engine import ContinuousBatchingEngine
+
+LANGUAGES = ["hindi", "tamil", "malayalam", "telugu"]
+
+def make_texts(count, seed=0):
+    """Inputs of varied length, so sequences join and retire at different steps"""
+    rng = random.Random(seed)
+    words = "the report shows revenue growth and a strong quarter for all teams in the region".split()
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(1, 25))) for _ in range(count)]
+
+def test_engine_matches_greedy_generate(translator):
+    texts = make_texts(24)
+    expected = [translator.translate(text, LANGUAGES[i % 4], max_length=40, profile="fast")
+                for i, text in enumerate(texts)]
+
+    # A small running set forces admissions into a running batch
+    engine = ContinuousBatchingEngine(translator, max_running=5, max_batch_tokens=80, max_length=40)
+    try:
+        futures = []
+        for i, text in enumerate(texts):
+            futures.append(engine.submit(text, LANGUAGES[i % 4]))
+            if i % 6 == 0:
+                time.sleep(0.01)
+        results = [future.result(timeout=60) for future in futures]
+        stats = engine.stats()
+    finally:
+        engine.stop()
+
+    assert results == expected
+    assert stats['completed'] == len(texts)
+    assert stats['mean_running'] > 1
+
+def test_engine_scales_plain_token_embeddings(translator):
+    """Before transformers 4.38, embed_tokens was a plain nn.Embedding scaled by the decoder"""
+    texts = make_texts(6, seed=2)
+    expected = [translator.translate(text, "hindi", max_length=40, profile="fast") for text in texts]
+
+    decoder = translator.model.get_decoder()
+    scaled = decoder.embed_tokens
+    plain = torch.nn.Embedding(scaled.num_embeddings, scaled.embedding_dim, scaled.padding_idx)
+    plain.weight = scaled.weight
+    decoder.embed_tokens = plain
+
+    engine = ContinuousBatchingEngine(translator, max_length=40)
+    try:
+        assert [engine.translate(text, "hindi", timeout=60) for text in texts] == expected
+    finally:
+        engine.stop()
+
+def test_engine_shares_cache_entries_with_the_translator(translator):
+    translator.cache = TranslationCache()
+    texts = make_texts(2, seed=1)
+    from_translator = translator.translate(texts[0], "hindi", max_length=40, profile="fast")
+
+    engine = ContinuousBatchingEngine(translator, max_length=40)
+    try:
+        assert engine.translate(texts[0], "hindi", timeout=60) == from_translator
+        assert engine.stats()['cache_hits'] == 1
+
+        from_engine = engine.translate(texts[1], "hindi", timeout=60)
+    finally:
+        engine.stop()
+
+    stats = {}
+    assert translator.translate([texts[1]], "hindi", max_length=40, profile="fast", stats=stats) == [from_engine]
+    assert stats['cache_hits'] == 1
+
+def test_engine_only_decodes_greedily(translator):
+    engine = ContinuousBatchingEngine(translator)
+    with pytest.raises(ValueError):
+        engine.submit("Revenue grew.", "hindi", profile="quality")
+    engine.stop()
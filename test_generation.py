@@ -0,0 +1,16 @@
+"""
+Tests for generation profiles and the learned length budgets.
+"""
+
+WARM_UP_TEXTS = [
+    "The quarterly report is ready for review.",
+    "Revenue grew by 12 percent compared to last year, driven by strong demand in the southern region."
+]
+
+def test_warm_up_does_not_train_length_predictor(translator):
+    translator.warm_up(languages=["hindi"], runs=1)
+    assert translator.length_predictor.stats() == {}
+
+    # The same texts in real traffic are learned from
+    translator.translate(WARM_UP_TEXTS, "hindi", max_length=64)
+    assert translator.length_predictor.stats() != {}
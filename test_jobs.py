@@ -0,0 +1,75 @@
+"""
+Tests for background translation jobs and their resumption.
+"""
+
+import json
+import os
+import time
+
+from jobs import JobManager
+
+TEXT = " ".join(f"Paragraph {i} of the annual report describes growth." for i in range(6))
+
+def wait_for(manager, job_id, timeout=60):
+    """Poll a job until it finishes"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = manager.get(job_id)
+        if status['status'] in ("completed", "failed"):
+            return status
+        time.sleep(0.05)
+    raise TimeoutError(f"Job {job_id} did not finish")
+
+def test_job_translates_all_chunks(translator, tmp_path):
+    manager = JobManager(lambda: translator, str(tmp_path), max_chunk_tokens=16, batch_size=2)
+    try:
+        status = wait_for(manager, manager.submit(TEXT, "hindi"))
+    finally:
+        manager.shutdown()
+
+    assert status['status'] == "completed"
+    assert status['chunks_done'] == status['chunks_total'] > 1
+    assert status['progress'] == 1.0
+    chunks = translator.split_large_text(TEXT, 16)
+    assert status['translation'] == " ".join(
+        translation.strip() for translation in translator.translate([chunk.text for chunk in chunks], "hindi")
+    )
+
+def test_unfinished_job_resumes_with_remaining_chunks(translator, record_calls, tmp_path):
+    chunks = translator.split_large_text(TEXT, 16)
+    done = len(chunks) // 2
+    job = {
+        'id': "interrupted", 'status': "running", 'text': TEXT,
+        'source_language': "english", 'target_language': "hindi",
+        'chunks': [list(chunk) for chunk in chunks],
+        'translations': ["DONE"] * done + [None] * (len(chunks) - done),
+        'error': None, 'created_at': time.time(), 'started_at': time.time(), 'finished_at': None,
+        'chunks_per_second': None
+    }
+    with open(os.path.join(tmp_path, "interrupted.json"), 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+
+    batches = record_calls(translator, "translate")
+    manager = JobManager(lambda: translator, str(tmp_path), max_chunk_tokens=16, batch_size=2)
+    try:
+        assert manager.resume() == 1
+        status = wait_for(manager, "interrupted")
+    finally:
+        manager.shutdown()
+
+    assert status['status'] == "completed"
+    assert [text for batch in batches for text in batch] == [chunk.text for chunk in chunks[done:]]
+    assert status['translation'].startswith("DONE DONE")
+    # Finished jobs are not resumed again
+    assert JobManager(lambda: translator, str(tmp_path)).resume() == 0
+
+def test_failed_translation_fails_the_job(translator, tmp_path):
+    translator.translate = lambda texts, *args, **kwargs: [None] * len(texts)
+    manager = JobManager(lambda: translator, str(tmp_path), max_chunk_tokens=16)
+    try:
+        status = wait_for(manager, manager.submit(TEXT, "hindi"))
+    finally:
+        manager.shutdown()
+
+    assert status['status'] == "failed"
+    assert "chunk 1" in status['error']
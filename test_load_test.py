@@ -0,0 +1,51 @@
+"""
+Tests for the load generator and its report.
+"""
+
+import argparse
+
+import pytest
+
+import load_test
+
+def record(endpoint, kind, start, latency, error=None):
+    return {'endpoint': endpoint, 'kind': kind, 'start': start, 'end': start + latency, 'latency': latency,
+            'error': error}
+
+def test_report_splits_by_type_and_window():
+    records = [
+        record("translate", "label", 0.0, 0.1),
+        record("translate", "label", 0.5, 0.3),
+        record("translate", "report", 0.2, 2.0, error="HTTP 500"),
+        record("batch_translate", "batch", 1.2, 0.4)
+    ]
+    report = load_test.build_report(records, interval=1.0)
+
+    assert report['overall']['requests'] == 4
+    assert report['overall']['error_rate'] == 0.25
+    assert report['errors'] == {"HTTP 500": 1}
+    assert report['by_type']["translate/label"]['latency_p95_s'] == 0.3
+    # A type whose requests all failed has no latencies
+    assert 'latency_p50_s' not in report['by_type']["translate/report"]
+    assert [window['requests'] for window in report['windows']] == [2, 1, 1]
+    assert report['windows'][1]['start_s'] == 1.0
+
+def test_empty_report():
+    report = load_test.build_report([], interval=1.0)
+    assert report['overall'] == {'requests': 0, 'rps': 0.0, 'errors': 0, 'error_rate': 0.0}
+
+def test_mix_is_parsed():
+    assert load_test.parse_mix("label=6,paragraph=3,report") == {'label': 6.0, 'paragraph': 3.0, 'report': 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        load_test.parse_mix("novel=1")
+
+def test_closed_loop_against_the_stand_in_server(served_app):
+    base_url = load_test.start_stand_in_server(overhead_ms=1.0, token_ms=0.0)
+    generator = load_test.LoadGenerator(base_url, {'label': 3, 'paragraph': 1}, batch_fraction=0.25,
+                                        batch_items=4, languages=["hindi", "tamil"])
+    generator.run_closed_loop(concurrency=4, duration=0.5)
+
+    report = load_test.build_report(generator.records, interval=0.25)
+    assert report['overall']['requests'] > 0
+    assert report['errors'] == {}
+    assert {"translate/label", "batch_translate/batch"} <= set(report['by_type'])
@@ -0,0 +1,87 @@
+"""
+Tests for the fuzzy translation memory.
+"""
+
+from translation_memory import TranslationMemory
+
+SEGMENT = "Revenue grew 12% to USD 450m in Q3 2024."
+TRANSLATION = "राजस्व Q3 2024 में 12% बढ़कर USD 450m हो गया।"
+PARAMS = {'max_length': 1024, 'precision': "fp32", 'backend': "pytorch"}
+
+def test_exact_and_substituted_hits():
+    memory = TranslationMemory()
+    memory.add(SEGMENT, TRANSLATION, "en_XX", "hi_IN", "model", PARAMS)
+
+    assert memory.lookup(SEGMENT, "en_XX", "hi_IN", "model", PARAMS) == TRANSLATION
+    assert (memory.lookup("Revenue grew 15% to USD 480m in Q4 2024.", "en_XX", "hi_IN", "model", PARAMS)
+            == "राजस्व Q4 2024 में 15% बढ़कर USD 480m हो गया।")
+    stats = memory.stats()
+    assert (stats['exact_hits'], stats['substituted_hits']) == (1, 1)
+
+def test_near_duplicates_with_changed_named_tokens_are_substituted():
+    memory = TranslationMemory()
+    memory.add("Acme Corp revenue grew 12% in Q3 2024 across all regions.",
+               "Acme Corp का राजस्व Q3 2024 में सभी क्षेत्रों में 12% बढ़ा।", "en_XX", "hi_IN", "model", PARAMS)
+
+    assert (memory.lookup("Globex Corp revenue grew 15% in Q4 2024 across all regions.",
+                          "en_XX", "hi_IN", "model", PARAMS)
+            == "Globex Corp का राजस्व Q4 2024 में सभी क्षेत्रों में 15% बढ़ा।")
+    # A changed ordinary word is not substituted
+    assert memory.lookup("Acme Corp profit grew 12% in Q3 2024 across all regions.",
+                         "en_XX", "hi_IN", "model", PARAMS) is None
+    stats = memory.stats()
+    assert (stats['substituted_hits'], stats['fuzzy_misses']) == (1, 1)
+
+def test_oldest_entries_are_evicted(tmp_path):
+    db_path = str(tmp_path / "memory.sqlite3")
+    memory = TranslationMemory(db_path=db_path, max_entries=10)
+    for i in range(12):
+        memory.add(f"Segment number {i} of the report.", f"अनुवाद {i}", "en_XX", "hi_IN", "model", PARAMS)
+
+    stats = memory.stats()
+    assert stats['entries'] <= 10
+    assert stats['evictions'] > 0
+    reopened = TranslationMemory(db_path=db_path, max_entries=10)
+    assert reopened.lookup("Segment number 11 of the report.", "en_XX", "hi_IN", "model", PARAMS) == "अनुवाद 11"
+    # Evicted segments leave no buckets behind
+    db = reopened._connection()
+    assert db.execute("SELECT COUNT(*) FROM buckets WHERE segment_id NOT IN (SELECT id FROM segments)"
+                      ).fetchone()[0] == 0
+
+def test_entries_are_scoped_by_generation_settings():
+    memory = TranslationMemory()
+    memory.add(SEGMENT, TRANSLATION, "en_XX", "hi_IN", "model", PARAMS)
+
+    assert memory.lookup(SEGMENT, "en_XX", "ta_IN", "model", PARAMS) is None
+    assert memory.lookup(SEGMENT, "en_XX", "hi_IN", "other-model", PARAMS) is None
+    for changed in ({'max_length': 64}, {'precision': "int8"}, {'backend': "onnx"}):
+        assert memory.lookup(SEGMENT, "en_XX", "hi_IN", "model", {**PARAMS, **changed}) is None
+    assert memory.lookup(SEGMENT, "en_XX", "hi_IN", "model", dict(reversed(PARAMS.items()))) == TRANSLATION
+
+def test_translator_does_not_reuse_entries_across_max_length(tiny_model):
+    from translator import Translator
+    memory = TranslationMemory()
+    translator = Translator(model_name=tiny_model, device="cpu", profile="fast", memory=memory)
+
+    translator.translate(SEGMENT, "hindi", max_length=64)
+    translator.translate(SEGMENT, "hindi", max_length=32)
+    stats = memory.stats()
+    assert (stats['exact_hits'], stats['substituted_hits']) == (0, 0)
+    assert stats['entries'] == 2
+
+def test_translator_does_not_reuse_entries_across_profiles(tiny_model):
+    from translator import Translator
+    memory = TranslationMemory()
+    translator = Translator(model_name=tiny_model, device="cpu", profile="fast", memory=memory)
+
+    translator.translate(SEGMENT, "hindi", max_length=64, profile="fast")
+    translator.translate(SEGMENT, "hindi", max_length=64, profile="quality")
+    translator.translate([SEGMENT], "hindi", max_length=64, profile="balanced")
+    stats = memory.stats()
+    assert (stats['exact_hits'], stats['substituted_hits']) == (0, 0)
+    assert stats['entries'] == 3
+
+    # The same profile still hits
+    translator.cache = None
+    translator.translate(SEGMENT, "hindi", max_length=64, profile="quality")
+    assert memory.stats()['exact_hits'] == 1
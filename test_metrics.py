@@ -0,0 +1,84 @@
+"""
+Tests for the Prometheus-style metrics and the /metrics endpoint.
+"""
+
+import re
+
+import pytest
+
+import metrics
+from utils import percentile
+
+# A sample line: name, optional labels, value
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*"'
+                       r'(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*")*\})? (\S+)$')
+
+@pytest.fixture
+def registered(monkeypatch):
+    """Register metrics for one test only"""
+    monkeypatch.setattr(metrics, "REGISTRY", [])
+    return metrics.REGISTRY
+
+def test_histogram_renders_cumulative_buckets(registered):
+    histogram = metrics.Histogram("test_seconds", "Test latency", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 2.0):
+        histogram.labels(stage='say "hi"\n').observe(value)
+
+    assert metrics.render() == "\n".join([
+        "# HELP test_seconds Test latency",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="say \\"hi\\"\\n",le="0.1"} 1',
+        'test_seconds_bucket{stage="say \\"hi\\"\\n",le="1.0"} 3',
+        'test_seconds_bucket{stage="say \\"hi\\"\\n",le="+Inf"} 4',
+        'test_seconds_sum{stage="say \\"hi\\"\\n"} 3.05',
+        'test_seconds_count{stage="say \\"hi\\"\\n"} 4'
+    ]) + "\n"
+
+def test_counter_and_gauge_render_one_sample_per_label_set(registered):
+    counter = metrics.Counter("test_requests_total", "Requests", ("status",))
+    counter.labels(status=200).inc()
+    counter.labels(status=200).inc(2)
+    counter.labels(status=500).inc()
+    gauge = metrics.Gauge("test_loaded", "Loaded")
+    gauge.set(1.5)
+
+    assert metrics.render().splitlines()[2:] == [
+        'test_requests_total{status="200"} 3',
+        'test_requests_total{status="500"} 1',
+        "# HELP test_loaded Loaded",
+        "# TYPE test_loaded gauge",
+        "test_loaded 1.5"
+    ]
+    with pytest.raises(ValueError):
+        counter.inc()
+
+def test_metrics_endpoint_is_valid_exposition_format(served_app):
+    client = served_app.app.test_client()
+    assert client.post('/translate', json={'text': "Revenue grew.", 'target_language': "hindi"}).status_code == 200
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == "text/plain; version=0.0.4; charset=utf-8"
+
+    families = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram")
+            assert name not in families
+            families[name] = kind
+            continue
+        match = SAMPLE_RE.match(line)
+        assert match, line
+        name, _, value = match.groups()
+        float(value)
+        family = re.sub(r"_(bucket|sum|count)$", "", name)
+        assert name in families or families.get(family) == "histogram", line
+    assert families["translator_decode_seconds"] == "histogram"
+
+def test_percentile_of_no_values_is_none():
+    assert percentile([], 50) is None
+    assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert percentile([3.0, 1.0, 2.0], 99) == 3.0
@@ -0,0 +1,31 @@
+"""
+Tests for translating into several target languages with one encoder pass.
+"""
+
+import tracing
+
+TEXTS = [
+    "The quarterly report is ready for review.",
+    "Revenue grew by 12 percent.",
+    "Margins were stable."
+]
+TARGETS = ["hindi", "tamil", "telugu"]
+
+def test_multi_matches_per_language_translation(tiny_model):
+    from translator import Translator
+    single = Translator(model_name=tiny_model, device="cpu", profile="fast")
+    multi = Translator(model_name=tiny_model, device="cpu", profile="fast")
+
+    expected = {language: single.translate(TEXTS, language, max_length=64) for language in TARGETS}
+    assert multi.translate_multi(TEXTS, TARGETS, max_length=64) == expected
+    assert (multi.translate_multi(TEXTS[1], TARGETS, max_length=64)
+            == {language: translated[1] for language, translated in expected.items()})
+
+def test_multi_batches_are_traced(translator):
+    trace = tracing.start_trace("multi")
+    try:
+        translator.translate_multi(TEXTS, TARGETS, max_length=64)
+    finally:
+        tracing.finish_trace(trace)
+
+    assert {"lookup", "tokenize", "pad", "model_slot", "encode", "generate", "detokenize"} <= set(trace.totals())
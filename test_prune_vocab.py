@@ -0,0 +1,55 @@
+"""
+Tests for vocabulary pruning.
+"""
+
+import pytest
+import torch
+
+import prune_vocab
+
+TEXTS = [
+    "The quarterly report is ready for review.",
+    "Revenue grew by 12 percent.",
+    "Margins were stable."
+]
+
+@pytest.fixture(scope="module")
+def pruned(tiny_model, tmp_path_factory):
+    """Tiny model pruned to a corpus of the test texts and their translations"""
+    from translator import Translator
+    full = Translator(model_name=tiny_model, device="cpu", profile="fast")
+    expected = full.translate(TEXTS, "hindi", max_length=64)
+
+    corpus_path = tmp_path_factory.mktemp("corpus") / "corpus.txt"
+    corpus_path.write_text("\n".join(TEXTS + expected) + "\n", encoding="utf-8")
+    output_dir = str(tmp_path_factory.mktemp("pruned"))
+    summary = prune_vocab.prune(tiny_model, [str(corpus_path)], output_dir)
+    return full, expected, output_dir, summary
+
+def test_pruned_logits_match_the_kept_rows(pruned):
+    full, _, output_dir, summary = pruned
+    from transformers import MBartForConditionalGeneration
+    kept_ids = summary['kept_ids']
+    assert summary['vocab_size'] < summary['source_vocab_size']
+    old_to_new = {old_id: new_id for new_id, old_id in enumerate(kept_ids)}
+    model = MBartForConditionalGeneration.from_pretrained(output_dir).eval()
+
+    input_ids = full.tokenizer(TEXTS[0], return_tensors="pt")["input_ids"]
+    decoder_input_ids = torch.tensor([[full.model.config.decoder_start_token_id,
+                                       full.tokenizer.lang_code_to_id["hi_IN"]]])
+    with torch.no_grad():
+        full_logits = full.model(input_ids=input_ids, decoder_input_ids=decoder_input_ids).logits
+        pruned_logits = model(
+            input_ids=input_ids.clone().apply_(old_to_new.__getitem__),
+            decoder_input_ids=decoder_input_ids.clone().apply_(old_to_new.__getitem__)
+        ).logits
+    torch.testing.assert_close(pruned_logits, full_logits[..., kept_ids])
+
+def test_pruned_model_translates_like_the_full_model(pruned):
+    from translator import Translator
+    _, expected, output_dir, summary = pruned
+    translator = Translator(model_name=output_dir, device="cpu", profile="fast")
+
+    assert translator.pruned_vocab['vocab_size'] == summary['vocab_size']
+    assert len(translator.tokenizer) == summary['vocab_size']
+    assert translator.translate(TEXTS, "hindi", max_length=64) == expected
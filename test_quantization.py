@@ -0,0 +1,43 @@
+"""
+Tests for reusing the saved int8 model.
+"""
+
+import json
+import logging
+
+from benchmark import build_tiny_model
+from translator import Translator
+
+def test_saved_int8_model_is_reused_only_for_its_source_model(tiny_model, tmp_path, caplog):
+    path = str(tmp_path / "int8.pt")
+    first = Translator(model_name=tiny_model, device="cpu", precision="int8", quantized_model_path=path,
+                       profile="fast")
+    with open(f"{path}.json", 'r', encoding='utf-8') as f:
+        assert json.load(f)['source_model'] == tiny_model
+
+    with caplog.at_level(logging.INFO):
+        reused = Translator(model_name=tiny_model, device="cpu", precision="int8", quantized_model_path=path,
+                            profile="fast")
+    assert "Loaded quantized model" in caplog.text
+    assert reused.translate("Revenue grew.", "hindi") == first.translate("Revenue grew.", "hindi")
+
+    # Another model pointed at the same file quantizes its own weights
+    other_model = build_tiny_model(str(tmp_path / "other-model"), seed=1)
+    caplog.clear()
+    with caplog.at_level(logging.INFO):
+        other = Translator(model_name=other_model, device="cpu", precision="int8", quantized_model_path=path,
+                           profile="fast")
+    assert "re-quantizing" in caplog.text
+    assert "Loaded quantized model" not in caplog.text
+    with open(f"{path}.json", 'r', encoding='utf-8') as f:
+        assert json.load(f)['source_model'] == other_model
+    assert other.model is not reused.model
+
+def test_int8_file_without_source_is_rebuilt(tiny_model, tmp_path, caplog):
+    path = tmp_path / "int8.pt"
+    path.write_bytes(b"not a model")
+    with caplog.at_level(logging.INFO):
+        translator = Translator(model_name=tiny_model, device="cpu", precision="int8",
+                                quantized_model_path=str(path), profile="fast")
+    assert "re-quantizing" in caplog.text
+    assert translator.translate("Revenue grew.", "hindi") is not None
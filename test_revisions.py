@@ -0,0 +1,43 @@
+"""
+Tests for incremental re-translation of document revisions.
+"""
+
+from revisions import DocumentRevisions
+
+FIRST = "Revenue grew by 12 percent. Margins were stable. Costs fell slightly."
+FIRST_SENTENCES = ["Revenue grew by 12 percent.", "Margins were stable.", "Costs fell slightly."]
+
+def test_only_changed_sentences_are_retranslated(translator, record_calls, tmp_path):
+    calls = record_calls(translator, "translate")
+    revisions = DocumentRevisions(lambda: translator, str(tmp_path))
+
+    first = revisions.translate("report", FIRST, "hindi", max_length=64)
+    assert first['revision'] == 1
+    assert first['stats']['translated'] == 3
+    assert calls == [FIRST_SENTENCES]
+
+    calls.clear()
+    second = revisions.translate(
+        "report", "Costs fell slightly. Revenue grew by 15 percent. Margins were stable. A new sentence.",
+        "hindi", max_length=64
+    )
+    assert calls == [["Revenue grew by 15 percent.", "A new sentence."]]
+    stats = second['stats']
+    assert (stats['unchanged'], stats['moved'], stats['translated'], stats['removed']) == (1, 1, 2, 1)
+    assert second['revision'] == 2
+    assert revisions.get("report", "hindi")['sentences'] == 4
+
+def test_changed_settings_retranslate_everything(translator, record_calls, tmp_path):
+    calls = record_calls(translator, "translate")
+    revisions = DocumentRevisions(lambda: translator, str(tmp_path))
+    revisions.translate("report", FIRST, "hindi", max_length=64)
+
+    calls.clear()
+    result = revisions.translate("report", FIRST, "hindi", max_length=32)
+    assert result['stats']['translated'] == 3
+    assert calls == [FIRST_SENTENCES]
+
+    calls.clear()
+    result = revisions.translate("report", FIRST, "hindi", max_length=32)
+    assert result['stats']['unchanged'] == 3
+    assert calls == []
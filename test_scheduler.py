@@ -0,0 +1,76 @@
+"""
+Tests for the micro-batching scheduler.
+"""
+
+from scheduler import BatchScheduler
+
+TEXTS = [
+    "The report shows revenue growth.",
+    "Students submit their assessments.",
+    "Please review the attached document.",
+    "Costs remained stable."
+]
+
+def record_batches(record_calls, translator):
+    """Record the target language and texts of every batch the translator runs"""
+    return record_calls(translator, "translate", lambda text, target_language, *args, **kwargs: (
+        target_language, list(text) if isinstance(text, list) else [text]
+    ))
+
+def test_concurrent_requests_share_a_batch(translator, record_calls):
+    expected = translator.translate(TEXTS, "hindi")
+    batches = record_batches(record_calls, translator)
+    scheduler = BatchScheduler(translator, max_wait_ms=500)
+    try:
+        futures = [scheduler.submit(text, "hindi") for text in TEXTS]
+        results = [future.result(timeout=60) for future in futures]
+    finally:
+        scheduler.stop()
+
+    assert results == expected
+    assert batches == [("hindi", TEXTS)]
+
+def test_languages_are_batched_separately(translator, record_calls):
+    batches = record_batches(record_calls, translator)
+    scheduler = BatchScheduler(translator, max_wait_ms=500)
+    try:
+        futures = [scheduler.submit(text, language) for text in TEXTS[:2] for language in ("hindi", "tamil")]
+        for future in futures:
+            future.result(timeout=60)
+    finally:
+        scheduler.stop()
+
+    assert sorted(batches) == [("hindi", TEXTS[:2]), ("tamil", TEXTS[:2])]
+
+def test_batch_size_limit_flushes_early(translator, record_calls):
+    batches = record_batches(record_calls, translator)
+    # A full batch runs at once instead of waiting out max_wait_ms
+    scheduler = BatchScheduler(translator, max_wait_ms=60000, max_batch_size=2)
+    try:
+        futures = [scheduler.submit(text, "hindi") for text in TEXTS]
+        for future in futures:
+            future.result(timeout=60)
+    finally:
+        scheduler.stop()
+
+    assert [texts for _, texts in batches] == [TEXTS[:2], TEXTS[2:]]
+
+def test_batch_error_reaches_every_request(translator):
+    def failing_translate(*args, **kwargs):
+        raise RuntimeError("model failure")
+
+    translator.translate = failing_translate
+    scheduler = BatchScheduler(translator, max_wait_ms=100)
+    try:
+        futures = [scheduler.submit(text, "hindi") for text in TEXTS[:2]]
+        for future in futures:
+            assert isinstance(future.exception(timeout=60), RuntimeError)
+    finally:
+        scheduler.stop()
+
+def test_stop_fails_waiting_requests(translator):
+    scheduler = BatchScheduler(translator, max_wait_ms=60000)
+    future = scheduler.submit(TEXTS[0], "hindi")
+    scheduler.stop()
+
+    assert isinstance(future.exception(timeout=10), RuntimeError)
@@ -0,0 +1,33 @@
+"""
+Tests for speculative decoding with a draft model.
+
+The tiny model doubles as its own draft model, so the outputs can be
+compared with plain greedy decoding.
+"""
+
+import pytest
+
+TEXTS = [
+    "The quarterly report is ready for review.",
+    "Revenue grew by 12 percent.",
+    "Margins were stable."
+]
+
+@pytest.fixture
+def speculative_translator(tiny_model):
+    """Translator decoding 'fast' requests with a draft model"""
+    from translator import Translator
+    return Translator(model_name=tiny_model, device="cpu", profile="fast", draft_model_path=tiny_model)
+
+def test_single_sequence_is_decoded_speculatively(translator, speculative_translator):
+    expected = translator.translate(TEXTS[0], "hindi", max_length=64)
+    assert speculative_translator.translate(TEXTS[0], "hindi", max_length=64) == expected
+    assert speculative_translator.speculative.stats()['sequences'] == 1
+
+def test_batches_use_batched_generate(translator, speculative_translator):
+    expected = translator.translate(TEXTS, "hindi", max_length=64)
+    assert speculative_translator.translate(TEXTS, "hindi", max_length=64) == expected
+
+    expected = translator.translate_multi(TEXTS[0], ["hindi", "tamil"], max_length=64)
+    assert speculative_translator.translate_multi(TEXTS[0], ["hindi", "tamil"], max_length=64) == expected
+    assert speculative_translator.speculative.stats()['sequences'] == 0
@@ -0,0 +1,38 @@
+"""
+Tests for streaming large-text translation chunk by chunk.
+"""
+
+import json
+
+import config
+
+TEXT = (
+    "The quarterly report is ready for review. Revenue grew by 12 percent. Margins were stable.\n\n"
+    "Costs fell slightly in every region. The board will meet next week.\n"
+    "Dividends are unchanged. Thanks."
+)
+
+def test_iter_chunks_join_to_the_large_text_translation(translator):
+    translator.cache = None
+    expected = translator.translate_large_text(TEXT, "hindi", max_chunk_tokens=16, max_length=64)
+    chunks = list(translator.translate_large_text_iter(TEXT, "hindi", max_chunk_tokens=16, max_length=64,
+                                                        batch_size=2))
+
+    assert len(chunks) == len(translator.split_large_text(TEXT, 16)) > 3
+    assert "".join(chunks) == expected
+
+def test_stream_endpoint_chunks_join_to_the_large_text_translation(served_app, translator, monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_MAX_TOKENS", 16)
+    translator.cache = None
+    expected = translator.translate_large_text(TEXT, "hindi", max_chunk_tokens=16)
+
+    response = served_app.app.test_client().post(
+        '/translate_stream', json={'text': TEXT, 'target_language': "hindi"}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert lines[-1]['done'] is True
+    assert [line['index'] for line in lines[:-1]] == list(range(len(lines) - 1))
+    assert "".join(line['translation'] for line in lines[:-1]) == expected
@@ -0,0 +1,52 @@
+"""
+Tests for request tracing and profiling.
+"""
+
+import json
+import os
+
+import tracing
+import config
+
+def test_only_one_trace_profiles_at_a_time(tmp_path):
+    first = tracing.start_trace("first", profiler="cprofile")
+    second = tracing.start_trace("second", profiler="cprofile")
+    assert (first.profiler, second.profiler) == ("cprofile", None)
+    tracing.finish_trace(second, str(tmp_path))
+    tracing.finish_trace(first, str(tmp_path))
+
+    third = tracing.start_trace("third", profiler="cprofile")
+    assert third.profiler == "cprofile"
+    tracing.finish_trace(third)
+
+def test_traces_directory_keeps_the_newest(tmp_path):
+    trace_ids = []
+    for i in range(5):
+        trace = tracing.start_trace(f"trace {i}", profiler="cprofile")
+        tracing.finish_trace(trace, str(tmp_path), max_traces=3)
+        trace_ids.append(trace.trace_id)
+        # Distinct modification times
+        os.utime(tmp_path / f"{trace.trace_id}.json", (i, i))
+        os.utime(tmp_path / f"{trace.trace_id}.prof", (i, i))
+
+    remaining = sorted(os.listdir(tmp_path))
+    assert remaining == sorted(f"{trace_id}{suffix}" for trace_id in trace_ids[-3:] for suffix in (".json", ".prof"))
+
+def test_tracing_is_off_by_default(served_app):
+    response = served_app.app.test_client().get('/health', headers={"X-Trace": "1"})
+    assert "X-Trace-Id" not in response.headers
+
+def test_streamed_trace_covers_the_translation(served_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TRACING_ENABLED", True)
+    monkeypatch.setattr(config, "TRACES_DIR", str(tmp_path))
+    response = served_app.app.test_client().post(
+        '/translate_stream', json={'text': "Revenue grew. Margins held.", 'target_language': "hindi"},
+        headers={"X-Trace": "1"}
+    )
+    assert response.status_code == 200
+    response.get_data()
+    response.close()
+
+    with open(tmp_path / f"{response.headers['X-Trace-Id']}.json", encoding='utf-8') as f:
+        saved = json.load(f)
+    assert "generate" in saved['totals_ms']
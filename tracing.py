@@ -0,0 +1,319 @@
+"""
+Request tracing and profiling.
+
+Code marks hot-path sections with :func:`span`. Spans are only recorded
+while a trace is active in the current context (e.g. for one API request
+that asked for it), so they cost next to nothing otherwise. A trace can
+also run cProfile or torch.profiler for its duration and dump the result.
+Both profilers are process-wide, so one profiled trace runs at a time;
+traces that overlap it record spans only.
+"""
+
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Profilers a trace can run
+PROFILERS = ("cprofile", "torch")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+# Held by the trace running a profiler
+_profiler_lock = threading.Lock()
+
+class Trace:
+    """Spans recorded for one unit of work (usually one request)"""
+
+    def __init__(self, name, profiler=None):
+        """
+        Initialize the trace.
+
+        Args:
+            name (str): What is being traced (e.g. the API route)
+            profiler (str, optional): 'cprofile' or 'torch' to also profile
+        """
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Profiler '{profiler}' not supported. Choose from: {', '.join(PROFILERS)}")
+
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.profiler = profiler
+        self.profile_path = None
+        self.spans = []
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+
+        self._depth = 0
+        self._profile = None
+        self._token = None
+        self._holds_profiler = False
+
+    def duration_ms(self):
+        """Milliseconds since the trace started (or its total once finished)"""
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def totals(self):
+        """
+        Total time per span name.
+
+        Returns:
+            dict: Span name -> milliseconds, in order of first appearance
+        """
+        totals = {}
+        for recorded in self.spans:
+            totals[recorded['name']] = totals.get(recorded['name'], 0.0) + recorded['duration_ms']
+        return totals
+
+    def server_timing(self):
+        """Totals formatted as a ``Server-Timing`` header value"""
+        entries = [f"{name};dur={duration:.2f}" for name, duration in self.totals().items()]
+        entries.append(f"total;dur={self.duration_ms():.2f}")
+        return ", ".join(entries)
+
+    def to_dict(self):
+        """
+        Get the trace as plain data.
+
+        Returns:
+            dict: Trace id, name, total duration, per-name totals and every span
+            (start offsets are relative to the start of the trace)
+        """
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'duration_ms': self.duration_ms(),
+            'profiler': self.profiler,
+            'profile_path': self.profile_path,
+            'totals_ms': self.totals(),
+            'spans': self.spans
+        }
+
+class _Span:
+    """Context manager recording one span into a trace"""
+
+    __slots__ = ("trace", "name", "attributes", "start_ns", "record_function")
+
+    def __init__(self, trace, name, attributes):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.record_function = None
+
+    def __enter__(self):
+        if self.trace.profiler == "torch":
+            # Show the span as a named range in the torch profiler trace
+            import torch
+            self.record_function = torch.profiler.record_function(self.name)
+            self.record_function.__enter__()
+
+        self.trace._depth += 1
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end_ns = time.perf_counter_ns()
+        self.trace._depth -= 1
+        if self.record_function is not None:
+            self.record_function.__exit__(exc_type, exc_value, traceback)
+
+        recorded = {
+            'name': self.name,
+            'start_ms': (self.start_ns - self.trace.start_ns) / 1e6,
+            'duration_ms': (end_ns - self.start_ns) / 1e6,
+            'depth': self.trace._depth
+        }
+        if self.attributes:
+            recorded['attributes'] = self.attributes
+        if exc_type is not None:
+            recorded['error'] = exc_type.__name__
+        self.trace.spans.append(recorded)
+        return False
+
+class _NoSpan:
+    """Stand-in returned by span() when no trace is active"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name, **attributes):
+    """
+    Time a block as part of the active trace.
+
+    Usage::
+
+        with tracing.span("generate", batch_size=8):
+            ...
+
+    Args:
+        name (str): Span name
+        **attributes: Extra values stored with the span
+
+    Returns:
+        Context manager (a no-op when no trace is active)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name, attributes)
+
+def active_trace():
+    """
+    Get the trace active in the current context.
+
+    Returns:
+        Trace or None: Active trace
+    """
+    return _current_trace.get()
+
+def start_trace(name, profiler=None):
+    """
+    Start a trace (and profiler) in the current context.
+
+    If another trace is already profiling, this one records spans only
+    (its ``profiler`` is None).
+
+    Args:
+        name (str): What is being traced
+        profiler (str, optional): 'cprofile' or 'torch'
+
+    Returns:
+        Trace: The started trace; pass it to :func:`finish_trace`
+    """
+    trace = Trace(name, profiler)
+    if profiler is not None:
+        if _profiler_lock.acquire(blocking=False):
+            trace._holds_profiler = True
+        else:
+            logger.warning(f"Trace {trace.trace_id} ({name}): another request is being profiled; "
+                           f"recording spans only")
+            trace.profiler = profiler = None
+
+    if profiler == "cprofile":
+        trace._profile = cProfile.Profile()
+        trace._profile.enable()
+    elif profiler == "torch":
+        import torch
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        trace._profile = torch.profiler.profile(activities=activities, record_shapes=True)
+        trace._profile.__enter__()
+
+    trace._token = _current_trace.set(trace)
+    return trace
+
+def finish_trace(trace, output_dir=None, max_traces=None):
+    """
+    Stop a trace, and save it (and its profile) if output_dir is given.
+
+    The trace is written to ``<output_dir>/<trace_id>.json``; a cProfile
+    dump to ``<trace_id>.prof`` (open with pstats or snakeviz) and a torch
+    profile to ``<trace_id>.torch.json`` (open in chrome://tracing or
+    Perfetto).
+
+    Args:
+        trace (Trace): Trace returned by :func:`start_trace`
+        output_dir (str, optional): Directory to save the trace in
+        max_traces (int, optional): Traces kept in output_dir; the oldest
+            (with their profiles) are deleted beyond this
+
+    Returns:
+        dict: The trace as plain data
+    """
+    trace.end_ns = time.perf_counter_ns()
+    if trace._token is not None:
+        try:
+            _current_trace.reset(trace._token)
+        except ValueError:
+            # Finished from another context (e.g. when a streamed response closes)
+            pass
+        trace._token = None
+
+    try:
+        if trace.profiler == "cprofile":
+            trace._profile.disable()
+        elif trace.profiler == "torch":
+            trace._profile.__exit__(None, None, None)
+    finally:
+        if trace._holds_profiler:
+            trace._holds_profiler = False
+            _profiler_lock.release()
+
+    if output_dir:
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            if trace.profiler == "cprofile":
+                trace.profile_path = os.path.join(output_dir, f"{trace.trace_id}.prof")
+                trace._profile.dump_stats(trace.profile_path)
+            elif trace.profiler == "torch":
+                trace.profile_path = os.path.join(output_dir, f"{trace.trace_id}.torch.json")
+                trace._profile.export_chrome_trace(trace.profile_path)
+
+            with open(os.path.join(output_dir, f"{trace.trace_id}.json"), 'w', encoding='utf-8') as f:
+                json.dump(trace.to_dict(), f, indent=2)
+            if max_traces:
+                _prune_traces(output_dir, max_traces)
+        except Exception as e:
+            logger.error(f"Could not save trace {trace.trace_id}: {str(e)}")
+
+    trace._profile = None
+    logger.info(f"Trace {trace.trace_id} ({trace.name}): {trace.server_timing()}")
+    return trace.to_dict()
+
+def _prune_traces(output_dir, max_traces):
+    """Delete the oldest traces (and their profiles) beyond max_traces"""
+    files = {}
+    for entry in os.scandir(output_dir):
+        if entry.is_file():
+            # <trace_id>.json, <trace_id>.prof, <trace_id>.torch.json
+            files.setdefault(entry.name.split(".", 1)[0], []).append(entry)
+    if len(files) <= max_traces:
+        return
+
+    by_age = sorted(files.values(), key=lambda entries: min(entry.stat().st_mtime for entry in entries))
+    for entries in by_age[:len(files) - max_traces]:
+        for entry in entries:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+@contextmanager
+def traced(name, profiler=None, output_dir=None):
+    """
+    Trace a block of code.
+
+    Usage::
+
+        with tracing.traced("report", profiler="cprofile", output_dir="logs/traces") as trace:
+            translator.translate_large_text(text, "hindi")
+
+    Args:
+        name (str): What is being traced
+        profiler (str, optional): 'cprofile' or 'torch'
+        output_dir (str, optional): Directory to save the trace in
+
+    Yields:
+        Trace: The active trace
+    """
+    trace = start_trace(name, profiler)
+    try:
+        yield trace
+    finally:
+        finish_trace(trace, output_dir)
@@ -4,8 +4,11 @@ Example script demonstrating how to use the translator programmatically.
 
 import argparse
 import logging
+import os
 import time
 import sys
+import documents
+from bulk import BulkTranslator, find_inputs
 from translator import Translator
 from utils import setup_logging
 
@@ -13,7 +16,24 @@ from utils import setup_logging
 setup_logging(log_level="INFO")
 logger = logging.getLogger(__name__)
 
-def translate_text(text, target_language, source_language="english"):
+# Translators already loaded, by precision (the model is loaded once per process)
+_translators = {}
+
+def load_translator(precision="fp32"):
+    """
+    Get the translator for a precision, loading the model on first use.
+    
+    Args:
+        precision (str): Model precision: 'fp32', 'bf16', or 'int8'
+        
+    Returns:
+        Translator: Loaded translator
+    """
+    if precision not in _translators:
+        _translators[precision] = Translator(precision=precision)
+    return _translators[precision]
+
+def translate_text(text, target_language, source_language="english", precision="fp32"):
     """
     Translate text from source language to target language.
     
@@ -21,14 +41,15 @@ def translate_text(text, target_language, source_language="english"):
         text (str): Text to translate
         target_language (str): Target language name
         source_language (str): Source language name (default: "english")
+        precision (str): Model precision: 'fp32', 'bf16', or 'int8'
         
     Returns:
         str: Translated text
     """
     logger.info(f"Translating from {source_language} to {target_language}")
     
-    # Initialize translator
-    translator = Translator()
+    # Get the translator (loaded once, then reused)
+    translator = load_translator(precision)
     
     # Measure translation time
     start_time = time.time()
@@ -45,7 +66,7 @@ def translate_text(text, target_language, source_language="english"):
     
     return translation
 
-def translate_file(file_path, target_language, source_language="english", output_file=None):
+def translate_file(file_path, target_language, source_language="english", output_file=None, precision="fp32"):
     """
     Translate text from a file.
     
@@ -54,6 +75,7 @@ def translate_file(file_path, target_language, source_language="english", output
         target_language (str): Target language name
         source_language (str): Source language name (default: "english")
         output_file (str): Path to save the translated text (default: None)
+        precision (str): Model precision: 'fp32', 'bf16', or 'int8'
         
     Returns:
         str: Translated text
@@ -68,7 +90,7 @@ def translate_file(file_path, target_language, source_language="english", output
         logger.info(f"File loaded: {len(text)} characters")
         
         # Translate text
-        translation = translate_text(text, target_language, source_language)
+        translation = translate_text(text, target_language, source_language, precision)
         
         # Save translation if output file is specified
         if output_file:
@@ -82,6 +104,88 @@ def translate_file(file_path, target_language, source_language="english", output
         logger.error(f"Error translating file: {str(e)}")
         return None
 
+def translate_document_file(file_path, target_language, source_language="english", output_file=None,
+                            precision="fp32"):
+    """
+    Translate a PDF or DOCX document, keeping its paragraph order and basic structure.
+    
+    The document is read and translated a window of paragraphs at a time,
+    so long reports are not loaded into memory whole.
+    
+    Args:
+        file_path (str): Path to the .pdf or .docx file to translate
+        target_language (str): Target language name
+        source_language (str): Source language name (default: "english")
+        output_file (str): Path to save the translation to, .docx or .txt
+            (default: <name>_<target language>.docx next to the input)
+        precision (str): Model precision: 'fp32', 'bf16', or 'int8'
+        
+    Returns:
+        str: Path of the translated document, or None on error
+    """
+    logger.info(f"Translating document: {file_path}")
+    
+    if output_file is None:
+        output_file = f"{os.path.splitext(file_path)[0]}_{target_language}.docx"
+    
+    try:
+        translator = load_translator(precision)
+        stats = documents.translate_document(translator, file_path, output_file, target_language, source_language)
+        logger.info(f"Translated {stats['segments']} segments on {stats['pages']} pages "
+                    f"in {stats['elapsed_seconds']:.2f} seconds")
+        return output_file
+        
+    except Exception as e:
+        logger.error(f"Error translating document: {str(e)}")
+        return None
+
+def translate_bulk(target_language, source_language="english", inputs=None, jsonl=None, output=None,
+                   output_format=None, precision="fp32", batch_size=8, window_segments=64, retry_failed=False):
+    """
+    Translate many files, or a JSONL stream, with one loaded model.
+    
+    Segments from all inputs are batched together, outputs are written as
+    inputs finish, and progress is checkpointed: running the same command
+    again after an interruption continues where it stopped.
+    
+    Args:
+        target_language (str): Target language name
+        source_language (str): Source language name (default: "english")
+        inputs (list, optional): Glob patterns or directories of .txt/.docx/.pdf files
+        jsonl (str, optional): JSONL file of {"id", "text"} records ('-' for standard input)
+        output (str): Output directory for inputs, or output JSONL file for jsonl
+        output_format (str, optional): '.txt' or '.docx' for every output file
+        precision (str): Model precision: 'fp32', 'bf16', or 'int8'
+        batch_size (int): Chunks per model batch
+        window_segments (int): Segments translated together, across inputs
+        retry_failed (bool): Translate files that failed in an earlier run again
+        
+    Returns:
+        dict: Run statistics, or None on error
+    """
+    try:
+        paths = None
+        if inputs:
+            paths = find_inputs(inputs)
+            logger.info(f"Found {len(paths)} files to translate")
+        
+        bulk = BulkTranslator(
+            load_translator(precision), target_language, source_language,
+            batch_size=batch_size, window_segments=window_segments
+        )
+        
+        if paths is not None:
+            stats = bulk.translate_files(paths, output, output_format=output_format, retry_failed=retry_failed)
+        else:
+            stats = bulk.translate_jsonl(jsonl, output)
+        
+        logger.info(f"Bulk translation finished in {stats['elapsed_seconds']:.2f} seconds: {stats}")
+        return stats
+        
+    except Exception as e:
+        logger.error(f"Error in bulk translation: {str(e)}")
+        return None
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description="Translate text or files")
@@ -90,16 +194,57 @@ def main():
     parser.add_argument("--target", choices=["hindi", "tamil", "malayalam", "telugu"], required=True,
                         help="Target language")
     parser.add_argument("--source", default="english", help="Source language (default: english)")
-    parser.add_argument("--output", help="Output file for translation")
+    parser.add_argument("--output", help="Output file for translation (.docx or .txt for PDF/DOCX input)")
+    parser.add_argument("--precision", choices=["fp32", "bf16", "int8"], default="fp32",
+                        help="Model precision (default: fp32)")
+    parser.add_argument("--inputs", nargs="+",
+                        help="Bulk mode: glob patterns or directories of .txt/.docx/.pdf files "
+                             "(quote patterns, e.g. 'reports/**/*.docx'); requires --output-dir")
+    parser.add_argument("--jsonl", help="Bulk mode: JSONL file of {\"id\", \"text\"} records ('-' for stdin); "
+                                        "requires --output")
+    parser.add_argument("--output-dir", help="Output directory for --inputs")
+    parser.add_argument("--output-format", choices=["txt", "docx"],
+                        help="Output format for --inputs (default: txt for text files, docx for Word/PDF)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Chunks per model batch in bulk mode")
+    parser.add_argument("--window", type=int, default=64,
+                        help="Segments translated together across files in bulk mode")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Bulk mode: translate files that failed in an earlier run again")
     
     args = parser.parse_args()
     
-    if not args.text and not args.file:
-        parser.error("Either --text or --file must be specified")
+    if sum(1 for mode in (args.text, args.file, args.inputs, args.jsonl) if mode) != 1:
+        parser.error("Specify exactly one of --text, --file, --inputs or --jsonl")
+    if args.inputs and not args.output_dir:
+        parser.error("--inputs requires --output-dir")
+    if args.jsonl and not args.output:
+        parser.error("--jsonl requires --output")
         
-    if args.text:
+    if args.inputs or args.jsonl:
+        # Bulk translation
+        stats = translate_bulk(
+            args.target, args.source,
+            inputs=args.inputs, jsonl=args.jsonl,
+            output=args.output_dir if args.inputs else args.output,
+            output_format=f".{args.output_format}" if args.output_format else None,
+            precision=args.precision, batch_size=args.batch_size, window_segments=args.window,
+            retry_failed=args.retry_failed
+        )
+        if stats is None:
+            sys.exit(1)
+        
+        print(f"\nBulk translation finished in {stats['elapsed_seconds']:.2f} seconds")
+        for key, value in stats.items():
+            if key not in ('elapsed_seconds', 'failures'):
+                print(f"  {key}: {value}")
+        if stats['failures']:
+            print("\nFailed:")
+            for failure in stats['failures']:
+                print(f"  {failure.get('input', failure.get('id'))}: {failure['error']}")
+            
+    elif args.text:
         # Translate text
-        translation = translate_text(args.text, args.target, args.source)
+        translation = translate_text(args.text, args.target, args.source, args.precision)
         
         # Print translation
         print("\nTranslation:")
@@ -113,9 +258,16 @@ def main():
                 f.write(translation)
             logger.info(f"Translation saved to: {args.output}")
             
+    elif os.path.splitext(args.file)[1].lower() in (".pdf", ".docx"):
+        # Translate document
+        output_file = translate_document_file(args.file, args.target, args.source, args.output, args.precision)
+        
+        if output_file:
+            print(f"\nTranslated document saved to: {output_file}")
+            
     elif args.file:
         # Translate file
-        translation = translate_file(args.file, args.target, args.source, args.output)
+        translation = translate_file(args.file, args.target, args.source, args.output, args.precision)
         
         if translation:
             # Print first 500 characters of translation
@@ -0,0 +1,498 @@
+"""
+Fuzzy translation memory for near-duplicate segments.
+
+Reports repeat most of last quarter's sentences with only the figures and
+dates changed. The translation memory keeps every segment the model has
+translated in SQLite. A segment whose template (the text with numbers,
+dates and codes masked out) was stored before is found through an index on
+the template; otherwise near-duplicates are found through MinHash LSH
+buckets of the template's character n-grams, scored by their difflib
+similarity, without comparing against every stored segment. When a stored
+segment differs from a new one only in values or named tokens (capitalized
+words), one for one, and each changed token appears verbatim in the stored
+translation, the new tokens are substituted into that translation and the
+model is skipped.
+"""
+
+import difflib
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+
+import metrics
+from utils import normalize_segment
+
+logger = logging.getLogger(__name__)
+
+# Values that can change between otherwise identical segments: ISO and
+# day/month/year dates, numbers (amounts, percentages, years, and codes
+# such as Q3, FY2024 or 10m) and all-caps acronyms (USD, EBITDA)
+VARIABLE_PATTERN = re.compile(
+    r"\d{4}-\d{2}-\d{2}"
+    r"|\d{1,2}/\d{1,2}/\d{2,4}"
+    r"|\b[A-Z]*\d+(?:[.,:]\d+)*[A-Za-z]*%?"
+    r"|\b[A-Z]{2,}\b"
+)
+
+# Stands in for each variable value in a segment's template
+PLACEHOLDER = "\x00"
+
+# Words, values and punctuation, for comparing a segment with a near-duplicate
+TOKEN_PATTERN = re.compile(rf"{VARIABLE_PATTERN.pattern}|\w+|[^\w\s]")
+
+# Tokens that may change between near-duplicates: values and named tokens
+SUBSTITUTABLE_PATTERN = re.compile(rf"(?:{VARIABLE_PATTERN.pattern})|[A-Z][\w&'-]*")
+
+# Label of the lookup metric for each outcome
+_RESULT_LABELS = {
+    'exact_hits': "exact",
+    'substituted_hits': "substituted",
+    'fuzzy_misses': "fuzzy_miss",
+    'misses': "miss"
+}
+
+# Share of max_entries kept when the store is trimmed, so trimming runs once
+# per many writes rather than on every one
+_TRIM_RATIO = 0.9
+
+# Modulus of the MinHash permutations (a Mersenne prime, so values fit in SQLite integers)
+_PRIME = (1 << 61) - 1
+
+def split_variables(segment):
+    """
+    Separate a segment into its fixed text and its variable values.
+
+    Args:
+        segment (str): Normalized source segment
+
+    Returns:
+        tuple: ``(template, values)``: the segment with each value replaced
+        by PLACEHOLDER, and the values in order
+    """
+    values = VARIABLE_PATTERN.findall(segment)
+    return VARIABLE_PATTERN.sub(PLACEHOLDER, segment), values
+
+def substitute_values(translation, old_values, new_values):
+    """
+    Put new values into a translation in place of the old ones.
+
+    Args:
+        translation (str): Stored translation of the old segment
+        old_values (list): Values of the old segment, in order
+        new_values (list): Values of the new segment, in the same order
+
+    Returns:
+        str or None: The updated translation, or None if a changed value
+        does not appear in the translation exactly as often as in the
+        source (e.g. the model reformatted it), or maps to two new values
+    """
+    replacements = {}
+    for old, new in zip(old_values, new_values):
+        if old != new:
+            if replacements.setdefault(old, new) != new:
+                return None
+    if not replacements:
+        return translation
+
+    # Whole values only: "3" must not match inside "2023" or "3.5"
+    def occurrences(values):
+        alternatives = "|".join(re.escape(value) for value in sorted(values, key=len, reverse=True))
+        return re.compile(rf"(?<!\w)(?<!\d[.,])({alternatives})(?!\w)(?![.,]\d)")
+
+    for old in replacements:
+        if len(occurrences([old]).findall(translation)) != old_values.count(old):
+            return None
+
+    return occurrences(replacements).sub(lambda match: replacements[match.group(1)], translation)
+
+def changed_tokens(old_segment, new_segment):
+    """
+    Align the substitutable tokens of two near-duplicate segments.
+
+    Args:
+        old_segment (str): Normalized stored segment
+        new_segment (str): Normalized new segment
+
+    Returns:
+        tuple or None: ``(old_values, new_values)``: every value and named
+        token of the old segment and its counterpart in the new one (equal
+        where unchanged), or None if the segments differ in anything but
+        one-for-one replacements of such tokens
+    """
+    old_tokens = TOKEN_PATTERN.findall(old_segment)
+    new_tokens = TOKEN_PATTERN.findall(new_segment)
+    old_values, new_values = [], []
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag != "equal" and (tag != "replace" or old_end - old_start != new_end - new_start):
+            return None
+        for old, new in zip(old_tokens[old_start:old_end], new_tokens[new_start:new_end]):
+            old_substitutable = SUBSTITUTABLE_PATTERN.fullmatch(old) is not None
+            if old != new and not (old_substitutable and SUBSTITUTABLE_PATTERN.fullmatch(new)):
+                return None
+            if old_substitutable:
+                old_values.append(old)
+                new_values.append(new)
+
+    # A token kept in one place but changed in another can't be substituted
+    mapping = {}
+    for old, new in zip(old_values, new_values):
+        if mapping.setdefault(old, new) != new:
+            return None
+    return old_values, new_values
+
+class TranslationMemory:
+    """
+    Store of translated segments with template and MinHash LSH lookup.
+
+    Segments with the same template as a query are found through an index.
+    Otherwise signatures are split into bands; segments sharing any band
+    bucket with the query are candidates, scored by the difflib similarity
+    of their templates. The oldest segments are evicted beyond max_entries.
+    All methods are thread-safe, and a memory inherited by a forked worker
+    reopens its own database connection. Database errors are logged and
+    treated as misses.
+    """
+
+    def __init__(self, db_path=None, num_perm=64, bands=16, ngram_size=5, min_similarity=0.8,
+                 max_candidates=10, max_entries=None):
+        """
+        Initialize the translation memory.
+
+        Args:
+            db_path (str, optional): SQLite file (kept in memory if None)
+            num_perm (int): MinHash permutations per signature
+            bands (int): LSH bands the signature is split into (num_perm
+                must be a multiple); more bands find less similar segments
+            ngram_size (int): Characters per shingle
+            min_similarity (float): Similarity (difflib ratio) of the
+                templates for a stored segment to count as a match
+            max_candidates (int): Candidates compared per lookup
+            max_entries (int, optional): Segments kept; the oldest are
+                evicted beyond this (None for no limit)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.db_path = db_path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.ngram_size = ngram_size
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+        self.max_entries = max_entries
+
+        # Fixed seed: signatures must stay comparable across restarts
+        generator = random.Random(1)
+        self._permutations = [(generator.randrange(1, _PRIME), generator.randrange(0, _PRIME))
+                              for _ in range(num_perm)]
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'exact_hits': 0,
+            'substituted_hits': 0,
+            'fuzzy_misses': 0,
+            'misses': 0,
+            'lookup_seconds': 0.0,
+            'model_seconds': 0.0,
+            'model_segments': 0,
+            'evictions': 0
+        }
+
+        self._db = None
+        self._db_pid = None
+        # Stored segments (approximate when workers share the file)
+        self._entries = 0
+        self._open_db()
+
+    def _open_db(self):
+        """Open (and create if needed) the SQLite store"""
+        path = self.db_path or ":memory:"
+        if self.db_path and os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db_pid = os.getpid()
+        if self.db_path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(segments)")]
+        if "signature" in columns:
+            # Stores from before generation settings were part of the scope;
+            # none of their segments can match any more
+            logger.info("Dropping translation memory segments stored in the old format")
+            self._db.execute("DROP TABLE buckets")
+            self._db.execute("DROP TABLE segments")
+
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            "id INTEGER PRIMARY KEY, scope TEXT NOT NULL, source TEXT NOT NULL, template TEXT NOT NULL, "
+            "translation TEXT NOT NULL, created_at REAL NOT NULL, UNIQUE (scope, source))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS segments_template ON segments (scope, template)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS segments_created_at ON segments (created_at)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (scope TEXT NOT NULL, bucket INTEGER NOT NULL, "
+            "segment_id INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (scope, bucket)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS buckets_segment ON buckets (segment_id)")
+        self._db.commit()
+        self._entries = self._db.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        logger.info(f"Translation memory opened: {path} ({self._entries} segments)")
+
+    def _connection(self):
+        """SQLite connection for this process. Must hold the lock."""
+        if self._db_pid != os.getpid():
+            # Connections must not be shared across fork(); open our own
+            self._open_db()
+        return self._db
+
+    @staticmethod
+    def _scope(source_code, target_code, model_name, generation_params=None):
+        """
+        Segments are only matched against translations by the same model,
+        language pair and settings that change the output (as in the cache key)
+        """
+        params = json.dumps(generation_params or {}, sort_keys=True)
+        return f"{model_name}:{source_code}:{target_code}:{params}"
+
+    def _signature(self, template):
+        """MinHash signature of a template's character n-grams"""
+        text = template.lower()
+        shingles = {text[i:i + self.ngram_size] for i in range(max(1, len(text) - self.ngram_size + 1))}
+        # blake2b is stable across processes, unlike hash()
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+                  for shingle in shingles]
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self._permutations]
+
+    def _buckets(self, signature):
+        """LSH bucket of each band of a signature"""
+        rows = self.num_perm // self.bands
+        buckets = []
+        for band in range(self.bands):
+            values = struct.pack(f"<{rows + 1}q", band, *signature[band * rows:(band + 1) * rows])
+            buckets.append(int.from_bytes(hashlib.blake2b(values, digest_size=7).digest(), "little"))
+        return buckets
+
+    def lookup(self, segment, source_code, target_code, model_name, generation_params=None):
+        """
+        Find a translation for a segment from a stored near-duplicate.
+
+        Args:
+            segment (str): Source text
+            source_code (str): MBart source language code
+            target_code (str): MBart target language code
+            model_name (str): Name of the translation model
+            generation_params (dict, optional): Parameters that change the
+                output (precision, backend, max_length, ...); only segments
+                stored with the same parameters match
+
+        Returns:
+            str or None: Stored translation (with changed values and named
+            tokens substituted), or None if no stored segment is close enough
+        """
+        start_time = time.perf_counter()
+        source = normalize_segment(segment)
+        scope = self._scope(source_code, target_code, model_name, generation_params)
+        template, values = split_variables(source)
+
+        result = "misses"
+        translation = None
+        try:
+            with self._lock:
+                db = self._connection()
+                row = db.execute(
+                    "SELECT translation FROM segments WHERE scope = ? AND source = ?", (scope, source)
+                ).fetchone()
+                if row is not None:
+                    result, translation = "exact_hits", row[0]
+                else:
+                    result, translation = self._template_lookup(db, scope, template, values)
+
+            if translation is None:
+                # Only lookups the template index can't answer pay for a signature
+                signature = self._signature(template)
+                with self._lock:
+                    fuzzy_result, translation = self._fuzzy_lookup(
+                        self._connection(), scope, source, template, signature
+                    )
+                if fuzzy_result != "misses":
+                    result = fuzzy_result
+        except sqlite3.Error as e:
+            logger.warning(f"Translation memory read error: {str(e)}")
+
+        with self._lock:
+            self._stats[result] += 1
+            self._stats['lookup_seconds'] += time.perf_counter() - start_time
+
+        metrics.TRANSLATION_MEMORY_LOOKUPS.labels(result=_RESULT_LABELS[result]).inc()
+        return translation
+
+    def _template_lookup(self, db, scope, template, values):
+        """Swap values into segments with the same template; returns ``(result, translation)``. Must hold the lock."""
+        rows = db.execute(
+            "SELECT source, translation FROM segments WHERE scope = ? AND template = ? "
+            "ORDER BY created_at DESC LIMIT ?", (scope, template, self.max_candidates)
+        ).fetchall()
+        for source, translation in rows:
+            substituted = substitute_values(translation, split_variables(source)[1], values)
+            if substituted is not None:
+                return "substituted_hits", substituted
+
+        # Segments with this template exist, but their values can't be swapped
+        return ("fuzzy_misses" if rows else "misses"), None
+
+    def _fuzzy_lookup(self, db, scope, source, template, signature):
+        """Score candidates sharing an LSH bucket; returns ``(result, translation)``. Must hold the lock."""
+        buckets = self._buckets(signature)
+        candidate_ids = [row[0] for row in db.execute(
+            f"SELECT segment_id FROM buckets WHERE scope = ? AND bucket IN ({','.join('?' * len(buckets))}) "
+            f"GROUP BY segment_id ORDER BY COUNT(*) DESC LIMIT ?",
+            (scope, *buckets, self.max_candidates)
+        )]
+        if not candidate_ids:
+            return "misses", None
+
+        candidates = []
+        for stored_source, stored_template, translation in db.execute(
+            f"SELECT source, template, translation FROM segments "
+            f"WHERE id IN ({','.join('?' * len(candidate_ids))})", candidate_ids
+        ):
+            if stored_template == template:
+                # Already tried by the template lookup
+                continue
+            similarity = difflib.SequenceMatcher(None, stored_template, template, autojunk=False).ratio()
+            if similarity >= self.min_similarity:
+                candidates.append((similarity, stored_source, translation))
+
+        if not candidates:
+            return "misses", None
+
+        for _, stored_source, translation in sorted(candidates, key=lambda c: c[0], reverse=True):
+            aligned = changed_tokens(stored_source, source)
+            if aligned is None:
+                continue
+            substituted = substitute_values(translation, *aligned)
+            if substituted is not None:
+                return "substituted_hits", substituted
+
+        # Similar segments exist, but differ in more than their values and named tokens
+        return "fuzzy_misses", None
+
+    def add(self, segment, translation, source_code, target_code, model_name, generation_params=None):
+        """
+        Store a model translation.
+
+        Args:
+            segment (str): Source text
+            translation (str): Translated text
+            source_code (str): MBart source language code
+            target_code (str): MBart target language code
+            model_name (str): Name of the translation model
+            generation_params (dict, optional): Parameters the translation
+                was made with (see lookup)
+        """
+        if translation is None:
+            return
+
+        source = normalize_segment(segment)
+        scope = self._scope(source_code, target_code, model_name, generation_params)
+        template, _ = split_variables(source)
+        signature = self._signature(template)
+
+        with self._lock:
+            try:
+                db = self._connection()
+                row = db.execute(
+                    "SELECT id FROM segments WHERE scope = ? AND source = ?", (scope, source)
+                ).fetchone()
+                if row is not None:
+                    db.execute("UPDATE segments SET translation = ?, created_at = ? WHERE id = ?",
+                               (translation, time.time(), row[0]))
+                else:
+                    segment_id = db.execute(
+                        "INSERT INTO segments (scope, source, template, translation, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (scope, source, template, translation, time.time())
+                    ).lastrowid
+                    db.executemany(
+                        "INSERT INTO buckets (scope, bucket, segment_id) VALUES (?, ?, ?)",
+                        [(scope, bucket, segment_id) for bucket in self._buckets(signature)]
+                    )
+                    self._entries += 1
+                db.commit()
+                if self.max_entries is not None and self._entries > self.max_entries:
+                    self._trim(db)
+            except sqlite3.Error as e:
+                logger.warning(f"Translation memory write error: {str(e)}")
+
+    def _trim(self, db):
+        """Evict the oldest segments down to a share of max_entries. Must hold the lock."""
+        self._entries = db.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        if self._entries <= self.max_entries:
+            return
+
+        excess = self._entries - int(self.max_entries * _TRIM_RATIO)
+        oldest = "SELECT id FROM segments ORDER BY created_at, id LIMIT ?"
+        with db:
+            db.execute(f"DELETE FROM buckets WHERE segment_id IN ({oldest})", (excess,))
+            db.execute(f"DELETE FROM segments WHERE id IN ({oldest})", (excess,))
+        self._entries -= excess
+        self._stats['evictions'] += excess
+        logger.debug(f"Evicted {excess} segments from the translation memory")
+
+    def record_model_time(self, seconds, segments):
+        """
+        Record time the model spent translating, to estimate the time saved by hits.
+
+        Args:
+            seconds (float): Time taken
+            segments (int): Segments translated in that time
+        """
+        with self._lock:
+            self._stats['model_seconds'] += seconds
+            self._stats['model_segments'] += segments
+
+    def clear(self):
+        """Remove every stored segment (counters are kept)"""
+        with self._lock:
+            db = self._connection()
+            db.execute("DELETE FROM buckets")
+            db.execute("DELETE FROM segments")
+            db.commit()
+            self._entries = 0
+
+    def stats(self):
+        """
+        Get match counters and an estimate of the model time saved.
+
+        Returns:
+            dict: Hit/miss counters, match rate, time spent on lookups, the
+            model's mean time per segment and the estimated seconds saved
+            (hits times that mean), and the number of stored segments
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            hits = stats['exact_hits'] + stats['substituted_hits']
+            lookups = hits + stats['fuzzy_misses'] + stats['misses']
+            stats['lookups'] = lookups
+            stats['match_rate'] = hits / lookups if lookups else 0.0
+            per_segment = stats['model_seconds'] / stats['model_segments'] if stats['model_segments'] else 0.0
+            stats['model_seconds_per_segment'] = per_segment
+            stats['estimated_seconds_saved'] = hits * per_segment - stats['lookup_seconds']
+
+            stats['max_entries'] = self.max_entries
+            try:
+                stats['entries'] = self._connection().execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+            except sqlite3.Error as e:
+                logger.warning(f"Translation memory read error: {str(e)}")
+
+            return stats
@@ -1,8 +1,22 @@
 import torch
-from transformers import MBartForConditionalGeneration, MBart50TokenizerFast
+from transformers import (AutoConfig, AutoModelForSeq2SeqLM, MBartForConditionalGeneration, MBart50TokenizerFast,
+                          StoppingCriteriaList)
+from transformers.modeling_outputs import BaseModelOutput
+import os
+import json
 import time
 import logging
+import warnings
 from tqdm import tqdm
+import metrics
+import tracing
+from backends import BACKENDS, TorchBackend, OnnxRuntimeBackend
+from cache import make_cache_key
+from chunking import chunk_text, reassemble
+from utils import deduplicate_segments
+from generation import PROFILES, GenerationGuard, LengthPredictor
+from speculative import SpeculativeDecoder
+from concurrency import TokenizerPool, ModelSlots
 
 # Set up logging
 logging.basicConfig(
@@ -17,29 +31,89 @@ class Translator:
     Uses the MBart-50 model which supports multiple Indian languages.
     """
     
-    def __init__(self, model_name="facebook/mbart-large-50-many-to-many-mmt", device=None):
+    # Supported precision modes
+    PRECISIONS = ("fp32", "bf16", "int8")
+    
+    # Written by prune_vocab.py next to a vocabulary-pruned model
+    PRUNED_VOCAB_FILE = "vocab_mapping.json"
+    
+    def __init__(self, model_name="facebook/mbart-large-50-many-to-many-mmt", device=None, cache=None,
+                 precision="fp32", quantized_model_path=None, backend="torch", onnx_model_dir=None,
+                 num_threads=None, memory=None, profile="quality", length_predictor=None, draft_model_path=None,
+                 num_draft_tokens=4, tokenizer_pool_size=4, model_slots=1):
         """
         Initialize the translator with the specified model.
         
         Args:
             model_name (str): The name of the model to use for translation
             device (str, optional): Device to run the model on ('cuda' or 'cpu')
+            cache (TranslationCache, optional): Cache for finished translations
+            precision (str): Model precision: 'fp32', 'bf16', or 'int8'
+                (dynamically quantized Linear layers, CPU only)
+            quantized_model_path (str, optional): File to load the int8 model
+                from, or to save it to after quantizing
+            backend (str): Inference engine: 'torch' or 'onnx' (ONNX Runtime)
+            onnx_model_dir (str, optional): Where the ONNX export is cached
+            num_threads (int, optional): Intra-op threads for the ONNX Runtime backend
+            memory (TranslationMemory, optional): Translation memory that
+                answers near-duplicates of earlier segments
+            profile (str): Default generation profile: 'fast' (greedy),
+                'balanced' (2 beams) or 'quality' (5 beams)
+            length_predictor (LengthPredictor, optional): Learns the output
+                length budget of each target language (default: a fresh one
+                kept in memory)
+            draft_model_path (str, optional): Small seq2seq model sharing the
+                tokenizer, used for speculative decoding with the 'fast'
+                profile (torch backend only; None decodes normally)
+            num_draft_tokens (int): Tokens the draft model proposes per pass
+                of the translation model
+            tokenizer_pool_size (int): Tokenizer instances, so that many
+                threads can tokenize and detokenize at once
+            model_slots (int): Threads allowed to run the model at once
+                (others wait; tokenizing and cache lookups don't need a slot)
         """
+        if precision not in self.PRECISIONS:
+            raise ValueError(f"Precision '{precision}' not supported. Choose from: {', '.join(self.PRECISIONS)}")
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend '{backend}' not supported. Choose from: {', '.join(BACKENDS)}")
+        if backend == "onnx" and precision != "fp32":
+            raise ValueError("The ONNX Runtime backend only supports fp32 precision")
+        self._check_profile(profile)
+            
         self.model_name = model_name
+        self.cache = cache
+        self.memory = memory
+        self.profile = profile
+        self.length_predictor = length_predictor or LengthPredictor()
+        self.precision = precision
+        self.quantized_model_path = quantized_model_path
+        self.backend_name = backend
+        self.onnx_model_dir = onnx_model_dir
+        self.num_threads = num_threads
+        self.draft_model_path = draft_model_path
+        self.num_draft_tokens = num_draft_tokens
+        self.tokenizer_pool_size = tokenizer_pool_size
+        self.slots = ModelSlots(model_slots)
         
-        # Determine device (use GPU if available)
+        # Determine device (use GPU if available; int8 always runs on CPU)
         if device is None:
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.device = "cuda" if torch.cuda.is_available() and precision != "int8" else "cpu"
         else:
             self.device = device
             
-        logger.info(f"Using device: {self.device}")
+        if self.precision == "int8" and self.device != "cpu":
+            raise ValueError("int8 precision is only supported on CPU")
+            
+        logger.info(f"Using device: {self.device} ({self.backend_name}, {self.precision})")
         
         # Load model and tokenizer
         logger.info(f"Loading model: {model_name}")
         self.model = None
         self.tokenizer = None
-        self.load_model()
+        self.tokenizers = None
+        self.backend = None
+        self.pruned_vocab = None
+        self.speculative = None
         
         # Language code mapping
         self.language_codes = {
@@ -50,28 +124,215 @@ class Translator:
             "telugu": "te_IN"
         }
         
+        self.load_model()
+        
     def load_model(self):
         """Load the translation model and tokenizer"""
         try:
             start_time = time.time()
-            self.model = MBartForConditionalGeneration.from_pretrained(self.model_name)
-            self.model.to(self.device)
             self.tokenizer = MBart50TokenizerFast.from_pretrained(self.model_name)
-            logger.info(f"Model loaded in {time.time() - start_time:.2f} seconds")
+            self.tokenizers = TokenizerPool(self.tokenizer, self.tokenizer_pool_size)
+            
+            if self.backend_name == "onnx":
+                self.backend = OnnxRuntimeBackend.load(
+                    self.model_name, self.tokenizer, self.device,
+                    export_dir=self.onnx_model_dir, num_threads=self.num_threads, tokenizers=self.tokenizers
+                )
+                self.model = self.backend.model
+            else:
+                if self.precision == "int8":
+                    self.model = self._load_quantized_model()
+                else:
+                    dtype = torch.bfloat16 if self.precision == "bf16" else torch.float32
+                    self.model = MBartForConditionalGeneration.from_pretrained(self.model_name, torch_dtype=dtype)
+                self.model.to(self.device)
+                self.backend = TorchBackend(self.model, self.tokenizer, self.device, self.tokenizers)
+            
+            self._check_pruned_vocab()
+            if self.draft_model_path:
+                self.speculative = self._load_draft_model()
+                
+            load_time = time.time() - start_time
+            metrics.MODEL_LOAD_SECONDS.labels(backend=self.backend_name, precision=self.precision).set(load_time)
+            logger.info(f"Model loaded in {load_time:.2f} seconds")
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             raise
     
-    def translate(self, text, target_language, source_language="english", batch_size=8, max_length=1024):
+    def _load_draft_model(self):
+        """Load the draft model for speculative decoding (None if the backend can't use it)"""
+        if self.backend_name != "torch":
+            logger.warning("Speculative decoding requires the torch backend; decoding without the draft model")
+            return None
+        
+        # Small enough that int8 isn't worth it
+        dtype = torch.bfloat16 if self.precision == "bf16" else torch.float32
+        draft_model = AutoModelForSeq2SeqLM.from_pretrained(self.draft_model_path, torch_dtype=dtype)
+        if draft_model.config.vocab_size != self.model.config.vocab_size:
+            raise ValueError(f"Draft model has {draft_model.config.vocab_size} tokens but the model has "
+                             f"{self.model.config.vocab_size}; both must use the same tokenizer")
+        draft_model.to(self.device)
+        
+        parameters = sum(p.numel() for p in draft_model.parameters())
+        logger.info(f"Loaded draft model {self.draft_model_path} ({parameters / 1e6:.1f}M parameters) "
+                    f"proposing {self.num_draft_tokens} tokens per pass")
+        return SpeculativeDecoder(
+            self.backend, TorchBackend(draft_model, self.tokenizer, self.device, self.tokenizers),
+            num_draft_tokens=self.num_draft_tokens
+        )
+    
+    def _check_pruned_vocab(self):
+        """Check that a vocabulary-pruned model (from prune_vocab.py) matches its tokenizer"""
+        mapping_path = os.path.join(self.model_name, self.PRUNED_VOCAB_FILE)
+        if not os.path.isfile(mapping_path):
+            return
+        
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            self.pruned_vocab = json.load(f)
+        
+        vocab_size = self.model.config.vocab_size
+        if len(self.tokenizer) != vocab_size:
+            raise ValueError(f"Pruned tokenizer has {len(self.tokenizer)} tokens but the model has {vocab_size}")
+        unknown = [code for code in self.language_codes.values()
+                   if self.tokenizer.convert_tokens_to_ids(code) == self.tokenizer.unk_token_id]
+        if unknown:
+            raise ValueError(f"Pruned vocabulary is missing language codes: {', '.join(unknown)}")
+        
+        logger.info(f"Pruned vocabulary: {vocab_size} tokens (from {self.pruned_vocab['source_vocab_size']} "
+                    f"in {self.pruned_vocab['source_model']})")
+    
+    def _load_quantized_model(self):
+        """
+        Load the int8 model, quantizing the fp32 weights if needed.
+        
+        The quantized model is pickled as a whole, so a saved file is only
+        valid for the model and the torch/transformers versions that wrote
+        it. The source model's name and config are saved next to it; if they
+        don't match the served model, or the file cannot be loaded, the model
+        is quantized again and the file rewritten.
+        """
+        path = self.quantized_model_path
+        source = self._quantized_model_source()
+        if path and os.path.exists(path):
+            saved_source = None
+            try:
+                with open(f"{path}.json", 'r', encoding='utf-8') as f:
+                    saved_source = json.load(f)
+            except (OSError, ValueError):
+                pass
+            
+            if saved_source != source:
+                logger.warning(f"Quantized model at {path} was not built from {self.model_name} "
+                               f"with this config and torch version, re-quantizing")
+            else:
+                try:
+                    model = torch.load(path, weights_only=False)
+                    logger.info(f"Loaded quantized model from {path}")
+                    return model
+                except Exception as e:
+                    logger.warning(f"Could not load quantized model from {path}, re-quantizing: {str(e)}")
+        
+        model = MBartForConditionalGeneration.from_pretrained(self.model_name)
+        model.eval()
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("Quantized Linear layers to int8")
+        
+        if path:
+            model_dir = os.path.dirname(path)
+            if model_dir:
+                os.makedirs(model_dir, exist_ok=True)
+            torch.save(model, path)
+            with open(f"{path}.json", 'w', encoding='utf-8') as f:
+                json.dump(source, f, indent=2)
+            logger.info(f"Saved quantized model to {path}")
+            
+        return model
+    
+    def _quantized_model_source(self):
+        """What a saved int8 model must have been built from to be reused"""
+        model_config = AutoConfig.from_pretrained(self.model_name)
+        return {
+            'source_model': self.model_name,
+            # Includes the transformers version
+            'config': json.loads(model_config.to_json_string()),
+            'torch_version': torch.__version__
+        }
+
+    def warm_up(self, languages=None, runs=2, max_length=64):
+        """
+        Run a few throwaway translations so the first real requests are fast.
+
+        The first generate calls pay for lazy initialization (kernel
+        selection, allocator growth, ONNX Runtime session setup), so each
+        target language is translated alone and in a small batch. The cache
+        is bypassed and the length predictor does not learn from these
+        generations, so nothing is stored.
+
+        Args:
+            languages (list, optional): Target language names (default: all but English)
+            runs (int): Rounds of warm-up per language
+            max_length (int): Maximum length of the warm-up generations
+
+        Returns:
+            float: Seconds spent warming up
+        """
+        if languages is None:
+            languages = [name for name in self.language_codes if name != "english"]
+
+        texts = [
+            "The quarterly report is ready for review.",
+            "Revenue grew by 12 percent compared to last year, driven by strong demand in the southern region."
+        ]
+
+        start_time = time.time()
+        source_code = self.language_codes["english"]
+        for _ in range(runs):
+            for language in languages:
+                target_code = self.language_codes[language]
+                for batch in (texts[:1], texts):
+                    translations = self._generate_batches(batch, source_code, target_code, len(batch), max_length,
+                                                          profile=self.profile, observe=False)
+                    if None in translations:
+                        logger.warning(f"Warm-up translation to {language} failed")
+
+        warmup_time = time.time() - start_time
+        logger.info(f"Model warmed up in {warmup_time:.2f} seconds")
+        return warmup_time
+
+    def count_tokens(self, text, add_special_tokens=True):
+        """
+        Count the tokens the model will see for a text.
+        
+        Args:
+            text (str): Text to measure
+            add_special_tokens (bool): Include the language code and end-of-sentence tokens
+            
+        Returns:
+            int: Number of tokens
+        """
+        with self.tokenizers.acquire() as tokenizer:
+            count = len(tokenizer(text, add_special_tokens=False)["input_ids"])
+        # Language code and end-of-sentence
+        return count + 2 if add_special_tokens else count
+    
+    def translate(self, text, target_language, source_language="english", batch_size=8, max_length=1024,
+                  max_batch_tokens=None, stats=None, profile=None):
         """
         Translate text from source language to target language.
         
+        Repeated segments in a list (e.g. table headers, "N/A") are
+        translated once and the result is copied to every position.
+        
         Args:
             text (str or list): Text or list of texts to translate
             target_language (str): Target language name (e.g., "hindi", "tamil")
             source_language (str): Source language name (default: "english")
             batch_size (int): Batch size for processing long texts
             max_length (int): Maximum length of input sequence
+            max_batch_tokens (int, optional): Maximum padded tokens per batch, on top of batch_size
+            stats (dict, optional): For a list, filled with the number of
+                segments, unique segments, cache hits and segments sent to the model
+            profile (str, optional): Generation profile (default: the translator's)
             
         Returns:
             str or list: Translated text(s)
@@ -86,111 +347,663 @@ class Translator:
         if target_language not in self.language_codes:
             raise ValueError(f"Target language '{target_language}' not supported")
             
+        profile = self._check_profile(profile)
+            
         source_code = self.language_codes[source_language]
         target_code = self.language_codes[target_language]
         
-        # Set the source language
-        self.tokenizer.src_lang = source_code
-        
         # Handle single text or list of texts
         if isinstance(text, str):
-            return self._translate_text(text, target_code, max_length)
+            return self._translate_text(text, source_code, target_code, max_length, profile)
         elif isinstance(text, list):
-            return self._translate_batch(text, target_code, batch_size, max_length)
+            return self._translate_batch(text, source_code, target_code, batch_size, max_length, max_batch_tokens,
+                                         stats, profile)
         else:
             raise TypeError("Text must be a string or a list of strings")
     
-    def _translate_text(self, text, target_code, max_length):
+    def _check_profile(self, profile):
+        """Validate a generation profile name (None selects the default)"""
+        if profile is None:
+            return self.profile
+        if profile not in PROFILES:
+            raise ValueError(f"Profile '{profile}' not supported. Choose from: {', '.join(PROFILES)}")
+        return profile
+    
+    def _generation_params(self, max_length, profile):
+        """Settings that change a translation, scoping cache keys and translation memory matches"""
+        return {'max_length': max_length, 'precision': self.precision, 'backend': self.backend_name,
+                'profile': profile}
+    
+    def _cache_key(self, text, source_code, target_code, max_length, profile):
+        """Build the cache key for a text"""
+        return make_cache_key(text, source_code, target_code, self.model_name,
+                              self._generation_params(max_length, profile))
+    
+    def _translate_text(self, text, source_code, target_code, max_length, profile):
         """Translate a single text"""
+        cache_key = None
+        if self.cache is not None:
+            with tracing.span("cache_get"):
+                cache_key = self._cache_key(text, source_code, target_code, max_length, profile)
+                cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        if self.memory is not None:
+            with tracing.span("memory_lookup"):
+                remembered = self._memory_lookup(text, source_code, target_code, max_length, profile)
+            if remembered is not None:
+                if cache_key is not None:
+                    self.cache.put(cache_key, remembered)
+                return remembered
+        
         try:
             # Tokenize the text
-            encoded = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=max_length)
-            encoded = {k: v.to(self.device) for k, v in encoded.items()}
+            with tracing.span("tokenize", texts=1):
+                input_ids = self.backend.tokenize([text], max_length, source_code)
+            with tracing.span("pad"):
+                encoded = self._pad_batch(input_ids)
+            with tracing.span("to_device", device=self.device):
+                encoded = {k: v.to(self.device) for k, v in encoded.items()}
             
             # Generate translation
-            with torch.no_grad():
-                generated_tokens = self.model.generate(
-                    **encoded,
-                    forced_bos_token_id=self.tokenizer.lang_code_to_id[target_code],
-                    max_length=max_length
-                )
+            generated_tokens = self._generate(encoded, target_code, max_length, profile)
                 
             # Decode the generated tokens
-            translation = self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)[0]
+            with tracing.span("detokenize"):
+                translation = self.backend.detokenize(generated_tokens)[0]
+            
+            if cache_key is not None:
+                with tracing.span("cache_put"):
+                    self.cache.put(cache_key, translation)
+            if self.memory is not None:
+                self._memory_add(text, source_code, target_code, max_length, profile, translation)
+                
             return translation
             
         except Exception as e:
             logger.error(f"Translation error: {str(e)}")
+            self._count_errors(target_code)
             return None
     
-    def _translate_batch(self, texts, target_code, batch_size, max_length):
-        """Translate a batch of texts"""
-        translations = []
+    def _translate_batch(self, texts, source_code, target_code, batch_size, max_length, max_batch_tokens=None,
+                         stats=None, profile=None):
+        """Translate a batch of texts, each distinct segment once"""
+        unique, positions = deduplicate_segments(texts)
+        duplicates = len(texts) - len(unique)
+        if duplicates:
+            metrics.DEDUPLICATED_SEGMENTS.labels(stage="batch").inc(duplicates)
+            logger.debug(f"Translating {len(unique)} unique of {len(texts)} segments")
         
-        # Process in batches
-        for i in tqdm(range(0, len(texts), batch_size), desc="Translating batches"):
-            batch_texts = texts[i:i+batch_size]
-            
+        translations = [None] * len(unique)
+        if self.cache is not None:
+            with tracing.span("cache_get", texts=len(unique)):
+                cache_keys = [self._cache_key(text, source_code, target_code, max_length, profile) for text in unique]
+                translations = [self.cache.get(key) for key in cache_keys]
+        missing = [i for i, translation in enumerate(translations) if translation is None]
+        cache_hits = len(unique) - len(missing)
+        
+        # Near-duplicates of earlier segments come from the translation memory
+        memory_hits = 0
+        if self.memory is not None and missing:
+            with tracing.span("memory_lookup", texts=len(missing)):
+                for i in missing:
+                    translations[i] = self._memory_lookup(unique[i], source_code, target_code, max_length, profile)
+            remembered = [i for i in missing if translations[i] is not None]
+            memory_hits = len(remembered)
+            if self.cache is not None:
+                self.cache.put_many([(cache_keys[i], translations[i]) for i in remembered])
+            missing = [i for i in missing if translations[i] is None]
+        
+        # Only send the rest to the model
+        if missing:
+            generated = self._generate_batches(
+                [unique[i] for i in missing], source_code, target_code, batch_size, max_length, max_batch_tokens,
+                profile
+            )
+            for i, translation in zip(missing, generated):
+                translations[i] = translation
+            if self.cache is not None:
+                with tracing.span("cache_put", texts=len(missing)):
+                    self.cache.put_many([(cache_keys[i], translations[i]) for i in missing])
+            if self.memory is not None:
+                for i in missing:
+                    self._memory_add(unique[i], source_code, target_code, max_length, profile, translations[i])
+        
+        if stats is not None:
+            stats.update({
+                'segments': len(texts),
+                'unique_segments': len(unique),
+                'duplicate_segments': duplicates,
+                'cache_hits': cache_hits,
+                'memory_hits': memory_hits,
+                'model_segments': len(missing)
+            })
+                
+        return [translations[i] for i in positions]
+    
+    def _memory_lookup(self, text, source_code, target_code, max_length, profile):
+        """Look a text up in the translation memory (None on a miss)"""
+        return self.memory.lookup(text, source_code, target_code, self.model_name,
+                                  self._generation_params(max_length, profile))
+    
+    def _memory_add(self, text, source_code, target_code, max_length, profile, translation):
+        """Store a model translation in the translation memory"""
+        self.memory.add(text, translation, source_code, target_code, self.model_name,
+                        self._generation_params(max_length, profile))
+    
+    def _generate_batches(self, texts, source_code, target_code, batch_size, max_length, max_batch_tokens=None,
+                          profile=None, observe=True):
+        """
+        Run the model over texts in length-bucketed batches.
+        
+        Texts are sorted by token length so each batch holds inputs of
+        similar size, which keeps padding (and decode steps spent waiting on
+        the longest output) to a minimum. Results are returned in input order.
+        With observe False (warm-up), the output lengths and model time are
+        not recorded.
+        """
+        translations = [None] * len(texts)
+        
+        try:
+            # Tokenize everything once, without padding
+            with tracing.span("tokenize", texts=len(texts)):
+                input_ids = self.backend.tokenize(texts, max_length, source_code)
+        except Exception as e:
+            logger.error(f"Batch tokenization error: {str(e)}")
+            self._count_errors(target_code, len(texts))
+            return translations
+        
+        for batch_indices in tqdm(self._length_buckets(input_ids, batch_size, max_batch_tokens),
+                                  desc="Translating batches"):
             try:
-                # Tokenize the batch
-                encoded = self.tokenizer(batch_texts, return_tensors="pt", padding=True, truncation=True, max_length=max_length)
-                encoded = {k: v.to(self.device) for k, v in encoded.items()}
+                with tracing.span("pad", batch_size=len(batch_indices)):
+                    encoded = self._pad_batch([input_ids[i] for i in batch_indices])
+                with tracing.span("to_device", device=self.device):
+                    encoded = {k: v.to(self.device) for k, v in encoded.items()}
                 
                 # Generate translations
-                with torch.no_grad():
-                    generated_tokens = self.model.generate(
-                        **encoded,
-                        forced_bos_token_id=self.tokenizer.lang_code_to_id[target_code],
-                        max_length=max_length
-                    )
+                generated_tokens = self._generate(encoded, target_code, max_length, profile or self.profile,
+                                                  observe)
                     
                 # Decode the generated tokens
-                batch_translations = self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)
-                translations.extend(batch_translations)
+                with tracing.span("detokenize", batch_size=len(batch_indices)):
+                    batch_translations = self.backend.detokenize(generated_tokens)
+                for i, translation in zip(batch_indices, batch_translations):
+                    translations[i] = translation
                 
             except Exception as e:
+                # Failed translations in this batch stay None
                 logger.error(f"Batch translation error: {str(e)}")
-                # Add None for each failed translation in this batch
-                translations.extend([None] * len(batch_texts))
+                self._count_errors(target_code, len(batch_indices))
+                
+        return translations
+    
+    def _generate(self, encoded, target_code, max_length, profile, observe=True):
+        """Run the encoder, then generate from its outputs (so both stages are timed separately)"""
+        batch_size, input_length = encoded["input_ids"].shape
+        
+        # The language code is forced as the first new token
+        target_codes = [target_code] * batch_size
+        generate_kwargs, guard = self._generation_settings(
+            encoded["attention_mask"], target_codes, max_length, profile, decoder_prompt_length=1
+        )
+        
+        speculative = self._speculative(profile, batch_size)
+        with tracing.span("model_slot"), self.slots.acquire():
+            start_time = time.perf_counter()
+            with tracing.span("encode", batch_size=batch_size, input_length=input_length):
+                encoder_outputs = self.backend.encode(**encoded)
+            
+            with tracing.span("generate", batch_size=batch_size, profile=profile, speculative=speculative):
+                if speculative:
+                    prompt = [self.backend.decoder_start_token_id, self.tokenizer.lang_code_to_id[target_code]]
+                    generated_tokens = self.speculative.generate(
+                        encoded, encoder_outputs, [prompt] * batch_size, guard.budgets.tolist()
+                    )
+                else:
+                    generated_tokens = self.backend.generate(
+                        encoder_outputs=encoder_outputs,
+                        attention_mask=encoded["attention_mask"],
+                        forced_bos_token_id=self.tokenizer.lang_code_to_id[target_code],
+                        **generate_kwargs
+                    )
+            model_time = time.perf_counter() - start_time
+        if self.memory is not None and observe:
+            # Lets the memory estimate the time its hits save
+            self.memory.record_model_time(model_time, batch_size)
+        return self._finish_generation(generated_tokens, guard, encoded["attention_mask"], target_codes, observe)
+    
+    def _generation_settings(self, attention_mask, target_codes, max_length, profile, decoder_prompt_length):
+        """
+        Decoding settings for one generate call: the profile's strategy, and
+        a guard stopping each input at its own length budget (from its token
+        count and the learned ratio of its target language) or when it
+        starts repeating itself.
+        
+        Returns:
+            tuple: ``(generate keyword arguments, GenerationGuard)``
+        """
+        # Budgets count the tokens after the decoder start and language code
+        input_tokens = (attention_mask.sum(dim=1) - 2).tolist()
+        budgets = [
+            self.length_predictor.budget(tokens, target_code, max_length - 2)
+            for tokens, target_code in zip(input_tokens, target_codes)
+        ]
+        guard = GenerationGuard(budgets, prompt_length=2)
+        generate_kwargs = dict(
+            PROFILES[profile],
+            max_new_tokens=max(budgets) + 2 - decoder_prompt_length,
+            # A sequence cut off by its budget must not look like it ended on its own
+            forced_eos_token_id=None,
+            stopping_criteria=StoppingCriteriaList([guard])
+        )
+        return generate_kwargs, guard
+    
+    def _speculative(self, profile, batch_size):
+        """
+        Whether a decode goes through the draft model: greedy profiles only,
+        and single sequences only, since the draft model decodes rows one at
+        a time and a batched generate is faster for several rows
+        """
+        return self.speculative is not None and PROFILES[profile]["num_beams"] == 1 and batch_size == 1
+    
+    def _finish_generation(self, generated_tokens, guard, attention_mask, target_codes, observe=True):
+        """Trim runaway repeats, and learn output lengths from translations that ended on their own"""
+        sequences, natural = guard.finish(
+            generated_tokens, self.model.config.eos_token_id, self.tokenizer.pad_token_id
+        )
+        if not observe:
+            return sequences
+        input_tokens = (attention_mask.sum(dim=1) - 2).tolist()
+        for tokens, ended, source_tokens, target_code in zip(sequences, natural, input_tokens, target_codes):
+            if ended:
+                # Without decoder start, language code and end-of-sentence
+                self.length_predictor.observe(source_tokens, len(tokens) - 3, target_code)
+        return sequences
+    
+    def _count_errors(self, target_code, count=1):
+        """Count segments that failed to translate into a language"""
+        for language, code in self.language_codes.items():
+            if code == target_code:
+                metrics.TRANSLATION_ERRORS.labels(language=language).inc(count)
+                return
+    
+    @staticmethod
+    def _length_buckets(input_ids, batch_size, max_batch_tokens=None):
+        """
+        Group token sequences of similar length into batches.
+        
+        Args:
+            input_ids (list): Token ids of each input
+            batch_size (int): Maximum number of inputs per batch
+            max_batch_tokens (int, optional): Maximum padded tokens
+                (longest input * batch size) per batch
+            
+        Returns:
+            list: Lists of input indices, one per batch
+        """
+        order = sorted(range(len(input_ids)), key=lambda i: len(input_ids[i]))
+        batches = []
+        current = []
+        
+        for i in order:
+            # Sorted ascending, so this input is the longest in the batch
+            padded_tokens = len(input_ids[i]) * (len(current) + 1)
+            if current and (len(current) >= batch_size
+                            or (max_batch_tokens and padded_tokens > max_batch_tokens)):
+                batches.append(current)
+                current = []
+            current.append(i)
+            
+        if current:
+            batches.append(current)
+            
+        return batches
+    
+    def _pad_batch(self, input_ids):
+        """Right-pad token sequences into input_ids / attention_mask tensors"""
+        longest = max(len(ids) for ids in input_ids)
+        padded = torch.full((len(input_ids), longest), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(input_ids), longest), dtype=torch.long)
+        
+        for row, ids in enumerate(input_ids):
+            padded[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, :len(ids)] = 1
+            
+        return {"input_ids": padded, "attention_mask": attention_mask}
+    
+    def split_large_text(self, text, max_chunk_tokens=256, pack=True):
+        """
+        Split text into the sentence-aligned chunks used for large texts.
+        
+        Args:
+            text (str): Text to split
+            max_chunk_tokens (int): Maximum number of tokens per chunk
+            pack (bool): Pack several sentences into a chunk (False: one
+                chunk per sentence)
+            
+        Returns:
+            list: List of chunking.Chunk
+        """
+        # The budget leaves room for the language code and end-of-sentence tokens
+        return chunk_text(
+            text,
+            max_chunk_tokens - 2,
+            lambda segment: self.count_tokens(segment, add_special_tokens=False),
+            pack=pack
+        )
+    
+    def translate_multi(self, text, targets=None, source_language="english", batch_size=8,
+                        max_length=1024, max_chunk_tokens=None, profile=None):
+        """
+        Translate text into several target languages with one encoder pass.
+        
+        The source is tokenized and encoded once; the encoder outputs are then
+        shared by all target languages in a single batched decode.
+        
+        Args:
+            text (str or list): Text or list of texts to translate
+            targets (list, optional): Target language names (default: every
+                supported language except the source)
+            source_language (str): Source language name (default: "english")
+            batch_size (int): Number of source texts encoded per batch
+            max_length (int): Maximum length of input sequence
+            max_chunk_tokens (int, optional): Split a single large text into
+                sentence-aligned chunks of at most this many tokens
+            profile (str, optional): Generation profile (default: the translator's)
+            
+        Returns:
+            dict: Target language name -> translated text (or list of texts)
+        """
+        if not self.model or not self.tokenizer:
+            logger.error("Model or tokenizer not loaded")
+            return None
+            
+        # Validate languages
+        if source_language not in self.language_codes:
+            raise ValueError(f"Source language '{source_language}' not supported")
+        if targets is None:
+            targets = [language for language in self.language_codes if language != source_language]
+        for target_language in targets:
+            if target_language not in self.language_codes:
+                raise ValueError(f"Target language '{target_language}' not supported")
+        profile = self._check_profile(profile)
+        source_code = self.language_codes[source_language]
+        
+        if isinstance(text, list):
+            return self._translate_multi_batch(text, source_code, targets, batch_size, max_length, profile)
+        if not isinstance(text, str):
+            raise TypeError("Text must be a string or a list of strings")
+            
+        if not max_chunk_tokens:
+            translations = self._translate_multi_batch([text], source_code, targets, batch_size, max_length, profile)
+            return {language: translated[0] for language, translated in translations.items()}
+        
+        chunks = self.split_large_text(text, max_chunk_tokens)
+        logger.info(f"Split large text into {len(chunks)} chunks for {len(targets)} languages")
+        
+        translations = self._translate_multi_batch(
+            [chunk.text for chunk in chunks], source_code, targets, batch_size, max_length, profile
+        )
+        return {
+            language: None if None in translated else reassemble(chunks, translated)
+            for language, translated in translations.items()
+        }
+    
+    def _translate_multi_batch(self, texts, source_code, targets, batch_size, max_length, profile):
+        """Translate texts into each target language, sharing encoder outputs"""
+        unique, positions = deduplicate_segments(texts)
+        if len(unique) < len(texts):
+            metrics.DEDUPLICATED_SEGMENTS.labels(stage="batch").inc((len(texts) - len(unique)) * len(targets))
+            translations = self._translate_multi_batch(unique, source_code, targets, batch_size, max_length, profile)
+            return {language: [translated[i] for i in positions] for language, translated in translations.items()}
+        
+        target_codes = {language: self.language_codes[language] for language in targets}
+        translations = {language: [None] * len(texts) for language in targets}
+        
+        # Work out which (text, language) pairs actually need the model
+        missing = {}
+        with tracing.span("lookup", texts=len(texts), targets=len(targets)):
+            for i, text in enumerate(texts):
+                for language, target_code in target_codes.items():
+                    if self.cache is not None:
+                        cached = self.cache.get(self._cache_key(text, source_code, target_code, max_length, profile))
+                        if cached is not None:
+                            translations[language][i] = cached
+                            continue
+                    if self.memory is not None:
+                        remembered = self._memory_lookup(text, source_code, target_code, max_length, profile)
+                        if remembered is not None:
+                            translations[language][i] = remembered
+                            continue
+                    missing.setdefault(i, []).append(language)
+                
+        if not missing:
+            return translations
+        
+        text_indices = sorted(missing)
+        try:
+            with tracing.span("tokenize", texts=len(text_indices)):
+                input_ids = self.backend.tokenize([texts[i] for i in text_indices], max_length, source_code)
+        except Exception as e:
+            logger.error(f"Multi-target tokenization error: {str(e)}")
+            for language, target_code in target_codes.items():
+                self._count_errors(target_code, sum(1 for i in missing if language in missing[i]))
+            return translations
+        
+        decoder_start_token_id = self.backend.decoder_start_token_id
+        
+        for bucket in tqdm(self._length_buckets(input_ids, batch_size), desc="Translating batches"):
+            # One decoder row per (text, language) pair, pointing at its encoder row
+            rows = [(position, text_indices[i], language)
+                    for position, i in enumerate(bucket)
+                    for language in missing[text_indices[i]]]
+            
+            try:
+                with tracing.span("pad", batch_size=len(bucket)):
+                    encoded = self._pad_batch([input_ids[i] for i in bucket])
+                with tracing.span("to_device", device=self.device):
+                    encoded = {k: v.to(self.device) for k, v in encoded.items()}
+                row_index = torch.tensor([position for position, _, _ in rows], device=self.device)
+                decoder_input_ids = torch.tensor(
+                    [[decoder_start_token_id, self.tokenizer.lang_code_to_id[target_codes[language]]]
+                     for _, _, language in rows],
+                    device=self.device
+                )
+                
+                attention_mask = encoded["attention_mask"].index_select(0, row_index)
+                row_codes = [target_codes[language] for _, _, language in rows]
+                generate_kwargs, guard = self._generation_settings(
+                    attention_mask, row_codes, max_length, profile, decoder_prompt_length=2
+                )
+                
+                speculative = self._speculative(profile, len(rows))
+                with tracing.span("model_slot"), self.slots.acquire():
+                    with tracing.span("encode", batch_size=len(bucket), input_length=encoded["input_ids"].shape[1]):
+                        encoder_outputs = self.backend.encode(**encoded)
+                        row_encoder_outputs = BaseModelOutput(
+                            last_hidden_state=encoder_outputs.last_hidden_state.index_select(0, row_index)
+                        )
+                    with tracing.span("generate", batch_size=len(rows), profile=profile, speculative=speculative):
+                        if speculative:
+                            generated_tokens = self.speculative.generate(
+                                {"input_ids": encoded["input_ids"].index_select(0, row_index),
+                                 "attention_mask": attention_mask},
+                                row_encoder_outputs, decoder_input_ids.tolist(), guard.budgets.tolist()
+                            )
+                        else:
+                            generated_tokens = self.backend.generate(
+                                encoder_outputs=row_encoder_outputs,
+                                attention_mask=attention_mask,
+                                decoder_input_ids=decoder_input_ids,
+                                **generate_kwargs
+                            )
+                generated_tokens = self._finish_generation(generated_tokens, guard, attention_mask, row_codes)
+                    
+                with tracing.span("detokenize", batch_size=len(rows)):
+                    batch_translations = self.backend.detokenize(generated_tokens)
+                if self.cache is not None:
+                    self.cache.put_many([
+                        (self._cache_key(texts[i], source_code, target_codes[language], max_length, profile),
+                         translation)
+                        for (_, i, language), translation in zip(rows, batch_translations)
+                    ])
+                for (_, i, language), translation in zip(rows, batch_translations):
+                    translations[language][i] = translation
+                    if self.memory is not None:
+                        self._memory_add(texts[i], source_code, target_codes[language], max_length, profile,
+                                         translation)
+                        
+            except Exception as e:
+                logger.error(f"Multi-target translation error: {str(e)}")
+                for _, _, language in rows:
+                    self._count_errors(target_codes[language])
                 
         return translations
     
-    def translate_large_text(self, text, target_language, source_language="english", 
-                            chunk_size=500, overlap=50, max_length=1024):
+    def _large_text_chunks(self, text, max_chunk_tokens, chunk_size, overlap):
+        """
+        Chunks for translate_large_text(_iter), honouring the deprecated
+        character-based arguments: chunk_size splits like
+        utils.split_text_into_chunks, and overlap is ignored.
+        """
+        if overlap is not None:
+            warnings.warn("'overlap' is deprecated and ignored: chunks end on sentence boundaries and no longer "
+                          "overlap", DeprecationWarning, stacklevel=3)
+        if chunk_size is None:
+            return self.split_large_text(text, max_chunk_tokens)
+        
+        warnings.warn("'chunk_size' (characters) is deprecated; use max_chunk_tokens",
+                      DeprecationWarning, stacklevel=3)
+        return chunk_text(text, chunk_size, len)
+    
+    def translate_large_text(self, text, target_language, source_language="english", chunk_size=None,
+                             overlap=None, max_length=1024, max_chunk_tokens=256, profile=None):
         """
-        Translate large text by breaking it into chunks with overlap.
+        Translate large text by breaking it into sentence-aligned chunks.
+        
+        Sentences are packed into chunks of at most max_chunk_tokens tokens,
+        and the translated chunks are joined back with the original line
+        breaks, so paragraph structure is preserved.
         
         Args:
             text (str): Large text to translate
             target_language (str): Target language name
             source_language (str): Source language name (default: "english")
-            chunk_size (int): Number of characters per chunk
-            overlap (int): Number of overlapping characters between chunks
+            chunk_size (int, optional): Deprecated: maximum number of
+                characters per chunk, used instead of max_chunk_tokens
+            overlap (int, optional): Deprecated and ignored; chunks no
+                longer overlap, since they end on sentence boundaries
             max_length (int): Maximum length for the model
+            max_chunk_tokens (int): Maximum number of tokens per chunk
+            profile (str, optional): Generation profile (default: the translator's)
             
         Returns:
             str: Translated text
         """
-        if len(text) <= chunk_size:
-            return self.translate(text, target_language, source_language, max_length=max_length)
+        if source_language not in self.language_codes:
+            raise ValueError(f"Source language '{source_language}' not supported")
+        if target_language not in self.language_codes:
+            raise ValueError(f"Target language '{target_language}' not supported")
+        profile = self._check_profile(profile)
+        
+        cache_key = None
+        if self.cache is not None:
+            params = {**self._generation_params(max_length, profile), 'max_chunk_tokens': max_chunk_tokens}
+            if chunk_size is not None:
+                params['chunk_size'] = chunk_size
+            cache_key = make_cache_key(
+                text, self.language_codes[source_language], self.language_codes[target_language],
+                self.model_name, params
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         
-        # Split text into chunks with overlap
-        chunks = []
-        for i in range(0, len(text), chunk_size - overlap):
-            chunk = text[i:i + chunk_size]
-            if chunk:  # Ensure we don't add empty chunks
-                chunks.append(chunk)
+        with tracing.span("chunk"):
+            chunks = self._large_text_chunks(text, max_chunk_tokens, chunk_size, overlap)
         
         logger.info(f"Split large text into {len(chunks)} chunks")
         
-        # Translate each chunk
-        translated_chunks = self.translate(chunks, target_language, source_language, max_length=max_length)
+        # Translate each chunk (repeated chunks only once)
+        stats = {}
+        translated_chunks = self.translate(
+            [chunk.text for chunk in chunks], target_language, source_language, max_length=max_length,
+            stats=stats, profile=profile
+        )
+        if stats.get('duplicate_segments'):
+            logger.info(f"Skipped {stats['duplicate_segments']} repeated chunks of {len(chunks)}")
+        
+        if translated_chunks is None or None in translated_chunks:
+            logger.error("Large text translation failed for one or more chunks")
+            return None
+        
+        # Combine translated chunks with the original separators
+        combined_translation = reassemble(chunks, translated_chunks)
         
-        # Combine translated chunks (simple concatenation for now)
-        # Note: A more sophisticated approach might be needed for better results
-        combined_translation = " ".join(translated_chunks)
+        if cache_key is not None:
+            self.cache.put(cache_key, combined_translation)
         
         return combined_translation
+    
+    def translate_large_text_iter(self, text, target_language, source_language="english",
+                                  max_chunk_tokens=256, max_length=1024, batch_size=8, profile=None,
+                                  chunk_size=None, overlap=None):
+        """
+        Translate large text chunk by chunk, yielding results as they finish.
+        
+        Chunks are translated in document order: the first chunk on its own so
+        the first output arrives as early as possible, then batch_size chunks
+        at a time. Joining everything yielded gives the same text as
+        translate_large_text.
+        
+        Args:
+            text (str): Large text to translate
+            target_language (str): Target language name
+            source_language (str): Source language name (default: "english")
+            max_chunk_tokens (int): Maximum number of tokens per chunk
+            max_length (int): Maximum length for the model
+            batch_size (int): Number of chunks translated together after the first
+            profile (str, optional): Generation profile (default: the translator's)
+            chunk_size (int, optional): Deprecated: maximum number of
+                characters per chunk, used instead of max_chunk_tokens
+            overlap (int, optional): Deprecated and ignored
+            
+        Yields:
+            str: Translation of the next chunk, followed by the whitespace
+            that separated it from the following chunk in the original
+            
+        Raises:
+            RuntimeError: If a chunk could not be translated
+        """
+        if source_language not in self.language_codes:
+            raise ValueError(f"Source language '{source_language}' not supported")
+        if target_language not in self.language_codes:
+            raise ValueError(f"Target language '{target_language}' not supported")
+        
+        profile = self._check_profile(profile)
+        
+        chunks = self._large_text_chunks(text, max_chunk_tokens, chunk_size, overlap)
+        logger.info(f"Streaming translation of {len(chunks)} chunks")
+        
+        start = 0
+        while start < len(chunks):
+            end = min(len(chunks), start + (1 if start == 0 else batch_size))
+            batch = chunks[start:end]
+            
+            translated_chunks = self.translate(
+                [chunk.text for chunk in batch], target_language, source_language,
+                batch_size=batch_size, max_length=max_length, profile=profile
+            )
+            
+            for i, (chunk, translation) in enumerate(zip(batch, translated_chunks), start):
+                if translation is None:
+                    raise RuntimeError(f"Translation failed for chunk {i + 1} of {len(chunks)}")
+                separator = chunk.separator if i < len(chunks) - 1 else ""
+                yield translation.strip() + separator
+                
+            start = end
 
 # Example usage
 if __name__ == "__main__":
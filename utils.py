@@ -4,10 +4,18 @@ Utility functions for the translation tool.
 
 import os
 import re
+import math
 import logging
+import sys
 import time
 from functools import wraps
-import torch
+from chunking import chunk_text
+import tracing
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +56,8 @@ def timer(func):
     """
     Decorator to measure function execution time.
     
+    The call is also recorded as a span when a trace is active.
+    
     Args:
         func: Function to be timed
         
@@ -56,9 +66,10 @@ def timer(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        elapsed_time = time.time() - start_time
+        start_time = time.perf_counter()
+        with tracing.span(func.__name__):
+            result = func(*args, **kwargs)
+        elapsed_time = time.perf_counter() - start_time
         logger.info(f"Function {func.__name__} executed in {elapsed_time:.2f} seconds")
         return result
     return wrapper
@@ -70,6 +81,8 @@ def check_gpu_availability():
     Returns:
         dict: GPU information
     """
+    import torch
+
     if torch.cuda.is_available():
         gpu_count = torch.cuda.device_count()
         current_device = torch.cuda.current_device()
@@ -93,29 +106,22 @@ def check_gpu_availability():
         
     return info
 
-def split_text_into_chunks(text, chunk_size=500, overlap=50):
+def split_text_into_chunks(text, chunk_size=500, overlap=None):
     """
-    Split a large text into chunks with overlap.
+    Split a large text into sentence-aligned chunks.
     
     Args:
         text (str): Text to split
-        chunk_size (int): Maximum size of each chunk
-        overlap (int): Number of characters to overlap between chunks
+        chunk_size (int): Maximum number of characters per chunk
+        overlap (int, optional): Deprecated and ignored; chunks no longer
+            overlap, since they end on sentence boundaries
         
     Returns:
         list: List of text chunks
     """
-    if len(text) <= chunk_size:
-        return [text]
-        
-    chunks = []
-    for i in range(0, len(text), chunk_size - overlap):
-        chunk = text[i:i + chunk_size]
-        if chunk:  # Ensure we don't add empty chunks
-            chunks.append(chunk)
-            
-    logger.debug(f"Split text into {len(chunks)} chunks")
-    return chunks
+    if overlap is not None:
+        logger.warning("split_text_into_chunks: 'overlap' is deprecated and ignored (chunks no longer overlap)")
+    return [chunk.text for chunk in chunk_text(text, chunk_size, len)]
 
 def clean_text(text):
     """
@@ -141,6 +147,76 @@ def clean_text(text):
     
     return text
 
+def normalize_segment(text):
+    """
+    Normalize a segment for comparison, e.g. as a cache key.
+    
+    Collapses all runs of whitespace (including line breaks) to a single
+    space and strips the ends.
+    
+    Args:
+        text (str): Segment to normalize
+        
+    Returns:
+        str: Normalized segment
+    """
+    return " ".join(text.split())
+
+def deduplicate_segments(texts):
+    """
+    Find the distinct segments in a list of texts.
+    
+    Segments that only differ in whitespace (see normalize_segment) count
+    as the same segment; the first occurrence stands in for the others.
+    
+    Args:
+        texts (list): Segments, possibly with repeats
+        
+    Returns:
+        tuple: ``(unique, positions)`` where unique holds each distinct
+        segment once, in order of first appearance, and positions[i] is
+        the index in unique of texts[i]
+    """
+    unique = []
+    positions = []
+    seen = {}
+    
+    for i, text in enumerate(texts):
+        # Anything but a string is left to fail on its own
+        key = normalize_segment(text) if isinstance(text, str) else (i,)
+        if key not in seen:
+            seen[key] = len(unique)
+            unique.append(text)
+        positions.append(seen[key])
+        
+    return unique, positions
+
+def follow_future(leader):
+    """
+    Create a future that resolves with another future's outcome.
+    
+    Lets a request share the work already in flight for an identical one.
+    
+    Args:
+        leader (concurrent.futures.Future): Future doing the work
+        
+    Returns:
+        concurrent.futures.Future: Future resolving with the same result or exception
+    """
+    from concurrent.futures import Future
+    follower = Future()
+    
+    def copy_outcome(done):
+        if done.cancelled():
+            follower.cancel()
+        elif done.exception() is not None:
+            follower.set_exception(done.exception())
+        else:
+            follower.set_result(done.result())
+            
+    leader.add_done_callback(copy_outcome)
+    return follower
+
 def format_translation_result(translation, source_language, target_language, processing_time):
     """
     Format translation result for API response.
@@ -166,21 +242,67 @@ def get_memory_usage():
     Get current memory usage information.
     
     Returns:
-        dict: Memory usage information
+        dict: Memory usage information (GPU memory and process RSS)
     """
+    import torch
+
+    memory_info = get_process_memory()
+    
     if torch.cuda.is_available():
         # Get GPU memory usage
         allocated = torch.cuda.memory_allocated() / (1024 ** 3)  # GB
         reserved = torch.cuda.memory_reserved() / (1024 ** 3)    # GB
         
-        memory_info = {
+        memory_info.update({
             'gpu_allocated_gb': allocated,
             'gpu_reserved_gb': reserved
-        }
+        })
     else:
-        memory_info = {
+        memory_info.update({
             'gpu_allocated_gb': 0,
             'gpu_reserved_gb': 0
-        }
+        })
+        
+    return memory_info
+
+def get_process_memory():
+    """
+    Get resident memory of the current process.
+    
+    Returns:
+        dict: Current and peak resident set size in MB
+    """
+    peak_rss_mb = 0.0
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss_mb = peak_rss / (1024 ** 2) if sys.platform == "darwin" else peak_rss / 1024
+    
+    rss_mb = peak_rss_mb
+    try:
+        with open("/proc/self/statm") as f:
+            rss_mb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 ** 2)
+    except (OSError, ValueError, IndexError):
+        pass
         
-    return memory_info 
\ No newline at end of file
+    return {
+        'rss_mb': rss_mb,
+        'peak_rss_mb': peak_rss_mb
+    }
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    
+    Args:
+        values (list): Numbers (e.g. latencies)
+        pct (float): Percentile between 0 and 100
+        
+    Returns:
+        float: Value at the percentile (None for no values)
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]